@@ -1,9 +1,19 @@
 import pint as _pint
 ureg = _pint.UnitRegistry()
+# unpickled quantities, e.g. of networks sent to other processes, belong to
+# the application registry
+_pint.set_application_registry(ureg)
 
 from . import (input_output,
                meanfield_calcs,
-               aux_calcs)
+               aux_calcs,
+               profiling,
+               progress)
 from .network import Network
+from .working_point_cache import WorkingPointCache
+from .catalogue import Catalogue, find_runs
+from .ensemble import NetworkEnsemble
+from .profiling import Profile
+from .progress import CancellationToken, ComputationCancelled
 
 __version__ = '0.2'
@@ -4,6 +4,8 @@ This module contains lots of auxiliary calculations. It is sometimes called by m
 Functions:
 nu0_fb433
 nu_0
+nu0_fb433_array
+nu_0_array
 siegert1
 siegert2
 Phi
@@ -11,11 +13,18 @@ Phi_prime_mu
 d_nu_d_mu_fb433
 d_nu_d_mu
 Psi
+Psi_and_derivative
 d_Psi
 d_2_Psi
+d_Psi_d_z
+d_d_Psi_d_z
 Psi_x_r
 dPsi_x_r
 d2Psi_x_r
+Psi_x_r_derivatives
+d_Psi_x_r_d_z
+d_dPsi_x_r_d_z
+Psi_x_r_derivatives_d_z
 d_nu_d_nu_fb
 determinant
 determinant_same_rows
@@ -25,13 +34,14 @@ solve_chareq_rate_boxcar
 
 from __future__ import print_function
 from scipy.integrate import quad
-from scipy.special import erf, zetac, lambertw
+from scipy.special import erf, erfcx, zetac, lambertw, rgamma
 import scipy
 import numpy as np
 import math
 import mpmath
 
 from . import ureg
+from . import profiling
 
 
 def nu0_fb433(tau_m, tau_s, tau_r, V_th_rel, V_0_rel, mu, sigma):
@@ -149,6 +159,136 @@ def nu0_fb(tau_m, tau_s, tau_r, V_th, V_r, mu, sigma):
     return nu_0(tau_m, tau_r, V_th1, V_r1, mu, sigma)
 
 
+# Gauss-Legendre rule used for the Siegert integral of nu_0_array
+_SIEGERT_NODES, _SIEGERT_WEIGHTS = np.polynomial.legendre.leggauss(32)
+# below -_SIEGERT_LOG_SPLIT, the Siegert integral is evaluated in log u
+_SIEGERT_LOG_SPLIT = 1.
+
+
+def _gauss_legendre(integrand, lower, upper):
+    """ Integrate integrand over [lower, upper] elementwise for arrays. """
+    lower = np.asarray(lower, dtype=float)[..., np.newaxis]
+    upper = np.asarray(upper, dtype=float)[..., np.newaxis]
+    half_width = (upper - lower) / 2.
+    u = half_width * _SIEGERT_NODES + (upper + lower) / 2.
+    return (integrand(u) * _SIEGERT_WEIGHTS).sum(axis=-1) * half_width[..., 0]
+
+
+def nu_0_array(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma):
+    """
+    Calculates stationary firing rates for delta shaped PSCs for arrays.
+
+    Array version of nu_0 for arguments of any broadcastable shape, e.g. the
+    inputs of all populations of many networks at once. The Siegert integral
+
+        1 / nu = tau_r + tau_m sqrt(pi) int_{y_r}^{y_th} erfcx(-u) du
+
+    is evaluated by Gauss-Legendre quadrature of fixed order on three
+    ranges. For u < -1, the integrand decays like 1 / (sqrt(pi) |u|), and
+    is integrated in the variable log(-u), in which it is smooth also for
+    reset potentials hundreds of sigma below the mean input. The range
+    -1 <= u <= 0 is integrated directly. For u > 0, the integrand is scaled
+    by exp(-y_th**2), and the range where it is smaller than exp(-36)
+    relative to its maximum is dropped. The relative deviation from a 30
+    digit evaluation of the integral with mpmath is below 1e-13, also for
+    y_r of -300.
+
+    Parameters:
+    -----------
+    tau_m: float or np.ndarray
+        Membrane time constant in seconds.
+    tau_r: float or np.ndarray
+        Refractory time in seconds.
+    V_th_rel: float or np.ndarray
+        Relative threshold potential in mV.
+    V_0_rel: float or np.ndarray
+        Relative reset potential in mV.
+    mu: float or np.ndarray
+        Mean neuron activity in mV.
+    sigma: float or np.ndarray
+        Standard deviation of neuron activity in mV.
+
+    Returns:
+    --------
+    np.ndarray:
+        Stationary firing rates in Hz.
+    """
+    y_th = np.asarray((V_th_rel - mu) / sigma, dtype=float)
+    y_r = np.asarray((V_0_rel - mu) / sigma, dtype=float)
+    y_th, y_r = np.broadcast_arrays(y_th, y_r)
+    profiling.count('siegert_array', y_th.size)
+    # as in siegert1, preventing overflow
+    silent = y_th >= 20
+    y_th = np.minimum(y_th, 20.)
+
+    lower = np.minimum(y_r, 0.)
+    upper = np.maximum(np.minimum(y_th, 0.), lower)
+    # u = -exp(t) for u < -_SIEGERT_LOG_SPLIT
+    split = np.minimum(np.maximum(lower, -_SIEGERT_LOG_SPLIT), upper)
+    integral_log = _gauss_legendre(
+        lambda t: erfcx(np.exp(t)) * np.exp(t),
+        np.log(np.maximum(-split, _SIEGERT_LOG_SPLIT)),
+        np.log(np.maximum(-lower, _SIEGERT_LOG_SPLIT)))
+    integral_linear = _gauss_legendre(lambda u: erfcx(-u), split, upper)
+    integral_negative = integral_log + integral_linear
+
+    y_pos = np.maximum(y_th, 0.)
+    lower = np.maximum(y_r, np.sqrt(np.maximum(y_pos**2 - 36., 0.)))
+    lower = np.minimum(np.maximum(lower, 0.), y_pos)
+    scale = np.exp(-y_pos**2)[..., np.newaxis]
+    integral_positive_scaled = _gauss_legendre(
+        lambda u: erfcx(-u) * scale, lower, y_pos)
+
+    integral = (integral_negative
+                + integral_positive_scaled * np.exp(y_pos**2))
+    with np.errstate(divide='ignore'):
+        rate = 1. / (tau_r + tau_m * np.sqrt(np.pi) * integral)
+    return np.where(silent, 0., rate)
+
+
+def nu0_fb433_array(tau_m, tau_s, tau_r, V_th_rel, V_0_rel, mu, sigma):
+    """
+    Calcs stationary firing rates for exp PSCs for arrays.
+
+    Array version of nu0_fb433 for arguments of any broadcastable shape,
+    using nu_0_array for the rates of delta shaped PSCs.
+
+    Parameters:
+    -----------
+    tau_m: float or np.ndarray
+        Membrane time constant in seconds.
+    tau_s: float or np.ndarray
+        Synaptic time constant in seconds.
+    tau_r: float or np.ndarray
+        Refractory time in seconds.
+    V_th_rel: float or np.ndarray
+        Relative threshold potential in mV.
+    V_0_rel: float or np.ndarray
+        Relative reset potential in mV.
+    mu: float or np.ndarray
+        Mean neuron activity in mV.
+    sigma: float or np.ndarray
+        Standard deviation of neuron activity in mV.
+
+    Returns:
+    --------
+    np.ndarray:
+        Stationary firing rates in Hz.
+    """
+    alpha = np.sqrt(2.) * abs(zetac(0.5) + 1)
+    x_th = np.sqrt(2.) * (V_th_rel - mu) / sigma
+    x_r = np.sqrt(2.) * (V_0_rel - mu) / sigma
+
+    r = nu_0_array(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
+    # Phi(s) in terms of erfcx, which does not overflow for s << 0
+    x_max = 20.0 / np.sqrt(2.)
+    dPhi = np.sqrt(np.pi / 2.) * (erfcx(-np.minimum(x_th, x_max) / np.sqrt(2.))
+                                  - erfcx(-np.minimum(x_r, x_max) / np.sqrt(2.)))
+    corrected = (r - np.sqrt(tau_s / tau_m) * alpha / (tau_m * np.sqrt(2))
+                 * dPhi * (r * tau_m)**2)
+    return np.where(x_th > x_max, r, corrected)
+
+
 def siegert1(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma):
     """
     Calculates stationary firing rates for delta shaped PSCs.
@@ -201,6 +341,7 @@ def siegert1(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma):
     if y_th >= 20:
         out = 0.
     if y_th < 20:
+        profiling.count('siegert_quad')
         out = 1.0 / (tau_r + np.exp(y_th**2)
                      * quad(integrand, lower_bound, upper_bound)[0] * tau_m)
 
@@ -247,6 +388,7 @@ def siegert2(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma):
         err = integrand(upper_bound)
         upper_bound *= 2
 
+    profiling.count('siegert_quad')
     return 1.0 / (tau_r + quad(integrand, 0.0, upper_bound)[0] * tau_m)
 
 
@@ -352,11 +494,268 @@ def d_nu_d_mu(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma):
             * (np.exp(y_th**2) * (1 + erf(y_th)) - np.exp(y_r**2)
                * (1 + erf(y_r))))
 
+# Evaluation of Psi(z, x) = exp(x**2/4) * U(z, -x) and its derivative with
+# respect to x. Each fast tier returns both together with an estimate of their
+# relative error, and the first tier whose estimate does not exceed PSI_RTOL is
+# used, falling back to mpmath.
+PSI_RTOL = 1e-11
+# amplification of the relative error of Psi by cancellation in Psi_x_r, up to
+# which the difference of the fast evaluations is used
+PSI_MAX_CANCELLATION = 1e3
+# largest -x from which the recurrence tier starts its continuation
+_PSI_X_MAX = 40.
+_EPS = np.finfo(float).eps
+# step of the central differences with respect to the order z of Psi, which
+# balances truncation and rounding errors to a relative error of about 1e-10
+_D_Z_STEP = 1e-3
+
+
+def _relative_error(error, value):
+    """ Relative error, which vanishes if the absolute error vanishes. """
+    if error == 0:
+        return 0.
+    return error / abs(value) if value != 0 else np.inf
+
+
+def _Psi_asymptotic_expansion(z, X, rtol=PSI_RTOL):
+    """
+    Asymptotic expansion of Psi(z, -X) and its derivative for large X > 0.
+
+    (Eq.: 12.9.1 in http://dlmf.nist.gov/12.9)
+
+    Returns:
+    --------
+    tuple
+        Psi(z, -X), its derivative with respect to x = -X, and the estimated
+        relative error, given by the first omitted term. The error is np.inf,
+        if the terms start growing before the required accuracy is reached.
+    """
+    r = 1 / (2 * X**2)
+    power = X**(-z - 0.5)
+    term = 1 + 0j
+    series = 1 + 0j
+    d_series = 0j
+    for k in range(400):
+        new_term = -term * (z + 0.5 + 2 * k) * (z + 1.5 + 2 * k) * r / (k + 1)
+        if abs(new_term) > abs(term):
+            break
+        term = new_term
+        series += term
+        d_series -= 2 * (k + 1) * term / X
+        d_Psi = -power * ((-z - 0.5) * series / X + d_series)
+        # the derivative of the first omitted term is of the order of the
+        # derivative of the last one
+        error = max(_relative_error(abs(term), series),
+                    _relative_error(abs(power * term) / X
+                                    * (abs(z + 0.5) + 2 * (k + 1)), d_Psi))
+        if error < rtol:
+            return power * series, d_Psi, error
+    return np.nan, np.nan, np.inf
+
+
+def _Psi_asymptotic(z, x):
+    """
+    Psi(z, x) by its asymptotic expansion for large negative x.
+
+    Returns:
+    --------
+    tuple
+        Psi(z, x), its derivative with respect to x and their estimated
+        relative error.
+    """
+    if x >= 0:
+        return np.nan, np.nan, np.inf
+    return _Psi_asymptotic_expansion(z, -x)
+
+
+def _Psi_series(z, x, max_terms=500):
+    """
+    Psi(z, x) by the power series of U(z, -x) around x = 0.
+
+    Psi is expressed by two Kummer functions M, whose power series converge
+    for all x. The error estimate accounts for cancellation within the series
+    and between the two terms.
+
+    (Eqs.: 12.4.1 and 12.7.12 in http://dlmf.nist.gov/12)
+
+    Returns:
+    --------
+    tuple
+        Psi(z, x), its derivative with respect to x and their estimated
+        relative error.
+    """
+    t = x**2 / 2
+
+    def kummer(a, b):
+        """ M(a, b, t), dM/dt and the sums of the absolute terms. """
+        term = 1 + 0j
+        total = 1 + 0j
+        total_abs = 1.
+        d_total = 0j
+        d_total_abs = 0.
+        for n in range(max_terms):
+            d_term = (a + n) / (b + n) * term
+            term = d_term * t / (n + 1)
+            total += term
+            total_abs += abs(term)
+            d_total += d_term
+            d_total_abs += abs(d_term)
+            if (n > 2 and abs(term) <= _EPS * abs(total)
+                    and abs(d_term) <= _EPS * abs(d_total)):
+                return total, total_abs, d_total, d_total_abs
+        return total, np.inf, d_total, np.inf
+
+    # U(z, 0) and the derivative of U(z, x) at x = 0
+    U_0 = np.sqrt(np.pi) * 2**(-z / 2 - 0.25) * rgamma(0.75 + z / 2)
+    dU_0 = -np.sqrt(np.pi) * 2**(-z / 2 + 0.25) * rgamma(0.25 + z / 2)
+    M_1, M_1_abs, dM_1, dM_1_abs = kummer(z / 2 + 0.25, 0.5)
+    M_2, M_2_abs, dM_2, dM_2_abs = kummer(z / 2 + 0.75, 1.5)
+    value = U_0 * M_1 - x * dU_0 * M_2
+    d_value = x * U_0 * dM_1 - dU_0 * (M_2 + x**2 * dM_2)
+    error = 4 * _EPS * (abs(U_0) * M_1_abs + abs(x * dU_0) * M_2_abs)
+    d_error = 4 * _EPS * (abs(x * U_0) * dM_1_abs
+                          + abs(dU_0) * (M_2_abs + x**2 * dM_2_abs))
+    error = max(_relative_error(error, value),
+                _relative_error(d_error, d_value))
+    if not (np.isfinite(value) and np.isfinite(d_value)):
+        return np.nan, np.nan, np.inf
+    return value, d_value, error
+
+
+def _Psi_recurrence(z, x):
+    """
+    Psi(z, x) by continuation of the asymptotic expansion.
+
+    Psi solves Psi'' = x Psi' + (z + 1/2) Psi. Starting from the asymptotic
+    expansion at large negative x, where it is accurate, the solution is
+    continued to x by Taylor steps whose coefficients follow from the
+    differential equation by a three term recurrence. Psi is the dominant
+    solution in this direction, such that the continuation is stable.
+
+    Returns:
+    --------
+    tuple
+        Psi(z, x), its derivative with respect to x and their estimated
+        relative error.
+    """
+    X_0 = max(-x, 8.)
+    error = np.inf
+    while X_0 <= _PSI_X_MAX:
+        value, d_value, error = _Psi_asymptotic_expansion(z, X_0,
+                                                          rtol=PSI_RTOL / 10)
+        if np.isfinite(error):
+            break
+        X_0 *= 1.3
+    if not np.isfinite(error):
+        return np.nan, np.nan, np.inf
+    x_0 = -X_0
+    try:
+        return _Psi_continuation(z, x, x_0, value, d_value, error)
+    except OverflowError:
+        # Psi exceeds the float range, left to the mpmath tier
+        return np.nan, np.nan, np.inf
+
+
+def _Psi_continuation(z, x, x_0, value, d_value, error):
+    """
+    Continue Psi and its derivative from x_0 to x by Taylor steps, see
+    _Psi_recurrence. Returns NaN with infinite error if Psi becomes
+    non-finite on the way.
+    """
+    while x_0 < x:
+        # steps shrink for large -x_0, where the Taylor series cancel
+        h = min(8. / max(abs(x_0), 8.), x - x_0)
+        # Taylor terms c_n h**n of Psi around x_0
+        term = value
+        next_term = d_value * h
+        value = term + next_term
+        d_value = next_term
+        largest = max(abs(term), abs(next_term))
+        d_largest = abs(next_term)
+        n = 0
+        while True:
+            term, next_term = next_term, (
+                (x_0 * h * (n + 1) * next_term + (n + z + 0.5) * h**2 * term)
+                / ((n + 1) * (n + 2)))
+            value += next_term
+            d_value += (n + 2) * next_term
+            if not (np.isfinite(value) and np.isfinite(d_value)):
+                return np.nan, np.nan, np.inf
+            largest = max(largest, abs(next_term))
+            d_largest = max(d_largest, abs((n + 2) * next_term))
+            n += 1
+            scale = abs(value) + abs(d_value)
+            if abs(term) + abs(next_term) < _EPS * scale:
+                break
+            if n > 1000:
+                return np.nan, np.nan, np.inf
+        d_value /= h
+        d_largest /= h
+        error += max(_relative_error(2 * n * _EPS * largest, value),
+                     _relative_error(2 * n * _EPS * d_largest, d_value))
+        x_0 += h
+    return value, d_value, error
+
+
+def _Psi_mpmath(z, x):
+    """ Psi(z, x) evaluated by mpmath at its current working precision. """
+    return mpmath.exp(mpmath.mpf(x)**2 / 4) * mpmath.pcfu(z, -x)
+
+
+def _Psi_fast(z, x):
+    """
+    Psi(z, x) and its derivative by the first sufficiently accurate tier.
+
+    Returns:
+    --------
+    tuple or None
+        Psi(z, x) and its derivative with respect to x, or None if none of the
+        asymptotic expansion, the power series and the continuation by
+        recurrence is accurate to PSI_RTOL.
+    """
+    for evaluate in (_Psi_asymptotic, _Psi_series, _Psi_recurrence):
+        value, d_value, error = evaluate(z, x)
+        if error <= PSI_RTOL:
+            profiling.count(evaluate.__name__[1:])
+            return complex(value), complex(d_value)
+    return None
+
+
 def Psi(z, x):
     """
-    Calcs Psi(z,x)=exp(x**2/4)*U(z,x), with U(z,x) the parabolic cylinder func.
+    Calcs Psi(z,x)=exp(x**2/4)*U(z,-x), with U(z,x) the parabolic cylinder func.
+
+    The fastest of the asymptotic expansion, the power series and the
+    continuation by recurrence whose estimated relative error does not exceed
+    PSI_RTOL is used. Points where none of them is accurate enough are
+    evaluated by mpmath.
+    """
+    fast = _Psi_fast(z, x)
+    if fast is not None:
+        return fast[0]
+    profiling.count('Psi_mpmath')
+    return complex(_Psi_mpmath(z, x))
+
+
+def Psi_and_derivative(z, x):
     """
-    return np.exp(0.25*x**2) * complex(mpmath.pcfu(z, -x))
+    Psi(z, x) and its derivative with respect to x, evaluated together.
+
+    The derivative is a by-product of all evaluation tiers of Psi, such that
+    this is hardly more expensive than Psi alone, while d_Psi evaluates Psi
+    at a second order z + 1.
+
+    Returns:
+    --------
+    tuple
+        Psi(z, x) and d_Psi(z, x).
+    """
+    fast = _Psi_fast(z, x)
+    if fast is not None:
+        return fast
+    profiling.count('Psi_mpmath', 2)
+    return (complex(_Psi_mpmath(z, x)),
+            complex((1. / 2. + z) * _Psi_mpmath(z + 1, x)))
 
 
 def d_Psi(z, x):
@@ -377,19 +776,155 @@ def d_2_Psi(z, x):
     return (1. / 2. + z) * (3. / 2. + z) * Psi(z + 2, x)
 
 
+def _d_d_z(func, z):
+    """
+    Derivative of func with respect to z by a central difference of fourth
+    order with step _D_Z_STEP.
+    """
+    h = _D_Z_STEP
+    return ((8 * (func(z + h) - func(z - h)) - (func(z + 2 * h) - func(z - 2 * h)))
+            / (12 * h))
+
+
+def d_Psi_d_z(z, x):
+    """
+    Derivative of Psi with respect to its first argument z.
+
+    There is no recurrence relation for the derivative with respect to the
+    order of the parabolic cylinder function. As Psi is analytic in z, it is
+    computed by a central difference of fourth order of the fast evaluation
+    of Psi, see _d_d_z, with a relative error of about 1e-10.
+    """
+    return _d_d_z(lambda a: Psi(a, x), z)
+
+
+def d_d_Psi_d_z(z, x):
+    """
+    Derivative of d_Psi with respect to z, using the recurrence relation of
+    d_Psi.
+
+    (Eq.: 12.8.9 in http://dlmf.nist.gov/12.8)
+    """
+    return Psi(z + 1, x) + (1. / 2. + z) * d_Psi_d_z(z + 1, x)
+
+
+def _Psi_difference(z, x, y, psi_x, psi_y, order=0):
+    """
+    Difference psi_x - psi_y of the order-th derivatives of Psi(z, .).
+
+    If psi_x and psi_y nearly cancel, such that the relative error of their
+    difference exceeds the relative error of Psi by more than
+    PSI_MAX_CANCELLATION, the difference is recomputed by mpmath with the
+    working precision raised by the number of cancelled digits, using that
+    the n-th derivative of Psi(z, x) is (1/2+z)...(n-1/2+z) Psi(z+n, x).
+
+    (Eq.: 12.8.9 in http://dlmf.nist.gov/12.8)
+    """
+    difference = psi_x - psi_y
+    cancellation = (abs(psi_x) + abs(psi_y)) / max(abs(difference),
+                                                  np.finfo(float).tiny)
+    if not cancellation > PSI_MAX_CANCELLATION:
+        return difference
+    extra_digits = int(np.ceil(np.log10(cancellation)))
+    prefactor = np.prod([1. / 2. + z + n for n in range(order)])
+    profiling.count('Psi_mpmath', 2)
+    with mpmath.workdps(mpmath.mp.dps + extra_digits):
+        return complex(prefactor * (_Psi_mpmath(z + order, x)
+                                    - _Psi_mpmath(z + order, y)))
+
+
 def Psi_x_r(z, x, y):
-    """Difference of Psi for same first argument z."""
-    return Psi(z, x) - Psi(z, y)
+    """
+    Difference of Psi for same first argument z.
+
+    Cancelling differences are recomputed at raised precision, see
+    _Psi_difference.
+    """
+    return _Psi_difference(z, x, y, Psi(z, x), Psi(z, y))
 
 
 def dPsi_x_r(z, x, y):
-    """Difference of derivatives of Psi for same first argument z."""
-    return d_Psi(z, x) - d_Psi(z, y)
+    """
+    Difference of derivatives of Psi for same first argument z.
+
+    (Eq.: 12.8.9 in http://dlmf.nist.gov/12.8)
+    """
+    return (1. / 2. + z) * Psi_x_r(z + 1, x, y)
 
 
 def d2Psi_x_r(z, x, y):
-    """Difference of second derivatives of Psi for same first argument z."""
-    return d_2_Psi(z, x) - d_2_Psi(z, y)
+    """
+    Difference of second derivatives of Psi for same first argument z.
+
+    (Eq.: 12.8.9 in http://dlmf.nist.gov/12.8)
+    """
+    return (1. / 2. + z) * (3. / 2. + z) * Psi_x_r(z + 2, x, y)
+
+
+def Psi_x_r_derivatives(z, x, y, order=2):
+    """
+    Differences of Psi and its derivatives for same first argument z.
+
+    Fused evaluation of Psi_x_r, dPsi_x_r and d2Psi_x_r. Instead of
+    evaluating Psi at the orders z, z + 1 and z + 2, Psi and its derivative
+    are evaluated together at order z only, and the second derivative follows
+    from the differential equation Psi'' = x Psi' + (z + 1/2) Psi. This
+    requires two instead of six evaluations of Psi.
+
+    Parameters:
+    -----------
+    z: complex
+        First argument of Psi.
+    x: float
+        Upper point.
+    y: float
+        Lower point.
+    order: int
+        Highest derivative returned, 0, 1 or 2.
+
+    Returns:
+    --------
+    tuple
+        Psi_x_r(z, x, y), and dPsi_x_r(z, x, y) and d2Psi_x_r(z, x, y) up to
+        the given order.
+    """
+    if order not in (0, 1, 2):
+        raise ValueError('order must be 0, 1 or 2.')
+    psi_x, d_psi_x = Psi_and_derivative(z, x)
+    psi_y, d_psi_y = Psi_and_derivative(z, y)
+    derivatives_x = [psi_x, d_psi_x, x * d_psi_x + (1. / 2. + z) * psi_x]
+    derivatives_y = [psi_y, d_psi_y, y * d_psi_y + (1. / 2. + z) * psi_y]
+    return tuple(_Psi_difference(z, x, y, derivatives_x[n], derivatives_y[n],
+                                 order=n)
+                 for n in range(order + 1))
+
+
+def d_Psi_x_r_d_z(z, x, y):
+    """Derivative of Psi_x_r with respect to z, see d_Psi_d_z."""
+    return _d_d_z(lambda a: Psi_x_r(a, x, y), z)
+
+
+def d_dPsi_x_r_d_z(z, x, y):
+    """Derivative of dPsi_x_r with respect to z, see d_Psi_d_z."""
+    return _d_d_z(lambda a: dPsi_x_r(a, x, y), z)
+
+
+def Psi_x_r_derivatives_d_z(z, x, y):
+    """
+    Derivatives of Psi_x_r and dPsi_x_r with respect to z, evaluated
+    together.
+
+    Both are computed by the central difference of d_Psi_d_z from the fused
+    evaluations of Psi_x_r_derivatives, which needs eight evaluations of Psi
+    instead of the twenty-four of d_Psi_x_r_d_z and d_dPsi_x_r_d_z.
+
+    Returns:
+    --------
+    tuple
+        d_Psi_x_r_d_z(z, x, y) and d_dPsi_x_r_d_z(z, x, y).
+    """
+    return tuple(_d_d_z(
+        lambda a: np.array(Psi_x_r_derivatives(a, x, y, order=1)), z))
 
 
 def d_nu_d_nu_in_fb(tau_m, tau_s, tau_r, V_th, V_r, j, mu, sigma):
@@ -454,23 +989,27 @@ def determinant(matrix):
 
     Return only non-trivial (!=0) solutions.
 
+    Stacks of matrices are handled at once, using the batched eigenvalue
+    solver of numpy.
+
     Parameters:
     -----------
     matrix: np.ndarray
-        A matrix.
+        A matrix or a stack of matrices with shape (..., M, M).
 
     Returns:
     --------
-    res: float or complex
+    res: float or complex or np.ndarray
+        Non-trivial solution for each matrix in the stack.
     """
     all_res = np.linalg.eigvals(matrix)
 
-    idx = np.where(np.abs(all_res) > 1.E-10)[0]
-    if len(idx) !=1 : raise Exception
+    idx = np.abs(all_res) > 1.E-10
+    if np.any(np.sum(idx, axis=-1) != 1) : raise Exception
     #assert len(idx) == 1, 'Multiple non-trivial solutions exist.'
-    res = all_res[idx[0]]
+    res = all_res[idx].reshape(np.shape(all_res)[:-1])
 
-    return res
+    return res[()]
 
 
 def determinant_same_rows(matrix):
@@ -496,20 +1035,21 @@ def p_hat_boxcar(k, width):
 
     Parameters:
     -----------
-    k: float
-        Wavenumber.
+    k: float or np.ndarray
+        Wavenumber(s).
     width: float or np.ndarray
         Width(s) of boxcar kernel(s).
 
     Returns:
     --------
-    ft: float
+    ft: float or np.ndarray
+        Fourier transform with shape np.shape(k) + np.shape(width).
     """
-    if k == 0:
-        ft = 1.
-    else:
-        ft = np.sin(k * width) / (k * width)
-    return ft
+    kw = np.multiply.outer(k, width)
+    ft = np.ones(np.shape(kw))
+    nonzero = kw != 0
+    ft[nonzero] = np.sin(kw[nonzero]) / kw[nonzero]
+    return ft[()]
 
 
 def solve_chareq_rate_boxcar(branch, k, tau, W_rate, width, delay):
@@ -518,12 +1058,17 @@ def solve_chareq_rate_boxcar(branch, k, tau, W_rate, width, delay):
     one branch analytically.
     Requires a spatially organized network with boxcar connectivity profile.
 
+    Branches and wavenumbers may be given as arrays, which are broadcast
+    against each other. The non-trivial eigenvalue of W_rate * P_hat is then
+    computed once for all wavenumbers and the Lambert W function is evaluated
+    on whole arrays.
+
     Parameters:
     -----------
-    branch: float
-        Branch number.
-    k: float
-        Wavenumber in 1/mm.
+    branch: int or np.ndarray
+        Branch number(s).
+    k: float or np.ndarray
+        Wavenumber(s) in 1/mm.
     tau: float
         Time constant from fit in s.
     W_rate: np.ndarray
@@ -535,13 +1080,15 @@ def solve_chareq_rate_boxcar(branch, k, tau, W_rate, width, delay):
 
     Returns:
     --------
-    eigenval: complex
+    eigenval: complex or np.ndarray
+        Eigenvalue(s) with shape np.broadcast(branch, k).shape.
 
     delay, tau must be floats, W,
     width is vector
     """
 
-    M = W_rate * p_hat_boxcar(k, width)
+    # one matrix W_rate * P_hat per wavenumber, shape (..., dim, dim)
+    M = W_rate * p_hat_boxcar(k, width)[..., np.newaxis, :]
     xi = determinant(M)
 
     eigenval = -1./tau + 1./delay * \
@@ -0,0 +1,212 @@
+"""
+Catalogue of saved runs.
+
+Results are saved in files named <label>_<hash>.h5. The catalogue records
+the network and analysis parameters of each saved file in an SQLite
+database in the same directory, such that runs can be found by their
+parameter values instead of by recomputing hashes. The database contains a
+table 'runs' with one row per file and a table 'params' with one row per
+parameter of each file, with columns file_name, key and value. Network.save
+records the saved file only if called with catalogue=True.
+
+Quantities are stored as magnitudes in base units and arrays as JSON
+strings, such that parameters given in different units compare equal.
+
+Classes:
+--------
+Catalogue
+
+Functions:
+----------
+find_runs
+"""
+
+from __future__ import print_function
+import contextlib
+import json
+import os
+import sqlite3
+import time
+import numpy as np
+
+from . import ureg
+
+CATALOGUE_NAME = 'lmt_catalogue.sqlite'
+
+# columns of the runs table
+_RUN_COLUMNS = ('file_name', 'hash', 'saved_at', 'results')
+
+
+def _column_value(value):
+    """ Convert parameter to value storable and comparable in SQLite. """
+    if isinstance(value, ureg.Quantity):
+        value = value.to_base_units().magnitude
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if np.ndim(value) == 0:
+        value = np.asarray(value).item()
+        return str(value) if isinstance(value, complex) else value
+    return json.dumps(np.asarray(value).tolist(), default=str)
+
+
+class Catalogue(object):
+    """
+    SQLite catalogue of the runs saved in one directory.
+
+    The database is created if it does not exist yet.
+
+    Parameters:
+    -----------
+    path: str
+        Directory the catalogue belongs to, or path of the database file.
+    """
+
+    def __init__(self, path='.'):
+        if os.path.isdir(path):
+            path = os.path.join(path, CATALOGUE_NAME)
+        self.path = path
+        self.directory = os.path.dirname(os.path.abspath(path))
+        with self._connect() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS runs '
+                               '(file_name TEXT PRIMARY KEY, hash TEXT, '
+                               'saved_at REAL, results TEXT)')
+            connection.execute('CREATE TABLE IF NOT EXISTS params '
+                               '(file_name TEXT, key TEXT, value, '
+                               'PRIMARY KEY (file_name, key))')
+            connection.execute('CREATE INDEX IF NOT EXISTS params_key_value '
+                               'ON params (key, value)')
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """ Open connection, committing and closing it afterwards. """
+        # wait for other processes of a sweep writing to the catalogue
+        connection = sqlite3.connect(self.path, timeout=60)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def register(self, file_name, network_params, analysis_params={},
+                 results=(), hash=None):
+        """
+        Record a saved file with the parameters of its run.
+
+        If the file has been recorded before, its entry is replaced, while
+        the recorded result keys are extended by the given ones.
+
+        Parameters:
+        -----------
+        file_name: str
+            Path of the saved file.
+        network_params: dict
+            Network parameters of the run.
+        analysis_params: dict
+            Analysis parameters of the run. Parameters with the same key as
+            a network parameter are not recorded.
+        results: iterable
+            Keys of the results saved in the file.
+        hash: str
+            Hash of the network parameters.
+        """
+        file_name = os.path.relpath(os.path.abspath(file_name),
+                                    self.directory)
+        params = {}
+        for p in (analysis_params, network_params):
+            params.update({str(key): _column_value(value)
+                           for key, value in p.items()})
+        with self._connect() as connection:
+            stored = connection.execute(
+                'SELECT results FROM runs WHERE file_name = ?',
+                (file_name,)).fetchone()
+            results = set(results)
+            if stored is not None:
+                results.update(json.loads(stored[0]))
+            connection.execute(
+                'INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?)',
+                (file_name, hash, time.time(),
+                 json.dumps(sorted(results))))
+            connection.execute('DELETE FROM params WHERE file_name = ?',
+                               (file_name,))
+            connection.executemany(
+                'INSERT INTO params VALUES (?, ?, ?)',
+                [(file_name, key, value) for key, value in params.items()])
+
+    def find(self, rtol=1e-9, **criteria):
+        """
+        Find recorded runs with given parameter values.
+
+        Parameters:
+        -----------
+        rtol: float
+            Relative tolerance for comparing numbers.
+        criteria:
+            Parameter values the runs should have, e.g. g=4.,
+            nu_ext=8 * ureg.Hz, or hash='...'.
+
+        Returns:
+        --------
+        list
+            Dictionaries with the recorded values of all matching runs. The
+            file names are absolute paths, the results are lists of result
+            keys and the parameters are contained in a dictionary under key
+            'params', with quantities in base units and arrays as JSON
+            strings.
+        """
+        conditions = []
+        values = []
+        for key, value in criteria.items():
+            value = _column_value(value)
+            if key in _RUN_COLUMNS:
+                conditions.append('{} = ?'.format(key))
+                values.append(value)
+                continue
+            if value is None:
+                condition, condition_values = 'value IS NULL', []
+            elif (isinstance(value, (int, float))
+                  and not isinstance(value, bool)):
+                condition = ("typeof(value) IN ('integer', 'real') "
+                             "AND ABS(value - ?) <= ?")
+                condition_values = [value, rtol * abs(value)]
+            else:
+                condition, condition_values = 'value = ?', [value]
+            conditions.append('file_name IN (SELECT file_name FROM params '
+                              'WHERE key = ? AND {})'.format(condition))
+            values += [key] + condition_values
+        query = 'SELECT * FROM runs'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+
+        runs = []
+        with self._connect() as connection:
+            for row in connection.execute(query, values).fetchall():
+                run = dict(zip(_RUN_COLUMNS, row))
+                run['params'] = dict(connection.execute(
+                    'SELECT key, value FROM params WHERE file_name = ?',
+                    (run['file_name'],)).fetchall())
+                run['file_name'] = os.path.join(self.directory,
+                                                run['file_name'])
+                run['results'] = json.loads(run['results'])
+                runs.append(run)
+        return sorted(runs, key=lambda run: run['file_name'])
+
+
+def find_runs(directory='.', **criteria):
+    """
+    Find runs saved in a directory with given parameter values.
+
+    Parameters:
+    -----------
+    directory: str
+        Directory containing the saved files and their catalogue.
+    criteria:
+        Parameter values the runs should have, see Catalogue.find.
+
+    Returns:
+    --------
+    list
+        Dictionaries with the recorded values of all matching runs.
+    """
+    if not os.path.exists(os.path.join(directory, CATALOGUE_NAME)):
+        return []
+    return Catalogue(directory).find(**criteria)
@@ -0,0 +1,240 @@
+"""
+Ensembles of networks evaluated together.
+
+Studies of parameter variability evaluate many networks that only differ in
+some parameters, e.g. J, K, g or nu_ext. A NetworkEnsemble stacks the
+parameters of such networks along a leading ensemble axis and runs the
+firing rate iteration, the transfer function and the power spectra for all
+of them at once, such that the Python overhead is paid once per ensemble
+instead of once per network.
+
+Classes:
+--------
+NetworkEnsemble
+"""
+
+from __future__ import print_function
+import numpy as np
+
+from . import ureg
+from . import meanfield_calcs
+
+
+class NetworkEnsemble(object):
+    """
+    Networks differing in their parameters, evaluated along an ensemble axis.
+
+    All results have a leading axis indexing the networks and otherwise the
+    shape of the corresponding result of Network. Results are cached.
+
+    The firing rates are found by the iteration of Network.firing_rates,
+    run for all networks at once with per-network convergence, and the
+    transfer function is computed with method 'shift', or in the empirical
+    mode if the networks' analysis_params['tf_mode'] is 'empirical'. The stationary rates
+    are evaluated by aux_calcs.nu0_fb433_array instead of nu0_fb433, which
+    can change the step at which the iteration stops, such that the results
+    agree with those of the single networks within the convergence tolerance
+    of the iteration, typically to a relative accuracy of 1e-5.
+
+    Parameters:
+    -----------
+    networks: list of Network
+        Members of the ensemble, with equal number of populations, delay
+        distribution, analysis frequencies and transfer function mode.
+
+    Attributes:
+    -----------
+    networks: list of Network
+        Members of the ensemble.
+    results: dict
+        Cached results.
+    n_iterations: np.ndarray
+        Number of iteration steps each network needed to find its firing
+        rates, once they are computed.
+    """
+
+    # units the stacked parameters are passed to meanfield_calcs in
+    _param_units = {'tau_m': ureg.s, 'tau_s': ureg.s, 'tau_r': ureg.s,
+                    'V_0_rel': ureg.mV, 'V_th_rel': ureg.mV, 'K': None,
+                    'J': ureg.mV, 'j': ureg.mV, 'nu_ext': ureg.Hz,
+                    'K_ext': None, 'g': None, 'nu_e_ext': ureg.Hz,
+                    'nu_i_ext': ureg.Hz, 'N': None, 'Delay': ureg.s,
+                    'Delay_sd': ureg.s}
+    _wp_params = ['tau_m', 'tau_s', 'tau_r', 'V_0_rel', 'V_th_rel', 'K', 'J',
+                  'j', 'nu_ext', 'K_ext', 'g', 'nu_e_ext', 'nu_i_ext']
+    _input_params = ['K', 'J', 'j', 'tau_m', 'nu_ext', 'K_ext', 'g',
+                     'nu_e_ext', 'nu_i_ext']
+    _tf_params = ['tau_m', 'tau_s', 'tau_r', 'V_th_rel', 'V_0_rel']
+
+    def __init__(self, networks):
+        networks = list(networks)
+        if not networks:
+            raise ValueError('An ensemble needs at least one network.')
+        first = networks[0]
+        for network in networks[1:]:
+            if (network.network_params['dimension']
+                    != first.network_params['dimension']):
+                raise ValueError('All networks of an ensemble need the same '
+                                 'number of populations.')
+            if (network.network_params['delay_dist']
+                    != first.network_params['delay_dist']):
+                raise ValueError('All networks of an ensemble need the same '
+                                 'delay distribution.')
+            if not np.array_equal(
+                    network.analysis_params['omegas'].to(ureg.Hz).magnitude,
+                    first.analysis_params['omegas'].to(ureg.Hz).magnitude):
+                raise ValueError('All networks of an ensemble need the same '
+                                 'analysis frequencies.')
+            if network._tf_mode() != first._tf_mode():
+                raise ValueError('All networks of an ensemble need the same '
+                                 'transfer function mode.')
+        self.networks = networks
+        self.results = {}
+        self.n_iterations = None
+        self._params = {key: self._stack(key, unit)
+                        for key, unit in self._param_units.items()}
+        self._omegas = first.analysis_params['omegas'].to(ureg.Hz).magnitude
+
+    @classmethod
+    def from_changed_parameters(cls, network, changed_network_params):
+        """
+        Ensemble of variants of a network.
+
+        Parameters:
+        -----------
+        network: Network
+            Network the members are derived from.
+        changed_network_params: list of dict
+            Changed network parameters of each member, see
+            Network.change_parameters.
+
+        Returns:
+        --------
+        NetworkEnsemble
+        """
+        return cls([network.change_parameters(changed)
+                    for changed in changed_network_params])
+
+    def __len__(self):
+        return len(self.networks)
+
+    def _stack(self, key, unit):
+        """
+        Stack a parameter of all networks along a leading axis.
+
+        Scalar parameters get a trailing axis, such that they broadcast with
+        the populations.
+        """
+        values = [network.network_params[key] for network in self.networks]
+        if unit is not None:
+            values = [value.to(unit).magnitude for value in values]
+        stacked = np.array(values, dtype=float)
+        if stacked.ndim == 1:
+            stacked = stacked[:, np.newaxis]
+        return stacked
+
+    def _params_of(self, keys):
+        return [self._params[key] for key in keys]
+
+    def firing_rates(self, nu_0=None):
+        """
+        Firing rates of all networks.
+
+        Parameters:
+        -----------
+        nu_0: Quantity(np.ndarray, 'hertz')
+            Initial guesses of shape (n_networks, dimension).
+
+        Returns:
+        --------
+        Quantity(np.ndarray, 'hertz')
+            Firing rates of shape (n_networks, dimension).
+        """
+        if 'firing_rates' not in self.results:
+            if nu_0 is not None:
+                nu_0 = nu_0.to(ureg.Hz).magnitude
+            rates, self.n_iterations = meanfield_calcs._firing_rates_ensemble(
+                *self._params_of(self._wp_params), nu_0=nu_0)
+            self.results['firing_rates'] = rates * ureg.Hz
+        return self.results['firing_rates']
+
+    def mean_input(self):
+        """ Mean inputs of shape (n_networks, dimension) in mV. """
+        if 'mean_input' not in self.results:
+            nu = self.firing_rates().to(ureg.Hz).magnitude
+            self.results['mean_input'] = meanfield_calcs._mean_ensemble(
+                nu, *self._params_of(self._input_params)) * ureg.mV
+        return self.results['mean_input']
+
+    def std_input(self):
+        """ Standard deviations of the inputs, see mean_input. """
+        if 'std_input' not in self.results:
+            nu = self.firing_rates().to(ureg.Hz).magnitude
+            self.results['std_input'] = (
+                meanfield_calcs._standard_deviation_ensemble(
+                    nu, *self._params_of(self._input_params)) * ureg.mV)
+        return self.results['std_input']
+
+    def transfer_function(self):
+        """
+        Transfer functions of all networks at the analysis frequencies.
+
+        Returns:
+        --------
+        Quantity(np.ndarray, 'hertz/millivolt')
+            Transfer functions of shape (n_networks, n_omegas, dimension).
+        """
+        if 'transfer_function' not in self.results:
+            if self.networks[0]._tf_mode() == 'empirical':
+                dimension = self.networks[0].network_params['dimension']
+                tau_impulse, delta_f = [
+                    np.array([np.broadcast_to(
+                        network.analysis_params[key].to(unit).magnitude,
+                        (dimension,)) for network in self.networks]
+                             )[:, np.newaxis]
+                    for key, unit in [('tau_impulse', ureg.s),
+                                      ('delta_f', ureg.Hz / ureg.mV)]]
+                tf = meanfield_calcs._transfer_function_empirical(
+                    tau_impulse, delta_f, dimension, self._omegas)
+                self.results['transfer_function'] = tf * ureg.Hz / ureg.mV
+                return self.results['transfer_function']
+            tf = meanfield_calcs._transfer_function_ensemble(
+                self.mean_input().to(ureg.mV).magnitude,
+                self.std_input().to(ureg.mV).magnitude,
+                *self._params_of(self._tf_params), omegas=self._omegas)
+            self.results['transfer_function'] = tf * ureg.Hz / ureg.mV
+        return self.results['transfer_function']
+
+    def delay_dist_matrix(self):
+        """
+        Delay distribution matrices of all networks.
+
+        Returns:
+        --------
+        Quantity(np.ndarray, 'dimensionless')
+            Matrices of shape (n_networks, n_omegas, dimension, dimension).
+        """
+        if 'delay_dist' not in self.results:
+            ddm = meanfield_calcs._delay_dist_matrix_ensemble(
+                self._params['Delay'], self._params['Delay_sd'],
+                self.networks[0].network_params['delay_dist'], self._omegas)
+            self.results['delay_dist'] = ddm * ureg.dimensionless
+        return self.results['delay_dist']
+
+    def power_spectra(self):
+        """
+        Power spectra of all networks at the analysis frequencies.
+
+        Returns:
+        --------
+        Quantity(np.ndarray, 'hertz')
+            Power spectra of shape (n_networks, dimension, n_omegas).
+        """
+        if 'power_spectra' not in self.results:
+            power = meanfield_calcs._power_spectra_ensemble(
+                self._params['tau_m'], self._params['J'], self._params['K'],
+                self.delay_dist_matrix().magnitude, self._params['N'],
+                self.firing_rates().to(ureg.Hz).magnitude,
+                self.transfer_function().to(ureg.Hz / ureg.mV).magnitude)
+            self.results['power_spectra'] = power * ureg.Hz
+        return self.results['power_spectra']
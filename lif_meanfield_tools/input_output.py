@@ -12,13 +12,53 @@ Options:
 
 from __future__ import print_function
 
+import ast
+import collections.abc
+import functools
+import weakref
 import numpy as np
 import yaml
 import hashlib as hl
-import h5py_wrapper.wrapper as h5
+import zlib
+import h5py
 
 from . import ureg
 
+# use the C implementation of the yaml parser if libyaml is available
+_YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# units of the known network and analysis parameters; None marks parameters
+# without unit
+NETWORK_PARAMS_SCHEMA = {'N': None, 'C': 'pF', 'tau_m': 'ms', 'tau_r': 'ms',
+                         'V_0_abs': 'mV', 'V_th_abs': 'mV', 'tau_s': 'ms',
+                         'd_e': 'ms', 'd_i': 'ms', 'd_e_sd': 'ms',
+                         'd_i_sd': 'ms', 'w': 'pA', 'K': None, 'g': None,
+                         'nu_ext': 'Hz', 'K_ext': None, 'nu_e_ext': 'Hz',
+                         'nu_i_ext': 'Hz'}
+ANALYSIS_PARAMS_SCHEMA = {'f_min': 'Hz', 'f_max': 'Hz', 'df': 'Hz',
+                          'omega': 'Hz', 'k_min': '1/mm', 'k_max': '1/mm',
+                          'dk': '1/mm', 'tau_impulse': 'ms',
+                          'delta_f': 'Hz/mV'}
+
+
+@functools.lru_cache(maxsize=None)
+def parse_unit(unit):
+    """
+    Parse unit string, memoised for repeatedly used units.
+
+    Parameters:
+    -----------
+    unit: str
+        Unit string, e.g. 'mV' or '1/mm'.
+
+    Returns:
+    --------
+    Quantity
+        Quantity of magnitude one with the given unit.
+    """
+    return ureg.parse_expression(unit)
+
+
 def val_unit_to_quantities(dict_of_val_unit_dicts):
     """
     Convert a dictionary of value-unit pairs to a dictionary of quantities
@@ -26,7 +66,8 @@ def val_unit_to_quantities(dict_of_val_unit_dicts):
     Combine value and unit of each quantity and save them in a dictionary
     of the structure: {'<quantity_key1>':<quantity1>, ...}.
 
-    Lists are converted to numpy arrays and then converted to quantities.
+    Lists are converted to numpy arrays and then converted to quantities,
+    except for lists of dictionaries, which are kept as they are.
 
     Quantities or names without units, are just stored the way they are.
 
@@ -45,8 +86,10 @@ def val_unit_to_quantities(dict_of_val_unit_dicts):
     """
     def formatval(val):
         """ If argument is of type list, convert to np.array. """
-        if isinstance(val, list):
-            return np.array(val)
+        if (isinstance(val, list)
+                and not (val and all(isinstance(part, dict)
+                                     for part in val))):
+            return np.asarray(val)
         else:
             return val
 
@@ -54,7 +97,7 @@ def val_unit_to_quantities(dict_of_val_unit_dicts):
     for key, value in dict_of_val_unit_dicts.items():
         # if dictionary with keys val and unit, convert to quantity
         if isinstance(value, dict) and set(('val', 'unit')) == value.keys():
-            converted_dict[key] = (formatval(value['val']) * ureg.parse_expression(value['unit']))
+            converted_dict[key] = (formatval(value['val']) * parse_unit(value['unit']))
         else:
             converted_dict[key] = formatval(value)
     return converted_dict
@@ -128,7 +171,7 @@ def load_params(file_path):
     # try to load yaml file
     with open(file_path, 'r') as stream:
         try:
-            params = yaml.safe_load(stream)
+            params = yaml.load(stream, Loader=_YamlLoader)
         except yaml.YAMLError as exc:
             print(exc)
 
@@ -139,32 +182,330 @@ def load_params(file_path):
     return params_converted
 
 
-def create_hash(params, param_keys):
+def compile_schema(schema):
+    """
+    Parse the units of a parameter schema once for repeated validation.
+
+    Parameters:
+    -----------
+    schema: dict
+        Dictionary of format {'<parameter1>': <unit string or None>, ...},
+        e.g. NETWORK_PARAMS_SCHEMA or ANALYSIS_PARAMS_SCHEMA. None marks
+        parameters without unit.
+
+    Returns:
+    --------
+    dict
+        Dictionary of format {'<parameter1>': <dimensionality or None>, ...}.
+    """
+    return {key: (None if unit is None else parse_unit(unit).dimensionality)
+            for key, unit in schema.items()}
+
+
+def validate_params(params, compiled_schema):
+    """
+    Check the units of converted parameters against a compiled schema.
+
+    Only parameters contained in the schema are checked, such that
+    parameter sets may contain additional or fewer parameters.
+
+    Parameters:
+    -----------
+    params: dict
+        Dictionary containing parameters as quantities.
+    compiled_schema: dict
+        Schema as returned by compile_schema.
+
+    Raises:
+    -------
+    ValueError
+        If a parameter has a unit of wrong dimension, or has a unit although
+        it should not have one, or vice versa.
+    """
+    for key, dimensionality in compiled_schema.items():
+        if key not in params:
+            continue
+        value = params[key]
+        if dimensionality is None:
+            if isinstance(value, ureg.Quantity):
+                raise ValueError('Parameter {} should not have a unit, but '
+                                 'has unit {}.'.format(key, value.units))
+        elif not isinstance(value, ureg.Quantity):
+            raise ValueError('Parameter {} needs a unit of dimension '
+                             '{}.'.format(key, dimensionality))
+        elif value.dimensionality != dimensionality:
+            raise ValueError('Parameter {} has unit {}, but needs a unit of '
+                             'dimension {}.'.format(key, value.units,
+                                                    dimensionality))
+
+
+def load_params_bulk(file_paths, schema=None):
+    """
+    Load and convert parameters from many yaml files at once.
+
+    Intended for parameter sweeps with many parameter files. Unit strings are
+    parsed only once for all files. The returned dictionaries can be passed
+    to Network directly, without parsing the files again.
+
+    Parameters:
+    -----------
+    file_paths: list
+        Paths to yaml files in the format described in load_params.
+    schema: dict
+        Optional dictionary of format {'<parameter1>': <unit or None>, ...},
+        e.g. NETWORK_PARAMS_SCHEMA, or its compiled version. If given, the
+        units of all parameters are validated against it.
+
+    Returns:
+    --------
+    list
+        List of dictionaries containing the converted parameters of each
+        file, in the order of file_paths.
+
+    Raises:
+    -------
+    ValueError
+        If a parameter does not match the schema. The message names the file.
+    """
+    if schema is not None and any(isinstance(unit, str)
+                                  for unit in schema.values()):
+        schema = compile_schema(schema)
+
+    params_list = []
+    for file_path in file_paths:
+        with open(file_path, 'r') as stream:
+            params = val_unit_to_quantities(
+                yaml.load(stream, Loader=_YamlLoader))
+        if schema is not None:
+            try:
+                validate_params(params, schema)
+            except ValueError as error:
+                raise ValueError('{}: {}'.format(file_path, error))
+        params_list.append(params)
+    return params_list
+
+
+def _update_digest(hasher, value):
+    """
+    Feed an unambiguous byte representation of value into hasher.
+
+    Arrays are represented by their dtype, shape and raw bytes, quantities by
+    their magnitude in base units, as float, and the base units. Containers are
+    traversed recursively. All parts are tagged and length prefixed, such
+    that different values cannot result in the same byte sequence.
+    """
+    if isinstance(value, ureg.Quantity):
+        value = value.to_base_units()
+        units = str(value.units).encode('utf-8')
+        hasher.update(b'Q%d:' % len(units) + units)
+        magnitude = value.magnitude
+        # integer magnitudes are converted to float to be unit independent
+        if np.asarray(magnitude).dtype.kind in 'biu':
+            magnitude = np.asarray(magnitude, dtype=float)
+        _update_digest(hasher, magnitude)
+    elif isinstance(value, str):
+        encoded = value.encode('utf-8')
+        hasher.update(b'S%d:' % len(encoded) + encoded)
+    elif isinstance(value, bytes):
+        hasher.update(b'B%d:' % len(value) + value)
+    elif value is None:
+        hasher.update(b'N')
+    elif isinstance(value, dict):
+        hasher.update(b'D%d:' % len(value))
+        for key in sorted(value, key=str):
+            _update_digest(hasher, str(key))
+            _update_digest(hasher, value[key])
+    elif isinstance(value, (list, tuple)):
+        hasher.update(b'L%d:' % len(value))
+        for item in value:
+            _update_digest(hasher, item)
+    else:
+        array = np.asarray(value)
+        if array.dtype.hasobject and array.ndim > 0:
+            hasher.update(b'O' + repr(array.shape).encode('utf-8'))
+            for item in array.flat:
+                _update_digest(hasher, item)
+        elif array.dtype.kind in 'biufcSUV':
+            header = (array.dtype.str + repr(array.shape)).encode('utf-8')
+            hasher.update(b'A%d:' % len(header) + header)
+            hasher.update(np.ascontiguousarray(array).tobytes())
+        else:
+            encoded = repr(value).encode('utf-8')
+            hasher.update(b'R%d:' % len(encoded) + encoded)
+
+
+def _param_digest(key, value):
+    """ Digest of a single parameter, including its key. """
+    hasher = hl.blake2b(digest_size=16)
+    _update_digest(hasher, str(key))
+    _update_digest(hasher, value)
+    return hasher.digest()
+
+
+def _param_fingerprint(value):
+    """
+    Cheap checksum of an array parameter, deciding whether it changed.
+
+    Returns the units, dtype, shape and CRC-32 checksum of the raw bytes of
+    arrays and quantities with array magnitude, or None for all other
+    values, which are small and always digested again.
+    """
+    if isinstance(value, ureg.Quantity):
+        units = str(value.units)
+        value = value.magnitude
+    else:
+        units = None
+    if not isinstance(value, np.ndarray) or value.dtype.hasobject:
+        return None
+    return (units, value.dtype.str, value.shape,
+            zlib.crc32(np.ascontiguousarray(value)))
+
+
+def create_hash(params, param_keys, digests=None):
     """
     Create unique hash from values of parameters specified in param_keys.
 
+    The hash is computed from the dtypes, shapes and raw bytes of the
+    parameter values and their units converted to base units. Each parameter
+    is digested separately. If a dictionary of digests from an earlier call
+    is given, the digests of array parameters whose units, dtype, shape and
+    CRC-32 checksum are unchanged are reused. Thereby, large arrays are not
+    digested again, while in-place changes are still detected.
+
     Parameters:
     -----------
     params : dict
         Dictionary containing all network parameters.
     param_keys : list
         List specifying which parameters should be reflected in hash.
+    digests : dict
+        Optional dictionary of per-parameter digests, updated in place.
 
     Returns:
     --------
     str
         Hash string.
     """
+    if digests is None:
+        digests = {}
+    hasher = hl.blake2b(digest_size=16)
+    for key in sorted(param_keys, key=str):
+        value = params[key]
+        fingerprint = _param_fingerprint(value)
+        if fingerprint is None or digests.get(key, (None,))[0] != fingerprint:
+            digests[key] = (fingerprint, _param_digest(key, value))
+        hasher.update(digests[key][1])
+    return hasher.hexdigest()
+
+
+def _dataset_kwargs(data, compression, chunk_threshold):
+    """
+    Chunking and compression options for a dataset of given data.
 
-    label = ''
-    # add all param values to one string
-    for key in sorted(list(param_keys)):
-        label += str(params[key])
-    # create and return hash (label must be encoded)
-    return hl.md5(label.encode('utf-8')).hexdigest()
+    Uncompressed datasets are stored contiguously, such that they can be
+    memory-mapped by LazyDataset.
+    """
+    if compression is None or data.ndim == 0 or data.size < chunk_threshold:
+        return {}
+    return dict(chunks=True, compression=compression)
 
 
-def save(output_key, output, file_name):
+def _write_entry(group, key, value, compression, chunk_threshold):
+    """
+    Write value to group under key, replacing any existing entry.
+
+    Dictionaries, and lists of dictionaries, are stored as groups. Lists of
+    dictionaries are keyed by position and marked by the attribute
+    '_value_type', such that they are read as lists again. Quantities are stored as datasets of
+    their magnitudes with the unit as attribute 'unit'. If compression is
+    given, large arrays are chunked and compressed. The value and key
+    types are stored as attributes in the same way as h5py_wrapper does.
+    """
+    name = str(key)
+    value_type = 'dict'
+    # lists of dictionaries are stored as groups keyed by position
+    if (isinstance(value, list) and value
+            and all(isinstance(part, dict) for part in value)):
+        value = dict(enumerate(value))
+        value_type = 'list'
+    if isinstance(value, dict):
+        # lists replace the whole group, such that no stale positions remain
+        if name in group and (value_type == 'list'
+                              or not isinstance(group[name], h5py.Group)):
+            del group[name]
+        subgroup = group.require_group(name)
+        subgroup.attrs['_key_type'] = type(key).__name__
+        subgroup.attrs['_value_type'] = value_type
+        for subkey, subvalue in value.items():
+            _write_entry(subgroup, subkey, subvalue, compression,
+                         chunk_threshold)
+        return
+
+    if name in group:
+        del group[name]
+
+    unit = None
+    value_type = type(value).__name__
+    # lists of quantities are stacked to one quantity array
+    if (isinstance(value, list)
+            and any(isinstance(part, ureg.Quantity) for part in value)):
+        unit = value[0].units
+        value = np.stack([part.to(unit).magnitude for part in value]) * unit
+        value_type = 'ndarray'
+    if isinstance(value, ureg.Quantity):
+        unit = value.units
+        value = value.magnitude
+        value_type = type(value).__name__
+
+    if value is None:
+        data = np.array('None', dtype=h5py.special_dtype(vlen=str))
+    elif isinstance(value, str):
+        data = np.array(value, dtype=h5py.special_dtype(vlen=str))
+    else:
+        data = np.asarray(value)
+        if data.dtype.kind == 'U':
+            data = np.char.encode(data, 'utf-8')
+        elif data.dtype.hasobject:
+            raise ValueError('Entry {} of type {} cannot be stored in h5 '
+                             'file.'.format(name, value_type))
+    dataset = group.create_dataset(
+        name, data=data, **_dataset_kwargs(data, compression,
+                                           chunk_threshold))
+    dataset.attrs['_key_type'] = type(key).__name__
+    dataset.attrs['_value_type'] = value_type
+    if unit is not None:
+        dataset.attrs['unit'] = str(unit)
+
+
+def write_h5(file_name, data, compression=None, chunk_threshold=1024):
+    """
+    Write nested dictionary to h5 file, opening the file only once.
+
+    Entries already contained in the file are replaced by the given ones,
+    all other entries are left untouched. Hence, single results can be
+    updated by passing only them, e.g. {'results': {'power_spectra': ...}}.
+
+    Parameters:
+    -----------
+    file_name: str
+        String specifying output file name.
+    data: dict
+        Dictionary of dictionaries containing quantities, arrays, numbers,
+        strings or lists of those.
+    compression: str or int or None
+        Compression of large arrays passed to h5py, e.g. 'gzip' or 'lzf'.
+        No compression by default, in which case arrays are stored
+        contiguously.
+    chunk_threshold: int
+        If compression is given, arrays with at least this number of entries
+        are stored chunked and compressed.
+    """
+    with h5py.File(file_name, 'a') as file:
+        for key, value in data.items():
+            _write_entry(file, key, value, compression, chunk_threshold)
+
+
+def save(output_key, output, file_name, compression=None):
     """
     Save data and given parameters in h5 file.
 
@@ -174,26 +515,111 @@ def save(output_key, output, file_name):
 
     Parameters:
     -----------
-    results_dict : dict
-        Dictionary containing all calculated results.
-    network_params : dict
-        Dictionary containing network parameters as quantities.
-    analysis_params: dict
-        Dictionary containing analysis parameters as quantities.
+    output_key : str
+        Key under which output is stored in h5 file.
+    output : dict
+        Dictionary containing the data as quantities.
     file_name: str
         String specifying output file name.
+    compression: str or int or None
+        Compression of large arrays, see write_h5.
 
     Returns:
     --------
     None
     """
-    # convert data into format usable in h5 file
-    output = quantities_to_val_unit(output)
-    output_dict = {}
-    output_dict[output_key] = output
+    write_h5(file_name, {output_key: output}, compression=compression)
 
-    # save output
-    h5.save(file_name, output_dict, overwrite_dataset=True)
+
+def _read_dataset(dataset):
+    """
+    Read dataset written by write_h5 or by h5py_wrapper.
+
+    Datasets with attribute 'unit' are converted to quantities. All other
+    datasets are cast to the type given in attribute '_value_type'.
+    """
+    value = dataset[()]
+    value_type = dataset.attrs.get('_value_type', '')
+    if isinstance(value_type, bytes):
+        value_type = value_type.decode('utf-8')
+    if value_type == 'NoneType':
+        return None
+    if 'unit' in dataset.attrs:
+        return value * parse_unit(dataset.attrs['unit'])
+    if 'custom_shape' in dataset.attrs:
+        # lists of arrays of different lengths stored by h5py_wrapper
+        bounds = np.cumsum(np.append(0, dataset.attrs['oldshape']))
+        return [_cast_value(value[start:stop], part_type)
+                for start, stop, part_type in zip(
+                    bounds[:-1], bounds[1:],
+                    dataset.attrs['custom_value_types'].astype(str))]
+    return _cast_value(value, value_type)
+
+
+def _cast_value(value, value_type):
+    """ Cast value read from h5 file to type specified by value_type. """
+    if isinstance(value, np.ndarray) and value.dtype.kind == 'S':
+        value = value.astype(str)
+    if value_type in ('list', 'tuple'):
+        value = np.asarray(value).tolist()
+        return tuple(value) if value_type == 'tuple' else value
+    if value_type == 'str':
+        return value.decode('utf-8') if isinstance(value, bytes) else str(value)
+    if value_type == 'ndarray':
+        return np.array(value)
+    if value_type in ('int', 'float', 'bool', 'complex'):
+        return {'int': int, 'float': float, 'bool': bool,
+                'complex': complex}[value_type](value)
+    return value
+
+
+def _evaluate_key(name, obj):
+    """ Convert name of h5 object back to key of type stored in attrs. """
+    key_type = obj.attrs.get('_key_type', 'str')
+    if isinstance(key_type, bytes):
+        key_type = key_type.decode('utf-8')
+    if key_type in ('str', 'unicode', 'string_'):
+        return name
+    return ast.literal_eval(name)
+
+
+def _is_list_group(group):
+    """ Check whether group stores a list of dictionaries. """
+    value_type = group.attrs.get('_value_type', 'dict')
+    if isinstance(value_type, bytes):
+        value_type = value_type.decode('utf-8')
+    return value_type == 'list'
+
+
+def _read_group(group):
+    """
+    Read group of h5 file recursively into a dictionary.
+
+    Groups storing lists of dictionaries are read as lists.
+    """
+    data = {}
+    for name, obj in group.items():
+        key = _evaluate_key(name, obj)
+        if isinstance(obj, h5py.Group):
+            data[key] = _read_group(obj)
+        else:
+            data[key] = _read_dataset(obj)
+    if _is_list_group(group):
+        return [data[position] for position in sorted(data)]
+    return data
+
+
+def _read_h5(file_name):
+    """
+    Read whole h5 file into a dictionary.
+
+    Raises:
+    -------
+    OSError
+        If file does not exist or cannot be opened.
+    """
+    with h5py.File(file_name, 'r') as file:
+        return _read_group(file)
 
 
 def load_from_h5(network_params={}, param_keys=[], input_name=''):
@@ -239,8 +665,8 @@ def load_from_h5(network_params={}, param_keys=[], input_name=''):
 
     # try to load file with standard name
     try:
-        input_file = h5.load(input_name)
-    # if not existing OSError is raised by h5py_wrapper, then return empty dict
+        input_file = _read_h5(input_name)
+    # if not existing OSError is raised by h5py, then return empty dict
     except OSError:
         return {}, {}
 
@@ -261,7 +687,7 @@ def load_h5(filename):
         default filename format is ''<label>_<hash>.h5'
     """
     try:
-        raw_data = h5.load(filename)
+        raw_data = _read_h5(filename)
     except OSError:
         raw_data = {}
 
@@ -269,3 +695,176 @@ def load_h5(filename):
     for key in sorted(raw_data.keys()):
         data[key] = val_unit_to_quantities(raw_data[key])
     return data
+
+
+class LazyDataset(object):
+    """
+    Array stored in h5 file, read only when indexed.
+
+    Indexing, e.g. dataset[:, 0] for one population, reads only the
+    requested part from disk and applies the unit, if any. Contiguous
+    uncompressed datasets are memory-mapped instead of being read through
+    h5py. The memory map is released by close, which LazyH5 calls for all
+    datasets it has handed out when it is closed itself.
+
+    Parameters:
+    -----------
+    dataset: h5py.Dataset
+        Dataset containing the magnitudes.
+    unit: str or None
+        Unit of the data.
+    """
+
+    def __init__(self, dataset, unit=None):
+        self._dataset = dataset
+        self.units = None if unit is None else parse_unit(unit).units
+        self._memmap = None
+        offset = dataset.id.get_offset()
+        if (dataset.chunks is None and dataset.compression is None
+                and offset is not None and dataset.dtype.kind in 'biufc'):
+            self._memmap = np.memmap(dataset.file.filename, mode='r',
+                                     dtype=dataset.dtype, offset=offset,
+                                     shape=dataset.shape)
+
+    @property
+    def shape(self):
+        return self._dataset.shape
+
+    @property
+    def ndim(self):
+        return self._dataset.ndim
+
+    @property
+    def dtype(self):
+        return self._dataset.dtype
+
+    @property
+    def is_memmapped(self):
+        return self._memmap is not None
+
+    def __len__(self):
+        return len(self._dataset)
+
+    def __getitem__(self, index):
+        if self._memmap is not None:
+            data = np.array(self._memmap[index])
+        else:
+            data = self._dataset[index]
+        if self.units is None:
+            return data
+        return ureg.Quantity(data, self.units)
+
+    def __array__(self, dtype=None):
+        return np.asarray(self[()], dtype=dtype)
+
+    def read(self):
+        """ Read the whole dataset. """
+        return self[()]
+
+    def close(self):
+        """ Release the memory map, if any. """
+        # indexing returns copies, such that no other references exist
+        self._memmap = None
+
+    def __repr__(self):
+        return '<LazyDataset shape={} dtype={} units={}>'.format(
+            self.shape, self.dtype, self.units)
+
+
+class LazyH5(collections.abc.Mapping):
+    """
+    Read-only, dict-like view of an h5 file written by write_h5 or by
+    h5py_wrapper.
+
+    Entries are read only on access. Groups are returned as views
+    themselves, arrays as LazyDataset and all other entries, e.g. numbers or
+    strings, are read and converted directly. The file is kept open until
+    close is called, or the view is used as a context manager.
+
+    Parameters:
+    -----------
+    group: h5py.Group
+        Group or file the view gives access to.
+    """
+
+    def __init__(self, group, _datasets=None):
+        self._group = group
+        self._keys = {_evaluate_key(name, obj): name
+                      for name, obj in group.items()}
+        # datasets handed out by this view and its subgroups
+        self._datasets = weakref.WeakSet() if _datasets is None else _datasets
+
+    def _lazy_dataset(self, dataset, unit):
+        lazy = LazyDataset(dataset, unit)
+        self._datasets.add(lazy)
+        return lazy
+
+    def __getitem__(self, key):
+        obj = self._group[self._keys[key]]
+        if isinstance(obj, h5py.Group):
+            # quantities stored as val-unit pairs by h5py_wrapper
+            if set(obj.keys()) == {'val', 'unit'}:
+                unit = _read_dataset(obj['unit'])
+                if obj['val'].ndim == 0:
+                    return _read_dataset(obj['val']) * parse_unit(unit)
+                return self._lazy_dataset(obj['val'], unit)
+            view = LazyH5(obj, self._datasets)
+            if _is_list_group(obj):
+                return [view[position] for position in sorted(view)]
+            return view
+        if obj.ndim > 0 and 'custom_shape' not in obj.attrs:
+            value_type = obj.attrs.get('_value_type', 'ndarray')
+            if isinstance(value_type, bytes):
+                value_type = value_type.decode('utf-8')
+            # lists are converted to arrays as in val_unit_to_quantities
+            if value_type in ('ndarray', 'list') and obj.dtype.kind != 'S':
+                unit = obj.attrs.get('unit')
+                return self._lazy_dataset(obj, unit)
+        return _read_dataset(obj)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def close(self):
+        """ Release the memory maps and close the underlying file. """
+        for dataset in list(self._datasets):
+            dataset.close()
+        self._datasets.clear()
+        self._group.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def load_h5_lazy(filename):
+    """
+    Open h5 file for lazy reading.
+
+    In contrast to load_h5, nothing is read when opening the file. Each
+    entry is read when it is accessed, and arrays only in the requested
+    parts, e.g.
+        with load_h5_lazy(filename) as data:
+            rates = data['results']['firing_rates'][2]
+
+    Parameters:
+    -----------
+    filename: str
+        default filename format is ''<label>_<hash>.h5'
+
+    Returns:
+    --------
+    LazyH5
+        Dict-like view of the file.
+
+    Raises:
+    -------
+    OSError
+        If file does not exist or cannot be opened.
+    """
+    return LazyH5(h5py.File(filename, 'r'))
@@ -12,11 +12,22 @@ standard_deviation
 transfer_function_1p_taylor
 transfer_function_1p_shift
 transfer_function
+transfer_function_empirical
+transfer_function_laplace
+effective_connectivity_laplace
+count_unstable_modes
 delay_dist_matrix
 delay_dist_matrix_single
 sensitivity_measure
 power_spectra
+cross_spectra
+covariance_functions
+coherence
+phase_spectra
+pack_hermitian
+unpack_hermitian
 eigen_spectra
+leading_modes
 additional_rates_for_fixed_input
 fit_transfer_function
 effective_coupling_strength
@@ -26,36 +37,62 @@ xi_of_k
 solve_chareq_rate_boxcar
 _standard_deviation
 _mean
+_firing_rates_ensemble
+_mean_ensemble
+_standard_deviation_ensemble
+_transfer_function_1p_shift
+_transfer_function_empirical
+_transfer_function_ensemble
+_d_transfer_function_1p_shift_d_omega
+_transfer_function_laplace
+_effective_connectivity_laplace
+_delay_dist_matrix_laplace
+_delay_dist_matrix_ensemble
 _effective_connectivity
 _effective_connectivity_rate
-_lambda_of_alpha_integral
-_d_lambda_d_alpha
+_power_spectra_ensemble
+_analysed_matrix
+_select_modes
+_leading_modes_arnoldi
+_lambda_of_alpha_continuation
+_chareq_alpha
 _xi_eff_s
 _xi_eff_r
 _d_xi_eff_s_d_lambda
 _d_xi_eff_r_d_lambda
-_solve_chareq_numerically_alpha
 """
 from __future__ import print_function
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pint
 import scipy.optimize as sopt
-import scipy.integrate as sint
-import scipy.misc as smisc
-from scipy.special import zetac, erf
+import scipy.sparse.linalg as slinalg
+from scipy.special import zetac, erf, erfcx
 
 
 from . import ureg
 from . import aux_calcs
+from . import profiling
+from .progress import step
 
+# largest dimension for which leading modes are found by a full
+# eigendecomposition instead of shift-invert Arnoldi iteration
+LEADING_MODES_DENSE_DIMENSION = 100
+
+@profiling.profiled
 @ureg.wraps(ureg.Hz, (None, ureg.s, ureg.s, ureg.s, ureg.mV, ureg.mV, None,
-                      ureg.mV, ureg.mV, ureg.Hz, None, None, ureg.Hz, ureg.Hz))
+                      ureg.mV, ureg.mV, ureg.Hz, None, None, ureg.Hz, ureg.Hz,
+                      None, None))
 def firing_rates(dimension, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, K, J, j,
-                 nu_ext, K_ext, g, nu_e_ext, nu_i_ext):
+                 nu_ext, K_ext, g, nu_e_ext, nu_i_ext, nu_0=None, cache=None):
     '''
     Returns vector of population firing rates in Hz.
 
+    The iteration starts from the initial guess nu_0. If no guess is given,
+    the working point of the nearest parameter set stored in cache is used,
+    or zero rates if there is none. Each solution is recorded in the cache.
+
     Parameters:
     -----------
     dimension: int
@@ -86,6 +123,10 @@ def firing_rates(dimension, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, K, J, j,
         firing rate of additional external excitatory Poisson input
     nu_i_ext: Quantity(float, 'hertz')
         firing rate of additional external inhibitory Poisson input
+    nu_0: Quantity(np.ndarray, 'hertz')
+        Initial guess of the firing rates.
+    cache: WorkingPointCache
+        Cache supplying and recording working points.
 
     Returns:
     --------
@@ -110,20 +151,35 @@ def firing_rates(dimension, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, K, J, j,
 
         return -nu + new_nu
 
+    cache_params = (tau_m, tau_s, tau_r, V_0_rel, V_th_rel, K, J, j, nu_ext,
+                    K_ext, g, nu_e_ext, nu_i_ext)
+    if nu_0 is not None:
+        nu_0 = nu_0.to(ureg.Hz).magnitude
+    elif cache is not None:
+        nu_0 = cache.lookup(cache_params)
+
     # do iteration procedure, until stationary firing rates are found
     dt = 0.05
     y = np.zeros((2, int(dimension)))
+    if nu_0 is not None:
+        y[0] = nu_0
     eps = 1.0
+    n_iterations = 0
     while eps >= 1e-5:
         delta_y = get_rate_difference(y[0])
         y[1] = y[0] + delta_y*dt
         epsilon = (y[1] - y[0])
         eps = max(np.abs(epsilon))
         y[0] = y[1]
+        n_iterations += 1
+
+    if cache is not None:
+        cache.store(cache_params, y[1], n_iterations)
 
     return y[1]
 
 
+@profiling.profiled
 @ureg.wraps(ureg.mV, (ureg.Hz, None, ureg.mV, ureg.mV, ureg.s, ureg.Hz, None,
                       None, ureg.Hz, ureg.Hz))
 def mean(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext):
@@ -177,6 +233,7 @@ def _mean(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext):
     return m
 
 
+@profiling.profiled
 @ureg.wraps(ureg.mV, (ureg.Hz, None, ureg.mV, ureg.mV, ureg.s, ureg.Hz, None,
                       None, ureg.Hz, ureg.Hz))
 def standard_deviation(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext):
@@ -232,6 +289,83 @@ def _standard_deviation(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext
     return sigma
 
 
+def _mean_ensemble(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext,
+                   nu_i_ext):
+    """
+    Compute mean() for an ensemble of networks without quantities.
+
+    All arguments are stacked along a leading ensemble axis. Scalar
+    parameters of the networks have shape (n_networks, 1), rates and vectors
+    (n_networks, dimension) and matrices (n_networks, dimension, dimension).
+    """
+    m0 = tau_m * np.einsum('nij,nj->ni', K * J, nu)
+    m_ext = tau_m * j * K_ext * nu_ext
+    m_ext_add = tau_m * j * (nu_e_ext - g * nu_i_ext)
+    return m0 + m_ext + m_ext_add
+
+
+def _standard_deviation_ensemble(nu, K, J, j, tau_m, nu_ext, K_ext, g,
+                                 nu_e_ext, nu_i_ext):
+    """
+    Compute standard_deviation() for an ensemble of networks without
+    quantities, see _mean_ensemble for the shapes of the arguments.
+    """
+    var0 = tau_m * np.einsum('nij,nj->ni', K * J**2, nu)
+    var_ext = tau_m * j**2 * K_ext * nu_ext
+    var_ext_add = tau_m * j**2 * (nu_e_ext + g**2 * nu_i_ext)
+    return np.sqrt(var0 + var_ext + var_ext_add)
+
+
+def _firing_rates_ensemble(tau_m, tau_s, tau_r, V_0_rel, V_th_rel, K, J, j,
+                           nu_ext, K_ext, g, nu_e_ext, nu_i_ext, nu_0=None):
+    """
+    Compute firing_rates() for an ensemble of networks without quantities.
+
+    The iteration of firing_rates is run for all networks at once, with the
+    stationary rates of all populations evaluated by
+    aux_calcs.nu0_fb433_array. Each network leaves the iteration as soon as
+    its own rates have converged, with the convergence criterion of
+    firing_rates.
+
+    Parameters:
+    -----------
+    tau_m, tau_s, ..., nu_i_ext: np.ndarray
+        Parameters of firing_rates in s, mV and Hz, stacked along a leading
+        ensemble axis, see _mean_ensemble for the shapes.
+    nu_0: np.ndarray
+        Initial guesses of the firing rates in Hz, of shape (n_networks,
+        dimension). Zero if not given.
+
+    Returns:
+    --------
+    np.ndarray
+        Firing rates in Hz, of shape (n_networks, dimension).
+    np.ndarray
+        Number of iteration steps of each network.
+    """
+    params = (K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext)
+    n_networks, dimension = K_ext.shape
+    nu = np.zeros((n_networks, dimension))
+    if nu_0 is not None:
+        nu[:] = nu_0
+    n_iterations = np.zeros(n_networks, dtype=int)
+    dt = 0.05
+    active = np.arange(n_networks)
+    while active.size:
+        # parameters of the networks that have not converged yet
+        active_params = [param[active] for param in params]
+        mu = _mean_ensemble(nu[active], *active_params)
+        sigma = _standard_deviation_ensemble(nu[active], *active_params)
+        new_nu = aux_calcs.nu0_fb433_array(tau_m[active], tau_s[active],
+                                           tau_r[active], V_th_rel[active],
+                                           V_0_rel[active], mu, sigma)
+        step = (new_nu - nu[active]) * dt
+        nu[active] += step
+        n_iterations[active] += 1
+        active = active[np.max(np.abs(step), axis=1) >= 1e-5]
+    return nu, n_iterations
+
+
 @ureg.wraps(ureg.Hz/ureg.mV, (ureg.mV, ureg.mV, ureg.s, ureg.s, ureg.s,
                               ureg.mV, ureg.mV, ureg.Hz))
 def transfer_function_1p_taylor(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
@@ -285,15 +419,79 @@ def transfer_function_1p_taylor(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
         alpha = np.sqrt(2) * abs(zetac(0.5) + 1)
         k = np.sqrt(tau_s / tau_m)
         A = alpha * tau_m * nu0 * k / np.sqrt(2)
-        a0 = aux_calcs.Psi_x_r(z, x_t, x_r)
-        a1 = aux_calcs.dPsi_x_r(z, x_t, x_r) / a0
-        a3 = A / tau_m / nu0_fb * (-a1**2 + aux_calcs.d2Psi_x_r(z, x_t, x_r)/a0)
+        a0, d_a0, d2_a0 = aux_calcs.Psi_x_r_derivatives(z, x_t, x_r)
+        a1 = d_a0 / a0
+        a3 = A / tau_m / nu0_fb * (-a1**2 + d2_a0/a0)
         result = (np.sqrt(2.) / sigma * nu0_fb / complex(1., omega * tau_m)* (a1 + a3))
 
     # additional low-pass filter due to perturbation to the input current
     return result / complex(1., omega * tau_s)
 
 
+def _d_transfer_function_1p_shift_d_omega(mu, sigma, tau_m, tau_s, tau_r,
+                                          V_th_rel, V_0_rel, omega):
+    """
+    Derivative of _transfer_function_1p_shift() with respect to omega.
+
+    The derivative is computed for complex omega by the chain rule. The
+    derivatives of the parabolic cylinder functions with respect to their
+    first argument z = -1/2 + i omega tau_m are computed by a central
+    difference in z, see aux_calcs.Psi_x_r_derivatives_d_z, with a relative
+    error of about 1e-10. At omega = 0 the transfer function is only
+    defined as a limit, hence the expression is not valid there.
+
+    Parameters:
+    -----------
+    mu: float
+        Mean input in mV.
+    sigma: float
+        Standard deviation of input in mV.
+    tau_m: float
+        Membrane time constant in s.
+    tau_s: float
+        Synaptic time constant in s.
+    tau_r: float
+        Refractory time in s.
+    V_th_rel: float
+        Relative threshold potential in mV.
+    V_0_rel: float
+        Relative reset potential in mV.
+    omega: complex
+        Input frequency in Hz.
+
+    Returns:
+    --------
+    complex:
+        Derivative in s/mV.
+    """
+    # effective threshold and reset
+    alpha = np.sqrt(2) * abs(zetac(0.5) + 1)
+    V_th_rel += sigma * alpha / 2. * np.sqrt(tau_s / tau_m)
+    V_0_rel += sigma * alpha / 2. * np.sqrt(tau_s / tau_m)
+
+    nu = aux_calcs.nu_0(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
+
+    x_t = np.sqrt(2.) * (V_th_rel - mu) / sigma
+    x_r = np.sqrt(2.) * (V_0_rel - mu) / sigma
+    z = complex(-0.5, complex(omega * tau_m))
+
+    # tf = prefactor * low_pass * frac with frac = nominator / denominator
+    denominator, nominator = aux_calcs.Psi_x_r_derivatives(z, x_t, x_r,
+                                                           order=1)
+    frac = nominator / denominator
+    d_denominator_d_z, d_nominator_d_z = aux_calcs.Psi_x_r_derivatives_d_z(
+        z, x_t, x_r)
+    d_frac_d_z = (d_nominator_d_z - frac * d_denominator_d_z) / denominator
+
+    low_pass = 1. / (complex(1., omega * tau_m) * complex(1., omega * tau_s))
+    d_log_low_pass_d_omega = (- 1j * tau_m / complex(1., omega * tau_m)
+                              - 1j * tau_s / complex(1., omega * tau_s))
+
+    # dz / domega = i tau_m
+    return (np.sqrt(2.) / sigma * nu * low_pass
+            * (d_log_low_pass_d_omega * frac + 1j * tau_m * d_frac_d_z))
+
+
 @ureg.wraps(ureg.Hz/ureg.mV, (ureg.mV, ureg.mV, ureg.s, ureg.s, ureg.s, ureg.mV,
                               ureg.mV, ureg.Hz))
 def transfer_function_1p_shift(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
@@ -359,7 +557,9 @@ def _transfer_function_1p_shift(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
         x_r = np.sqrt(2.) * (V_0_rel - mu) / sigma
         z = complex(-0.5, complex(omega * tau_m))
 
-        frac = aux_calcs.dPsi_x_r(z, x_t, x_r) / aux_calcs.Psi_x_r(z, x_t, x_r)
+        Psi_x_r, dPsi_x_r = aux_calcs.Psi_x_r_derivatives(z, x_t, x_r,
+                                                          order=1)
+        frac = dPsi_x_r / Psi_x_r
 
         result = (np.sqrt(2.) / sigma * nu
                   / (1. + complex(0., complex(omega*tau_m))) * frac)
@@ -368,12 +568,16 @@ def _transfer_function_1p_shift(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
     return result / complex(1., omega * tau_s)
 
 
+@profiling.profiled
 def transfer_function(mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
-                      dimension, omegas, method='shift'):
+                      dimension, omegas, method='shift', progress=None,
+                      cancel=None):
     """
     Returns transfer functions for all populations based on
     transfer_function_1p_shift() (default) or transfer_function_1p_taylor()
 
+    Progress is reported and cancellation is checked after each frequency.
+
     Parameters:
     -----------
     mu: Quantity(float, 'millivolt')
@@ -396,6 +600,12 @@ def transfer_function(mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
         Input frequencies to population.
     method: str
         String specifying transfer function to use ('shift', 'taylor').
+    progress: callable
+        Called as progress(done, total) with the number of completed
+        frequencies.
+    cancel: progress.CancellationToken
+        Token for cancelling the computation, which then raises
+        progress.ComputationCancelled.
 
     Returns:
     --------
@@ -406,17 +616,18 @@ def transfer_function(mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
     """
 
     if method == 'shift':
-        transfer_functions = [[transfer_function_1p_shift(mu[i], sigma[i], tau_m,
-                                                          tau_s, tau_r, V_th_rel,
-                                                          V_0_rel, omega)
-                               for i in range(dimension)]
-                              for omega in omegas]
+        transfer_function_1p = transfer_function_1p_shift
     if method == 'taylor':
-        transfer_functions = [[transfer_function_1p_taylor(mu[i], sigma[i], tau_m,
-                                                          tau_s, tau_r, V_th_rel,
-                                                          V_0_rel, omega)
-                               for i in range(dimension)]
-                              for omega in omegas]
+        transfer_function_1p = transfer_function_1p_taylor
+
+    transfer_functions = []
+    step(0, len(omegas), progress, cancel)
+    for omega in omegas:
+        transfer_functions.append(
+            [transfer_function_1p(mu[i], sigma[i], tau_m, tau_s, tau_r,
+                                  V_th_rel, V_0_rel, omega)
+             for i in range(dimension)])
+        step(len(transfer_functions), len(omegas), progress, cancel)
 
 
     # convert list of list of quantities to list of quantities containing np.ndarray
@@ -426,6 +637,421 @@ def transfer_function(mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
 
     return tf_magnitudes * tf_unit
 
+
+@profiling.profiled
+@ureg.wraps(ureg.Hz/ureg.mV, (ureg.s, ureg.Hz/ureg.mV, None, ureg.Hz))
+def transfer_function_empirical(tau_impulse, delta_f, dimension, omegas):
+    """
+    Transfer functions of all populations approximated by first-order
+    low-pass filters.
+
+    The response of each population to an incoming impulse is modelled by an
+    instantaneous rate jump delta_f decaying with time constant tau_impulse,
+    which gives H(omega) = delta_f / (1 + i omega tau_impulse). It is
+    evaluated for all frequencies and populations at once. Scalar
+    parameters are shared by all populations.
+
+    Parameters:
+    -----------
+    tau_impulse: Quantity(float or np.ndarray, 'millisecond')
+        Time constants of the impulse responses of all populations.
+    delta_f: Quantity(float or np.ndarray, 'hertz/millivolt')
+        Instantaneous rate jumps of all populations.
+    dimension: int
+        Number of populations.
+    omegas: Quantity(np.ndarray, 'hertz')
+        Input frequencies to population.
+
+    Returns:
+    --------
+    Quantity(np.ndarray, 'hertz/millivolt')
+        Transfer functions with shape (len(omegas), dimension).
+    """
+    return _transfer_function_empirical(tau_impulse, delta_f, dimension,
+                                        omegas)
+
+
+def _transfer_function_empirical(tau_impulse, delta_f, dimension, omegas):
+    """
+    Compute transfer_function_empirical() without quantities, with
+    tau_impulse in s, delta_f in Hz/mV and omegas in Hz.
+
+    Leading axes of tau_impulse and delta_f, e.g. for an ensemble of
+    networks, are kept in front of the frequency axis.
+    """
+    omegas = np.atleast_1d(omegas)[:, np.newaxis]
+    tf = delta_f / (1 + 1j * omegas * tau_impulse)
+    return np.broadcast_to(tf, tf.shape[:-1] + (dimension,)).copy()
+
+
+def _transfer_function_ensemble(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
+                                V_0_rel, omegas):
+    """
+    Compute transfer_function() with method 'shift' for an ensemble of
+    networks without quantities.
+
+    The stationary rates and the transfer function at frequency zero are
+    evaluated for all populations of all networks at once. The parabolic
+    cylinder functions are evaluated for each population, network and
+    frequency, as in _transfer_function_1p_shift.
+
+    Parameters:
+    -----------
+    mu, sigma: np.ndarray
+        Mean and standard deviation of the inputs in mV, of shape
+        (n_networks, dimension).
+    tau_m, tau_s, tau_r, V_th_rel, V_0_rel: np.ndarray
+        Parameters in s and mV of shape (n_networks, 1).
+    omegas: np.ndarray
+        Angular frequencies in Hz, equal for all networks.
+
+    Returns:
+    --------
+    np.ndarray
+        Transfer functions in Hz/mV, of shape (n_networks, len(omegas),
+        dimension).
+    """
+    # effective threshold and reset
+    alpha = np.sqrt(2) * abs(zetac(0.5) + 1)
+    shift = sigma * alpha / 2. * np.sqrt(tau_s / tau_m)
+    V_th_shift = V_th_rel + shift
+    V_0_shift = V_0_rel + shift
+
+    nu = aux_calcs.nu_0_array(tau_m, tau_r, V_th_shift, V_0_shift, mu, sigma)
+    x_t = np.sqrt(2.) * (V_th_shift - mu) / sigma
+    x_r = np.sqrt(2.) * (V_0_shift - mu) / sigma
+
+    n_networks, dimension = mu.shape
+    result = np.empty((n_networks, len(omegas), dimension), dtype=complex)
+    for k, omega in enumerate(omegas):
+        if np.abs(omega - 0.) < 1e-15:
+            # derivative of f-I-curve, see aux_calcs.d_nu_d_mu
+            y_th = (V_th_shift - mu) / sigma
+            y_r = (V_0_shift - mu) / sigma
+            result[:, k] = (np.sqrt(np.pi) * tau_m * nu**2 / sigma
+                            * (erfcx(-y_th) - erfcx(-y_r)))
+            continue
+        frac = np.empty((n_networks, dimension), dtype=complex)
+        for n in range(n_networks):
+            z = complex(-0.5, omega * tau_m[n, 0])
+            for i in range(dimension):
+                Psi_x_r, dPsi_x_r = aux_calcs.Psi_x_r_derivatives(
+                    z, x_t[n, i], x_r[n, i], order=1)
+                frac[n, i] = dPsi_x_r / Psi_x_r
+        result[:, k] = (np.sqrt(2.) / sigma * nu
+                        / (1. + 1j * omega * tau_m) * frac)
+
+    # additional low-pass filter due to perturbation to the input current
+    return result / (1. + 1j * np.asarray(omegas)[np.newaxis, :, np.newaxis]
+                     * tau_s[:, :, np.newaxis])
+
+
+@profiling.profiled
+@ureg.wraps(ureg.Hz/ureg.mV, (ureg.mV, ureg.mV, ureg.s, ureg.s, ureg.s, ureg.mV,
+                              ureg.mV, None, (1/ureg.s).units))
+def transfer_function_laplace(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
+                              V_0_rel, dimension, lambdas):
+    """
+    Transfer functions of all populations at complex frequencies lambda.
+
+    Evaluates transfer_function_1p_shift() continued to the complex plane,
+    with lambda = i omega, for arrays of lambda of arbitrary shape. The
+    firing rates entering the prefactor are computed only once per
+    population, but Psi_x_r is still evaluated for each lambda separately,
+    such that the cost grows linearly with the number of lambdas.
+
+    The expression is analytic in lambda except for poles at
+    lambda = -1/tau_m, lambda = -1/tau_s and at the zeros of Psi_x_r. It is
+    reliable for Re(lambda) > -1/tau_m. Further to the left the parabolic
+    cylinder functions become hard to evaluate. Since the shift of threshold
+    and reset is an expansion in sqrt(tau_s/tau_m), the result is only
+    accurate for |lambda tau_s| << 1.
+
+    Parameters:
+    -----------
+    mu: Quantity(np.ndarray, 'millivolt')
+        Mean input of each population.
+    sigma: Quantity(np.ndarray, 'millivolt')
+        Standard deviation of input of each population.
+    tau_m: Quantity(float, 'millisecond')
+        Membrane time constant.
+    tau_s: Quantity(float, 'millisecond')
+        Synaptic time constant.
+    tau_r: Quantity(float, 'millisecond')
+        Refractory time.
+    V_th_rel: Quantity(float, 'millivolt')
+        Relative threshold potential.
+    V_0_rel: Quantity(float, 'millivolt')
+        Relative reset potential.
+    dimension: int
+        Number of populations.
+    lambdas: Quantity(np.ndarray, '1/s')
+        Complex frequencies of arbitrary shape.
+
+    Returns:
+    --------
+    Quantity(np.ndarray, 'hertz/millivolt')
+        Transfer functions with shape lambdas.shape + (dimension,).
+    """
+    return _transfer_function_laplace(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
+                                      V_0_rel, dimension, lambdas)
+
+
+def _transfer_function_laplace(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
+                               V_0_rel, dimension, lambdas):
+    """
+    Compute transfer_function_laplace() without quantities.
+
+    Psi_x_r_derivatives() only accepts a scalar z and is wrapped in
+    np.vectorize, which is a Python loop over all lambdas, not a vectorized
+    evaluation.
+    """
+    lambdas = np.asarray(lambdas, dtype=complex)
+    mu = np.broadcast_to(mu, (dimension,))
+    sigma = np.broadcast_to(sigma, (dimension,))
+
+    Psi_x_r_derivatives = np.vectorize(aux_calcs.Psi_x_r_derivatives,
+                                       otypes=[complex, complex],
+                                       excluded={'order'})
+
+    # effective threshold and reset
+    alpha = np.sqrt(2) * abs(zetac(0.5) + 1)
+    z = -0.5 + lambdas * tau_m
+    is_zero = np.abs(lambdas) < 1e-15
+    # the limit for lambda = 0 is evaluated separately below
+    z_nonzero = np.where(is_zero, 0.5, z)
+
+    transfer_functions = np.zeros(lambdas.shape + (dimension,), dtype=complex)
+    for i in range(dimension):
+        V_th_shift = V_th_rel + sigma[i] * alpha / 2. * np.sqrt(tau_s / tau_m)
+        V_0_shift = V_0_rel + sigma[i] * alpha / 2. * np.sqrt(tau_s / tau_m)
+
+        nu = aux_calcs.nu_0(tau_m, tau_r, V_th_shift, V_0_shift, mu[i],
+                            sigma[i])
+
+        x_t = np.sqrt(2.) * (V_th_shift - mu[i]) / sigma[i]
+        x_r = np.sqrt(2.) * (V_0_shift - mu[i]) / sigma[i]
+        Psi_x_r, dPsi_x_r = Psi_x_r_derivatives(z_nonzero, x_t, x_r, order=1)
+        frac = dPsi_x_r / Psi_x_r
+        tf = np.sqrt(2.) / sigma[i] * nu / (1. + lambdas * tau_m) * frac
+
+        # for frequency zero the exact expression is given by the derivative
+        # of f-I-curve
+        tf[is_zero] = aux_calcs.d_nu_d_mu(tau_m, tau_r, V_th_shift, V_0_shift,
+                                          mu[i], sigma[i])
+
+        # additional low-pass filter due to perturbation to the input current
+        transfer_functions[..., i] = tf / (1. + lambdas * tau_s)
+    return transfer_functions
+
+
+@profiling.profiled
+@ureg.wraps(ureg.dimensionless, (ureg.mV, ureg.mV, ureg.s, ureg.s, ureg.s,
+                                 ureg.mV, ureg.mV, ureg.mV, None, None,
+                                 ureg.s, ureg.s, None, (1/ureg.s).units))
+def effective_connectivity_laplace(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
+                                   V_0_rel, J, K, dimension, Delay, Delay_sd,
+                                   delay_dist, lambdas):
+    """
+    Effective connectivity matrices at complex frequencies lambda.
+
+    The effective connectivity includes the transfer functions obtained from
+    transfer_function_laplace() and the delay distribution continued to
+    complex frequencies. The same range of validity applies.
+
+    Parameters:
+    -----------
+    mu: Quantity(np.ndarray, 'millivolt')
+        Mean input of each population.
+    sigma: Quantity(np.ndarray, 'millivolt')
+        Standard deviation of input of each population.
+    tau_m: Quantity(float, 'millisecond')
+        Membrane time constant.
+    tau_s: Quantity(float, 'millisecond')
+        Synaptic time constant.
+    tau_r: Quantity(float, 'millisecond')
+        Refractory time.
+    V_th_rel: Quantity(float, 'millivolt')
+        Relative threshold potential.
+    V_0_rel: Quantity(float, 'millivolt')
+        Relative reset potential.
+    J: Quantity(np.ndarray, 'millivolt')
+        Weight matrix.
+    K: np.ndarray
+        Indegree matrix.
+    dimension: int
+        Number of populations.
+    Delay: Quantity(np.ndarray, 's')
+        Delay matrix.
+    Delay_sd: Quantity(np.ndarray, 's')
+        Delay standard deviation matrix.
+    delay_dist: str
+        String specifying delay distribution.
+    lambdas: Quantity(np.ndarray, '1/s')
+        Complex frequencies of arbitrary shape.
+
+    Returns:
+    --------
+    Quantity(np.ndarray, 'dimensionless')
+        Effective connectivity matrices with shape
+        lambdas.shape + (dimension, dimension).
+    """
+    return _effective_connectivity_laplace(mu, sigma, tau_m, tau_s, tau_r,
+                                           V_th_rel, V_0_rel, J, K, dimension,
+                                           Delay, Delay_sd, delay_dist,
+                                           lambdas)
+
+
+def _effective_connectivity_laplace(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
+                                    V_0_rel, J, K, dimension, Delay, Delay_sd,
+                                    delay_dist, lambdas):
+    """ Compute effective_connectivity_laplace() without quantities """
+    lambdas = np.asarray(lambdas, dtype=complex)
+    tf = _transfer_function_laplace(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
+                                    V_0_rel, dimension, lambdas)
+    D = _delay_dist_matrix_laplace(Delay, Delay_sd, delay_dist, lambdas)
+    # rows of the effective connectivity are scaled by the transfer function
+    # of the postsynaptic population
+    return tau_m * J * K * tf[..., np.newaxis] * D
+
+
+def _delay_dist_matrix_laplace(Delay, Delay_sd, delay_dist, lambdas):
+    """
+    Delay distribution matrices of delay_dist_matrix_single() continued to
+    complex frequencies lambda = i omega, with shape
+    lambdas.shape + Delay.shape.
+    """
+    l = np.asarray(lambdas, dtype=complex)[..., np.newaxis, np.newaxis]
+    b1 = np.exp(-l * Delay)
+    if delay_dist == 'none':
+        return b1 * np.ones(np.shape(Delay))
+    b0 = np.exp(0.5 * np.power(Delay_sd * l, 2))
+    if delay_dist == 'gaussian':
+        return b0 * b1
+    elif delay_dist == 'truncated_gaussian':
+        a0 = 0.5 * (1 + erf((-Delay/Delay_sd + l*Delay_sd) / np.sqrt(2)))
+        a1 = 0.5 * (1 + erf((-Delay/Delay_sd) / np.sqrt(2)))
+        return (1.0-a0)/(1.0-a1)*b0*b1
+    raise ValueError('Unknown delay distribution {}.'.format(delay_dist))
+
+
+@profiling.profiled
+@ureg.wraps((None, None), (ureg.mV, ureg.mV, ureg.s, ureg.s, ureg.s, ureg.mV,
+                           ureg.mV, ureg.mV, None, None, ureg.s, ureg.s, None,
+                           (1/ureg.s).units, (1/ureg.s).units,
+                           (1/ureg.s).units, None))
+def count_unstable_modes(mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel, J,
+                         K, dimension, Delay, Delay_sd, delay_dist, min_real,
+                         max_real, max_imag, n_points=1000):
+    """
+    Counts the zeros of the characteristic function det(I - MH(lambda)) in
+    a rectangle of the right half of the complex plane.
+
+    The count follows from the argument principle: the change of the
+    argument of the characteristic function along the boundary of the
+    rectangle, divided by 2 pi. The characteristic function is evaluated on
+    the whole contour in one batched call. Since the effective connectivity
+    is real in the time domain, only the upper half of the contour is
+    evaluated and the lower half follows by complex conjugation.
+
+    The zeros are confined to a bounded region, because the effective
+    connectivity decays for large |lambda|. The rectangle has to be chosen
+    large enough to contain all of them, zeros outside are not counted. A
+    zero requires an eigenvalue of the effective connectivity equal to one.
+    Therefore, a warning is issued if the spectral radius of the effective
+    connectivity reaches one on the right or upper edge of the rectangle,
+    where zeros just outside cannot be excluded.
+
+    Parameters:
+    -----------
+    mu: Quantity(np.ndarray, 'millivolt')
+        Mean input of each population.
+    sigma: Quantity(np.ndarray, 'millivolt')
+        Standard deviation of input of each population.
+    tau_m: Quantity(float, 'millisecond')
+        Membrane time constant.
+    tau_s: Quantity(float, 'millisecond')
+        Synaptic time constant.
+    tau_r: Quantity(float, 'millisecond')
+        Refractory time.
+    V_th_rel: Quantity(float, 'millivolt')
+        Relative threshold potential.
+    V_0_rel: Quantity(float, 'millivolt')
+        Relative reset potential.
+    J: Quantity(np.ndarray, 'millivolt')
+        Weight matrix.
+    K: np.ndarray
+        Indegree matrix.
+    dimension: int
+        Number of populations.
+    Delay: Quantity(np.ndarray, 's')
+        Delay matrix.
+    Delay_sd: Quantity(np.ndarray, 's')
+        Delay standard deviation matrix.
+    delay_dist: str
+        String specifying delay distribution.
+    min_real: Quantity(float, '1/s')
+        Left edge of the rectangle, usually 0.
+    max_real: Quantity(float, '1/s')
+        Right edge of the rectangle.
+    max_imag: Quantity(float, '1/s')
+        The rectangle extends from -max_imag to max_imag.
+    n_points: int
+        Number of evaluation points on the upper half of the contour.
+
+    Returns:
+    --------
+    n_unstable: int
+        Number of zeros within the rectangle.
+    error: float
+        Error estimate of the count, which should be well below 0.5. It is
+        the larger of the change of the winding number when only every
+        second point is used and the largest phase step between neighbouring
+        points in units of pi. Large phase steps indicate that the contour
+        is undersampled or passes close to a zero.
+    """
+    # upper half of the contour, counterclockwise from the real axis
+    lengths = np.array([max_imag, max_real - min_real, max_imag])
+    n_edges = np.maximum((n_points * lengths / np.sum(lengths)).astype(int), 2)
+    right = max_real + 1j * np.linspace(0, max_imag, n_edges[0],
+                                        endpoint=False)
+    top = np.linspace(max_real, min_real, n_edges[1], endpoint=False) \
+        + 1j * max_imag
+    left = min_real + 1j * np.linspace(max_imag, 0, n_edges[2])
+    upper = np.concatenate([right, top, left])
+
+    MH = _effective_connectivity_laplace(mu, sigma, tau_m, tau_s, tau_r,
+                                         V_th_rel, V_0_rel, J, K, dimension,
+                                         Delay, Delay_sd, delay_dist, upper)
+    char_func = np.linalg.det(np.eye(dimension) - MH)
+    profiling.count('det', len(upper))
+
+    # outer edges, where the effective connectivity should have decayed
+    outer = MH[:n_edges[0] + n_edges[1]]
+    spectral_radius = np.max(np.abs(np.linalg.eigvals(outer)))
+    if spectral_radius >= 1:
+        warnings.warn('Spectral radius of the effective connectivity is {:.3g} '
+                      'on the outer edges of the contour. Unstable modes '
+                      'beyond max_real or max_imag may be missed.'.format(
+                          spectral_radius))
+
+    # close the contour through the lower half
+    char_func = np.concatenate([char_func, np.conj(char_func[::-1])])
+
+    def phases(values):
+        return np.unwrap(np.angle(np.append(values, values[0])))
+
+    phases_fine = phases(char_func)
+    phases_coarse = phases(char_func[::2])
+    winding = (phases_fine[-1] - phases_fine[0]) / (2 * np.pi)
+    winding_coarse = (phases_coarse[-1] - phases_coarse[0]) / (2 * np.pi)
+
+    n_unstable = int(np.round(winding))
+    error = max(abs(winding - winding_coarse),
+                np.max(np.abs(np.diff(phases_fine))) / np.pi)
+    return n_unstable, error
+
+
 @ureg.wraps(ureg.dimensionless, (None, ureg.s, ureg.s, None, ureg.Hz))
 def delay_dist_matrix_single(dimension, Delay, Delay_sd, delay_dist, omega):
     '''
@@ -475,6 +1101,7 @@ def delay_dist_matrix_single(dimension, Delay, Delay_sd, delay_dist, omega):
         return b0*b1
 
 
+@profiling.profiled
 def delay_dist_matrix(dimension, Delay, Delay_sd, delay_dist, omegas):
     """ Calculates delay distribution matrices for all omegas. """
     ddms = [delay_dist_matrix_single(dimension, Delay, Delay_sd,
@@ -488,6 +1115,46 @@ def delay_dist_matrix(dimension, Delay, Delay_sd, delay_dist, omegas):
     return delay_dist_matrices * ddm_unit
 
 
+def _delay_dist_matrix_ensemble(Delay, Delay_sd, delay_dist, omegas):
+    """
+    Compute delay_dist_matrix() for an ensemble of networks without
+    quantities.
+
+    Parameters:
+    -----------
+    Delay, Delay_sd: np.ndarray
+        Delay matrices and their standard deviations in s, of shape
+        (n_networks, dimension, dimension).
+    delay_dist: str
+        Delay distribution, equal for all networks.
+    omegas: np.ndarray
+        Angular frequencies in Hz, equal for all networks.
+
+    Returns:
+    --------
+    np.ndarray
+        Delay distribution matrices of shape (n_networks, len(omegas),
+        dimension, dimension).
+    """
+    omegas = np.asarray(omegas)[np.newaxis, :, np.newaxis, np.newaxis]
+    Delay = Delay[:, np.newaxis]
+    Delay_sd = Delay_sd[:, np.newaxis]
+    if delay_dist == 'none':
+        return np.exp(-1j * omegas * Delay)
+    elif delay_dist == 'truncated_gaussian':
+        a0 = 0.5 * (1 + erf((-Delay / Delay_sd + 1j * omegas * Delay_sd)
+                            / np.sqrt(2)))
+        a1 = 0.5 * (1 + erf((-Delay / Delay_sd) / np.sqrt(2)))
+        b0 = np.exp(-0.5 * np.power(Delay_sd * omegas, 2))
+        b1 = np.exp(-1j * omegas * Delay)
+        return (1.0 - a0) / (1.0 - a1) * b0 * b1
+    elif delay_dist == 'gaussian':
+        b0 = np.exp(-0.5 * np.power(Delay_sd * omegas, 2))
+        b1 = np.exp(-1j * omegas * Delay)
+        return b0 * b1
+    raise ValueError('Unknown delay distribution {}.'.format(delay_dist))
+
+
 def _effective_connectivity(omega, transfer_function, tau_m, J, K, dimension,
                             delay_term=1):
     """
@@ -548,6 +1215,7 @@ def _effective_connectivity_rate(omega, tau, W_rate, delay_term=1):
 
 
 
+@profiling.profiled
 @ureg.wraps(None, (ureg.Hz/ureg.mV, ureg.dimensionless, ureg.mV, None, ureg.s, ureg.s,
                    None, ureg.Hz))
 def sensitivity_measure(transfer_function, delay_dist_matrix, J, K, tau_m, tau_s,
@@ -585,6 +1253,8 @@ def sensitivity_measure(transfer_function, delay_dist_matrix, J, K, tau_m, tau_s
 
     e, U = np.linalg.eig(MH)
     U_inv = np.linalg.inv(U)
+    profiling.count('eig')
+    profiling.count('inv')
     index = None
     if index is None:
         # find eigenvalue closest to one
@@ -595,6 +1265,7 @@ def sensitivity_measure(transfer_function, delay_dist_matrix, J, K, tau_m, tau_s
 
     return T
 
+@profiling.profiled
 @ureg.wraps(ureg.Hz, (ureg.s, ureg.s, None, ureg.mV, None, ureg.dimensionless, None,
                    ureg.Hz, ureg.Hz/ureg.mV, ureg.Hz))
 def power_spectra(tau_m, tau_s, dimension, J, K, delay_dist_matrix, N,
@@ -605,6 +1276,9 @@ def power_spectra(tau_m, tau_s, dimension, J, K, delay_dist_matrix, N,
     See: Eq. 18 in Bos et al. (2016)
     Shape of output: (len(populations), len(omegas))
 
+    If transfer_function and delay_dist_matrix are given in single precision,
+    the propagator is still computed in double precision.
+
     Parameters:
     -----------
     tau_m: Quantity(float, 'millisecond')
@@ -642,6 +1316,7 @@ def power_spectra(tau_m, tau_s, dimension, J, K, delay_dist_matrix, N,
                                      dimension, delay_dist_matrix)
 
         Q = np.linalg.inv(np.identity(dimension)-MH)
+        profiling.count('inv')
         D = (np.diag(np.ones(dimension)) * firing_rates / N)
         C = np.dot(Q, np.dot(D, np.transpose(np.conjugate(Q))))
         spec = np.absolute(np.diag(C))
@@ -656,7 +1331,234 @@ def power_spectra(tau_m, tau_s, dimension, J, K, delay_dist_matrix, N,
     return np.transpose(power)
 
 
+@profiling.profiled
+@ureg.wraps(ureg.Hz, (ureg.s, ureg.s, None, ureg.mV, None, ureg.dimensionless, None,
+                   ureg.Hz, ureg.Hz/ureg.mV, ureg.Hz))
+def cross_spectra(tau_m, tau_s, dimension, J, K, delay_dist_matrix, N,
+                  firing_rates, transfer_function, omegas):
+    """
+    Calculates the cross-spectral matrices of all populations at given
+    frequencies.
+
+    The cross-spectral matrix C = Q D Q^H, with the propagator
+    Q = (1 - MH)^-1 and D = diag(firing_rates / N), has the power spectra
+    on its diagonal, see power_spectra. The propagators of all frequencies
+    are inverted in one batched call. As C is Hermitian, only its upper
+    triangle is returned, packed by pack_hermitian.
 
+    Parameters:
+    -----------
+    tau_m: Quantity(float, 'millisecond')
+        Membrane time constant.
+    tau_s: Quantity(float, 'millisecond')
+        Synaptic time constant.
+    dimension: int
+        Number of populations.
+    J: Quantity(np.ndarray, 'millivolt')
+        Weight matrix.
+    K: np.ndarray
+        Indegree matrix.
+    delay_dist_matrix: Quantity(np.ndarray, 'dimensionless')
+        Delay distribution matrix at given frequencies.
+    N: np.ndarray
+        Population sizes.
+    firing_rates: Quantity(np.ndarray, 'hertz')
+        Firing rates of the different populations.
+    transfer_function: Quantity(np.ndarray, 'hertz/mV')
+        Transfer_function for given frequencies omegas.
+    omegas: Quantity(np.ndarray, 'hertz')
+        Input angular frequencies to population.
+
+    Returns:
+    --------
+    Quantity(np.ndarray, 'hertz')
+        Packed cross-spectral matrices of shape
+        (len(omegas), dimension * (dimension + 1) / 2).
+    """
+    MH = (tau_m * J * K * np.asarray(transfer_function, dtype=complex)[..., np.newaxis]
+          * np.asarray(delay_dist_matrix, dtype=complex))
+    Q = np.linalg.inv(np.identity(dimension) - MH)
+    profiling.count('inv', len(Q))
+    C = np.einsum('wij,j,wkj->wik', Q, firing_rates / N, np.conjugate(Q))
+    return pack_hermitian(C)
+
+
+@profiling.profiled
+@ureg.wraps((ureg.s, ureg.Hz**2), (ureg.Hz, ureg.Hz))
+def covariance_functions(cross_spectra, omegas):
+    """
+    Calculates the cross-covariance functions of the population rates from
+    their cross spectra by an inverse real FFT.
+
+    The covariance function c_ij(tau) = int df C_ij(omega) exp(i omega tau)
+    is the covariance of the rate of population i at time t + tau with the
+    rate of population j at time t. The cross spectra need to be given at
+    the equidistant frequencies of an FFT, starting at 0. The time lags
+    range from -1/(2 df) to 1/(2 df) in steps of 1/(2 f_max), with the
+    frequency resolution df and the largest given frequency f_max. The
+    white noise part of the spectra, which does not decay at high
+    frequencies, appears as a peak at lag 0, whose integral is its spectral
+    density.
+
+    Parameters:
+    -----------
+    cross_spectra: Quantity(np.ndarray, 'hertz')
+        Packed cross-spectral matrices, see cross_spectra.
+    omegas: Quantity(np.ndarray, 'hertz')
+        Angular frequencies k * 2 * pi * df, for k = 0, 1, ...
+
+    Returns:
+    --------
+    Quantity(np.ndarray, 'second')
+        Time lags.
+    Quantity(np.ndarray, 'hertz**2')
+        Covariance functions of shape (len(time lags), dimension, dimension).
+    """
+    omegas = np.asarray(omegas)
+    if (len(omegas) < 2 or omegas[0] != 0
+            or not np.allclose(np.diff(omegas), omegas[1])):
+        raise ValueError('Covariance functions need cross spectra at '
+                         'equidistant frequencies starting at 0, i.e. '
+                         'f_min = 0.')
+    df = omegas[1] / (2 * np.pi)
+    n_times = 2 * (len(omegas) - 1)
+    C = unpack_hermitian(cross_spectra)
+    # irfft divides by n_times and continues C(-omega) = C(omega)^*
+    covariances = np.fft.irfft(C, n=n_times, axis=0) * n_times * df
+    profiling.count('irfft')
+    times = np.fft.fftfreq(n_times, d=df)
+    return np.fft.fftshift(times), np.fft.fftshift(covariances, axes=0)
+
+
+@ureg.wraps(ureg.dimensionless, ureg.Hz)
+def coherence(cross_spectra):
+    """
+    Calculates the magnitude squared coherence |C_ij|^2 / (C_ii C_jj) of
+    all pairs of populations.
+
+    Parameters:
+    -----------
+    cross_spectra: Quantity(np.ndarray, 'hertz')
+        Packed cross-spectral matrices, see cross_spectra.
+
+    Returns:
+    --------
+    Quantity(np.ndarray, 'dimensionless')
+        Coherences of shape (len(omegas), dimension, dimension).
+    """
+    C = unpack_hermitian(cross_spectra)
+    power = np.diagonal(C, axis1=-2, axis2=-1).real
+    return np.abs(C)**2 / (power[..., :, np.newaxis]
+                           * power[..., np.newaxis, :])
+
+
+@ureg.wraps(None, ureg.Hz)
+def phase_spectra(cross_spectra):
+    """
+    Calculates the phases of the cross spectra of all pairs of populations.
+
+    A positive phase of entry (i, j) means that population i leads
+    population j at that frequency.
+
+    Parameters:
+    -----------
+    cross_spectra: Quantity(np.ndarray, 'hertz')
+        Packed cross-spectral matrices, see cross_spectra.
+
+    Returns:
+    --------
+    np.ndarray
+        Phases in radians of shape (len(omegas), dimension, dimension).
+    """
+    return np.angle(unpack_hermitian(cross_spectra))
+
+
+def pack_hermitian(matrices):
+    """
+    Pack the upper triangles, including the diagonal, of Hermitian matrices.
+
+    Parameters:
+    -----------
+    matrices: np.ndarray or Quantity(np.ndarray)
+        Hermitian matrices along the last two axes.
+
+    Returns:
+    --------
+    np.ndarray or Quantity(np.ndarray)
+        Upper triangles in row-major order along the last axis.
+    """
+    rows, columns = np.triu_indices(matrices.shape[-1])
+    return matrices[..., rows, columns]
+
+
+def unpack_hermitian(packed):
+    """
+    Unpack Hermitian matrices packed by pack_hermitian.
+
+    Parameters:
+    -----------
+    packed: np.ndarray or Quantity(np.ndarray)
+        Upper triangles along the last axis.
+
+    Returns:
+    --------
+    np.ndarray or Quantity(np.ndarray)
+        Hermitian matrices along the last two axes.
+    """
+    if isinstance(packed, ureg.Quantity):
+        return unpack_hermitian(packed.magnitude) * packed.units
+    packed = np.asarray(packed)
+    dimension = int(round((np.sqrt(8 * packed.shape[-1] + 1) - 1) / 2))
+    rows, columns = np.triu_indices(dimension)
+    matrices = np.zeros(packed.shape[:-1] + (dimension, dimension),
+                        dtype=np.result_type(packed, np.complex64))
+    matrices[..., columns, rows] = np.conjugate(packed)
+    matrices[..., rows, columns] = packed
+    return matrices
+
+
+def _power_spectra_ensemble(tau_m, J, K, delay_dist_matrix, N, firing_rates,
+                            transfer_function):
+    """
+    Compute power_spectra() for an ensemble of networks without quantities.
+
+    The propagators of all networks and frequencies are inverted in one
+    batched call.
+
+    Parameters:
+    -----------
+    tau_m: np.ndarray
+        Membrane time constants in s, of shape (n_networks, 1).
+    J, K: np.ndarray
+        Weight matrices in mV and indegree matrices, of shape
+        (n_networks, dimension, dimension).
+    delay_dist_matrix: np.ndarray
+        Delay distribution matrices of shape (n_networks, n_omegas,
+        dimension, dimension).
+    N: np.ndarray
+        Population sizes of shape (n_networks, dimension).
+    firing_rates: np.ndarray
+        Firing rates in Hz of shape (n_networks, dimension).
+    transfer_function: np.ndarray
+        Transfer functions in Hz/mV of shape (n_networks, n_omegas,
+        dimension).
+
+    Returns:
+    --------
+    np.ndarray
+        Power spectra in Hz of shape (n_networks, dimension, n_omegas).
+    """
+    # effective connectivity with equal columns of the transfer function
+    MH = (tau_m[:, :, np.newaxis, np.newaxis] * (J * K)[:, np.newaxis]
+          * transfer_function[..., np.newaxis] * delay_dist_matrix)
+    dimension = MH.shape[-1]
+    Q = np.linalg.inv(np.identity(dimension) - MH)
+    profiling.count('inv', MH.shape[0] * MH.shape[1])
+    # diagonal of Q D Q^H with D = diag(firing_rates / N)
+    return np.einsum('nwij,nj->niw', np.abs(Q)**2, firing_rates / N)
+
+
+@profiling.profiled
 @ureg.wraps(None, (ureg.s, ureg.s, ureg.Hz/ureg.mV, None, None, ureg.mV, None,
                    ureg.Hz, None, None))
 def eigen_spectra(tau_m, tau_s, transfer_function, dimension,
@@ -695,6 +1597,9 @@ def eigen_spectra(tau_m, tau_s, transfer_function, dimension,
     Quantity(np.ndarray, 'dimensionless')
         Either eigenvalues corresponding to given frequencies or right or left
         eigenvectors corresponding to given frequencies.
+
+    If transfer_function and delay_dist_matrix are given in single precision,
+    the eigendecomposition is still computed in double precision.
     """
 
     def eigen_spectra_single_freq(tau_m, tau_s, transfer_function, dimension,
@@ -702,19 +1607,12 @@ def eigen_spectra(tau_m, tau_s, transfer_function, dimension,
 
         MH = _effective_connectivity(omega, transfer_function, tau_m, J, K,
                                      dimension, delay_dist_matrix).magnitude
+        M = _analysed_matrix(MH, matrix)
 
-        if matrix == 'MH':
-            eig, vr = np.linalg.eig(MH)
-            vl = np.linalg.inv(vr)
-            return eig, np.transpose(vr), vl
-
-        Q = np.linalg.inv(np.identity(dimension) - MH)
-        P = np.dot(Q, MH)
-        if matrix == 'prop':
-            eig, vr = np.linalg.eig(P)
-        elif matrix == 'prop_inv':
-            eig, vr = np.linalg.eig(np.linalg.inv(P))
+        eig, vr = np.linalg.eig(M)
+        profiling.count('eig')
         vl = np.linalg.inv(vr)
+        profiling.count('inv')
 
         return eig, np.transpose(vr), vl
 
@@ -734,6 +1632,181 @@ def eigen_spectra(tau_m, tau_s, transfer_function, dimension,
     return np.transpose(eig)
 
 
+@profiling.profiled
+@ureg.wraps(None, (ureg.s, ureg.s, ureg.Hz/ureg.mV, None,
+                   ureg.dimensionless, ureg.mV, None, ureg.Hz, None, None,
+                   None))
+def leading_modes(tau_m, tau_s, transfer_function, dimension,
+                  delay_dist_matrix, J, K, omegas, k, criterion, matrix):
+    """
+    Calcs the k leading eigenvalues with left and right eigenvectors of
+    matrix at all frequencies.
+
+    Only the selected eigenpairs are returned, such that their size scales
+    with k * dimension instead of dimension**2 per frequency. Up to
+    LEADING_MODES_DENSE_DIMENSION populations, the full eigendecomposition
+    is computed for all frequencies at once and the leading modes are
+    selected. For larger networks, they are found by Arnoldi iteration, in
+    shift-invert mode around 1 for criterion 'closest_to_one'.
+
+    The left eigenvectors are normalized such that they are the rows of the
+    inverse of the matrix of right eigenvectors, as in eigen_spectra, i.e.
+    the product of the left and right eigenvector of a mode is 1.
+
+    Parameters:
+    -----------
+    tau_m: Quantity(float, 'millisecond')
+        Membrane time constant.
+    tau_s: Quantity(float, 'millisecond')
+        Synaptic time constant.
+    transfer_function: Quantity(np.ndarray, 'hertz/mV')
+        Transfer_function for given frequencies omegas.
+    dimension: int
+        Number of populations.
+    delay_dist_matrix: Quantity(np.ndarray, 'dimensionless')
+        Delay distribution matrix at given frequencies.
+    J: Quantity(np.ndarray, 'millivolt')
+        Weight matrix.
+    K: np.ndarray
+        Indegree matrix.
+    omegas: Quantity(np.ndarray, 'hertz')
+        Input angular frequency to population.
+    k: int
+        Number of modes.
+    criterion: str
+        Selects the leading modes. Options are the eigenvalues closest to 1
+        'closest_to_one', with largest absolute value 'largest_magnitude'
+        and with largest real part 'largest_real'.
+    matrix: str
+        String specifying which matrix is analysed. Options are the effective
+        connectivity matrix 'MH', the propagator 'prop' and the inverse
+        propagator 'prop_inv'.
+
+    Returns:
+    --------
+    dict
+        Eigenvalues of shape (len(omegas), k) under key 'eigenvalues', and
+        right and left eigenvectors of shape (len(omegas), k, dimension)
+        under keys 'right_eigenvectors' and 'left_eigenvectors'. The modes
+        are ordered by the criterion, leading mode first.
+    """
+    if criterion not in ('closest_to_one', 'largest_magnitude',
+                         'largest_real'):
+        raise ValueError('Unknown criterion {}.'.format(criterion))
+    if not 0 < k <= dimension:
+        raise ValueError('k must be between 1 and the number of populations '
+                         '{}, not {}.'.format(dimension, k))
+
+    tf = np.asarray(transfer_function, dtype=complex)
+    MH = (tau_m * J * K * tf[..., np.newaxis]
+          * np.asarray(delay_dist_matrix, dtype=complex))
+    M = _analysed_matrix(MH, matrix)
+
+    if dimension <= LEADING_MODES_DENSE_DIMENSION or k >= dimension - 1:
+        eig, vr = np.linalg.eig(M)
+        profiling.count('eig', len(M))
+        vl = np.linalg.inv(vr)
+        profiling.count('inv', len(M))
+        index = _select_modes(eig, k, criterion)
+        eigenvalues = np.take_along_axis(eig, index, axis=-1)
+        right = np.take_along_axis(np.swapaxes(vr, -1, -2),
+                                   index[..., np.newaxis], axis=-2)
+        left = np.take_along_axis(vl, index[..., np.newaxis], axis=-2)
+    else:
+        modes = [_leading_modes_arnoldi(M_omega, k, criterion)
+                 for M_omega in M]
+        eigenvalues, right, left = [np.array(part) for part in zip(*modes)]
+
+    return dict(eigenvalues=eigenvalues, right_eigenvectors=right,
+                left_eigenvectors=left)
+
+
+def _analysed_matrix(MH, matrix):
+    """
+    Matrix analysed by eigen_spectra and leading_modes.
+
+    Parameters:
+    -----------
+    MH: np.ndarray
+        Effective connectivity, or stack of effective connectivities along
+        the leading axes.
+    matrix: str
+        'MH', 'prop' or 'prop_inv', see eigen_spectra.
+
+    Returns:
+    --------
+    np.ndarray
+        The effective connectivity, the propagator or its inverse.
+    """
+    if matrix == 'MH':
+        return MH
+    n_matrices = int(np.prod(MH.shape[:-2]))
+    Q = np.linalg.inv(np.identity(MH.shape[-1]) - MH)
+    profiling.count('inv', n_matrices)
+    P = np.matmul(Q, MH)
+    if matrix == 'prop':
+        return P
+    elif matrix == 'prop_inv':
+        profiling.count('inv', n_matrices)
+        return np.linalg.inv(P)
+    raise ValueError('Unknown matrix {}.'.format(matrix))
+
+
+def _select_modes(eigenvalues, k, criterion):
+    """
+    Indices of the k leading eigenvalues along the last axis, see
+    leading_modes.
+    """
+    if criterion == 'closest_to_one':
+        key = np.abs(eigenvalues - 1)
+    elif criterion == 'largest_magnitude':
+        key = -np.abs(eigenvalues)
+    elif criterion == 'largest_real':
+        key = -eigenvalues.real
+    return np.argsort(key, axis=-1, kind='stable')[..., :k]
+
+
+def _leading_modes_arnoldi(M, k, criterion):
+    """
+    Leading modes of one matrix found by Arnoldi iteration.
+
+    The right eigenvectors are found by one iteration on M. The left
+    eigenvector of each mode is found by an iteration on the transpose of M
+    in shift-invert mode around its eigenvalue, which also works for
+    degenerate eigenvalues, e.g. complex conjugate pairs.
+
+    Parameters:
+    -----------
+    M: np.ndarray
+        Analysed matrix.
+    k: int
+        Number of modes, smaller than M.shape[0] - 1.
+    criterion: str
+        See leading_modes.
+
+    Returns:
+    --------
+    tuple of np.ndarray
+        Eigenvalues with shape (k,), right and left eigenvectors with shape
+        (k, dimension), see leading_modes.
+    """
+    if criterion == 'closest_to_one':
+        options = dict(sigma=1, which='LM')
+    elif criterion == 'largest_magnitude':
+        options = dict(which='LM')
+    elif criterion == 'largest_real':
+        options = dict(which='LR')
+    eig, vr = slinalg.eigs(M, k=k, **options)
+    right = vr.T
+    left = np.array([slinalg.eigs(M.T, k=1, sigma=eigenvalue)[1][:, 0]
+                     for eigenvalue in eig])
+    profiling.count('eigs', k + 1)
+    left = left / np.sum(left * right, axis=1)[:, np.newaxis]
+    index = _select_modes(eig, k, criterion)
+    return eig[index], right[index], left[index]
+
+
+@profiling.profiled
 @ureg.wraps((ureg.Hz, ureg.Hz), (ureg.mV, ureg.mV, ureg.s, ureg.s, ureg.s,
                                  ureg.mV, ureg.mV,
                                  None, ureg.mV, ureg.mV, ureg.Hz, None, None))
@@ -812,6 +1885,7 @@ def additional_rates_for_fixed_input(mu_set, sigma_set,
     return nu_e_ext, nu_i_ext
 
 
+@profiling.profiled
 @ureg.wraps((ureg.ms, None, None, ureg.Hz/ureg.mV),
             (ureg.Hz/ureg.mV, ureg.Hz, ureg.s, ureg.mV, None))
 def fit_transfer_function(transfer_function, omegas, tau_m, J, K):
@@ -911,12 +1985,15 @@ def _fit_transfer_function(transfer_function, omegas):
 
 def scan_fit_transfer_function_mean_std_input(mean_inputs, std_inputs,
                                               tau_m, tau_s, tau_r,
-                                              V_0_rel, V_th_rel, omegas):
+                                              V_0_rel, V_th_rel, omegas,
+                                              progress=None, cancel=None):
     """
     Scan all combinations of mean_inputs and std_inputs: Compute and fit the
     transfer function for each case and return the relative fit errors on
     tau and h0.
 
+    Progress is reported and cancellation is checked after each combination.
+
     Parameters:
     -----------
     mean_inputs: Quantity(np.ndarray, 'mV')
@@ -935,6 +2012,12 @@ def scan_fit_transfer_function_mean_std_input(mean_inputs, std_inputs,
         Relative threshold potential.
     omegas: Quantity(np.ndarray, 'hertz')
         Input angular frequencies to population.
+    progress: callable
+        Called as progress(done, total) with the number of completed
+        combinations.
+    cancel: progress.CancellationToken
+        Token for cancelling the computation, which then raises
+        progress.ComputationCancelled.
 
     Returns:
     --------
@@ -946,6 +2029,7 @@ def scan_fit_transfer_function_mean_std_input(mean_inputs, std_inputs,
     dims = (len(mean_inputs), len(std_inputs))
     errs_tau = np.zeros(dims)
     errs_h0 = np.zeros(dims)
+    step(0, errs_tau.size, progress, cancel)
 
     for i,mu in enumerate(mean_inputs):
         for j,sigma in enumerate(std_inputs):
@@ -964,6 +2048,7 @@ def scan_fit_transfer_function_mean_std_input(mean_inputs, std_inputs,
 
             errs_tau[i,j] = err_tau[0]
             errs_h0[i,j] = err_h0[0]
+            step(i * dims[1] + j + 1, errs_tau.size, progress, cancel)
     return errs_tau, errs_h0
 
 
@@ -1009,19 +2094,21 @@ def effective_coupling_strength(tau_m, tau_s, tau_r, V_0_rel, V_th_rel, J,
     return w_ecs
 
 
-@ureg.wraps((None, (1/ureg.s).units, (1/ureg.s).units, (1/ureg.m).units,
+@profiling.profiled
+@ureg.wraps((None, (1/ureg.s).units, None, (1/ureg.m).units,
              (1/ureg.s).units, (1/ureg.s).units),
             ((1/ureg.m).units, None, ureg.s, None, ureg.m, ureg.s, ureg.s,
              ureg.mV, ureg.mV, ureg.s, ureg.s, ureg.s, ureg.mV, ureg.mV,
-             ureg.mV, None, None))
+             ureg.mV, None, None, None, None))
 def linear_interpolation_alpha(k_wavenumbers, branches, tau_rate, W_rate, width,
         d_e, d_i, mean_inputs, std_inputs, tau_m, tau_s, tau_r, V_0_rel, V_th_rel,
-        J, K, dimension):
+        J, K, dimension, alphas=None, n_jobs=1):
     """
     Linear interpolation between analytically solved characteristic equation
     for linear rate model and equation solved for lif model.
-    Eigenvalues lambda are computed by solving the characteristic equation
-    numerically or by solving an integral.
+    Eigenvalues lambda are followed from the rate model (alpha = 0) to the
+    lif model (alpha = 1) by predictor-corrector continuation with adaptive
+    steps in alpha.
     Requires a spatially organized network with boxcar connectivity profile.
 
     Parameters:
@@ -1060,12 +2147,19 @@ def linear_interpolation_alpha(k_wavenumbers, branches, tau_rate, W_rate, width,
         Indegree matrix.
     dimension: int
         Dimension of the system / number of populations.
+    alphas: np.ndarray
+        Increasing interpolation parameters in [0, 1] at which lambda is
+        returned. Default is np.linspace(0, 1, 5).
+    n_jobs: int
+        Number of processes the branches are distributed to.
 
     Returns:
     --------
     alphas: np.ndarray
-    lambdas_chareq: Quantity(np.ndarray, '1/s')
-    lambdas_integral: Quantity(np.ndarray, '1/s')
+    lambdas: Quantity(np.ndarray, '1/s')
+        Eigenvalues with shape (len(branches), len(alphas)).
+    n_steps: np.ndarray
+        Number of continuation steps for each branch.
     k_eig_max: Quantity(float, '1/m')
     eigenval_max: Quantity(complex, '1/s')
     eigenvals: Quantity(np.ndarray, '1/s')
@@ -1076,35 +2170,34 @@ def linear_interpolation_alpha(k_wavenumbers, branches, tau_rate, W_rate, width,
     delay = d_e
     assert len(np.unique(mean_inputs)) == 1, 'Linear interpolation requires same mean input.'
     mu = mean_inputs[0]
-    assert len(np.unique(mean_inputs)) == 1, 'Linear interpolation requires same std input.'
+    assert len(np.unique(std_inputs)) == 1, 'Linear interpolation requires same std input.'
     sigma = std_inputs[0]
 
+    if alphas is None:
+        alphas = np.linspace(0, 1, 5)
+    alphas = np.asarray(alphas, dtype=float)
+
     # ground truth at alpha = 0 from rate model
     k_eig_max, idx_k_eig_max, eigenval_max, eigenvals = \
         eigenvals_branches_rate(k_wavenumbers, branches, tau, W_rate, width, delay)
 
-    # first alpha must be 0 for integrate.odeint! (initial condition)
-    alphas = np.linspace(0, 1, 5)
-    lambdas_integral = np.zeros((len(branches), (len(alphas))), dtype=complex)
-    lambdas_chareq = np.zeros((len(branches), len(alphas)), dtype=complex)
-    for i,branch in enumerate(branches):
-
-        # evaluate all eigenvalues at k_eig_max (wavenumbers with largest real part
-        # of eigenvalue from theory)
-        lambda0 = eigenvals[i, idx_k_eig_max]
-        print(branch, lambda0)
-        # 1. solution by solving the characteristic equation numerically
-        for j,alpha in enumerate(alphas):
-            lambdas_chareq[i,j] = \
-                _solve_chareq_numerically_alpha(lambda0, alpha, k_eig_max, delay, mu, sigma,
-                                                tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
-                                                J, K, dimension, tau, W_rate, width)
-
-        # 2. solution by solving the integral
-        lambdas_integral[i,:] = _lambda_of_alpha_integral(alphas, lambda0, k_eig_max, delay,
-            mu, sigma, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, J, K, dimension,
-            tau, W_rate, width)
-    return alphas, lambdas_chareq, lambdas_integral, k_eig_max, eigenval_max, eigenvals
+    # evaluate all eigenvalues at k_eig_max (wavenumbers with largest real part
+    # of eigenvalue from theory)
+    args = [(alphas, eigenvals[i, idx_k_eig_max], k_eig_max, delay,
+             mu, sigma, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, J, K, dimension,
+             tau, W_rate, width)
+            for i in range(len(branches))]
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [executor.submit(_lambda_of_alpha_continuation, *arg)
+                       for arg in args]
+            solutions = [future.result() for future in futures]
+    else:
+        solutions = [_lambda_of_alpha_continuation(*arg) for arg in args]
+
+    lambdas = np.array([lambdas_of_alpha for lambdas_of_alpha, _ in solutions])
+    n_steps = np.array([n for _, n in solutions])
+    return alphas, lambdas, n_steps, k_eig_max, eigenval_max, eigenvals
 
 
 def eigenvals_branches_rate(k_wavenumbers, branches, tau, W_rate, width, delay):
@@ -1113,6 +2206,9 @@ def eigenvals_branches_rate(k_wavenumbers, branches, tau, W_rate, width, delay):
     solving the characteristic equation analytically.
     Requires a spatially organized network with boxcar connectivity profile.
 
+    All wavenumbers are treated at once and the Lambert W function is
+    evaluated on whole arrays, such that fine wavenumber grids are cheap.
+
     Parameters:
     -----------
     k_wavenumbers: np.ndarray
@@ -1135,12 +2231,10 @@ def eigenvals_branches_rate(k_wavenumbers, branches, tau, W_rate, width, delay):
     eigenval_max: complex
     eigenvals: np.ndarray
     """
-    eigenvals = np.zeros((len(branches), len(k_wavenumbers)), dtype=complex)
-
-    for i, branch in enumerate(branches):
-        for j, k_wavenumber in enumerate(k_wavenumbers):
-            eigenvals[i,j] = aux_calcs.solve_chareq_rate_boxcar( \
-                branch, k_wavenumber, tau, W_rate, width, delay)
+    # branches along first axis, wavenumbers along second axis
+    eigenvals = aux_calcs.solve_chareq_rate_boxcar( \
+        np.reshape(np.asarray(branches, dtype=int), (-1, 1)),
+        np.asarray(k_wavenumbers), tau, W_rate, width, delay)
 
     # index of eigenvalue with maximum real part
     idx_max = list(np.unravel_index(np.argmax(eigenvals.real), eigenvals.shape))
@@ -1158,19 +2252,30 @@ def eigenvals_branches_rate(k_wavenumbers, branches, tau, W_rate, width, delay):
     return k_eig_max, idx_k_eig_max, eigenval_max, eigenvals
 
 
-def _lambda_of_alpha_integral(alphas, lambda0, k, delay,
+def _lambda_of_alpha_continuation(alphas, lambda0, k, delay,
         mu, sigma, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, J, K, dimension,
-        tau, W_rate, width):
+        tau, W_rate, width, tol=1e-10, max_newton_iter=6, initial_step=0.25,
+        min_step=1e-6, max_distance=1e-2):
     """
-    Compute lambda of alpha by solving the integral.
+    Compute lambda of alpha by predictor-corrector continuation.
     Requires a spatially organized network with boxcar connectivity profile.
 
+    Starting from the solution lambda0 at alpha = 0, each step predicts
+    lambda with the tangent d lambda / d alpha and corrects the prediction
+    with Newton's method on the characteristic equation. The distance
+    between predicted and corrected lambda, relative to |lambda|, estimates
+    the error of the predictor. A step is rejected if Newton's method fails
+    or the distance exceeds max_distance. As the tangent predictor is of
+    first order, the distance scales with the square of the step, from
+    which the next step size is chosen. The steps always land on the
+    requested alphas.
+
     Parameters:
     -----------
     alphas: np.ndarray
-        Range of interpolation parameters.
+        Increasing interpolation parameters in [0, 1].
     lambda0: complex
-        Guess for eigenvalue.
+        Eigenvalue at alpha = 0.
     k: float
         Wavenumber in 1/m.
     delay: float
@@ -1195,46 +2300,105 @@ def _lambda_of_alpha_integral(alphas, lambda0, k, delay,
         Indegree matrix.
     dimension: int
         Dimension of the system / number of populations.
-    tau_rate: float
+    tau: float
         Time constant from fit in s.
     W_rate: np.ndarray
         Weights from fit.
     width: np.ndarray
         Spatial widths of boxcar connectivtiy profile in m.
+    tol: float
+        Relative tolerance of the Newton corrector.
+    max_newton_iter: int
+        Maximal number of Newton iterations per step.
+    initial_step: float
+        Size of the first step in alpha.
+    min_step: float
+        Smallest step in alpha before continuation is given up.
+    max_distance: float
+        Largest accepted distance between predicted and corrected lambda
+        relative to |lambda|.
 
     Returns:
     --------
-    lambdas_of_alpha: list
+    lambdas_of_alpha: np.ndarray
+    n_steps: int
+        Number of accepted continuation steps.
     """
-    assert alphas[0] == 0, 'First alpha must be 0!'
-    lambda0_list = [lambda0.real, lambda0.imag]
-
-    def derivative(lambda_list, a0):
-        l = complex(lambda_list[0], lambda_list[1])
-        deriv = _d_lambda_d_alpha(l, a0, k, delay,
-                mu, sigma, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, J, K, dimension,
-                tau, W_rate, width)
-        return [deriv.real, deriv.imag]
-
-    llist =  sint.odeint(func=derivative, y0=lambda0_list, t=alphas)
-
-    lambdas_of_alpha = [complex(l[0], l[1]) for l in llist]
-    return lambdas_of_alpha
-
-
-def _d_lambda_d_alpha(l, alpha, k, delay,
+    alphas = np.asarray(alphas, dtype=float)
+    assert np.all(np.diff(alphas) > 0), 'Alphas must be increasing!'
+    assert alphas[0] >= 0 and alphas[-1] <= 1, 'Alphas must be in [0, 1]!'
+
+    def chareq(l, alpha):
+        return _chareq_alpha(l, alpha, k, delay, mu, sigma, tau_m, tau_s, tau_r,
+                             V_0_rel, V_th_rel, J, K, dimension, tau, W_rate,
+                             width)
+
+    lambdas_of_alpha = np.zeros(len(alphas), dtype=complex)
+    alpha = 0.
+    l = complex(lambda0)
+    F, dF_dl, dF_da = chareq(l, alpha)
+    step = initial_step
+    n_steps = 0
+    for i, alpha_target in enumerate(alphas):
+        while alpha < alpha_target:
+            step = min(step, alpha_target - alpha)
+            if step < min_step:
+                raise RuntimeError('Continuation failed at alpha = {}.'.format(
+                    alpha))
+
+            # predictor: tangent of lambda(alpha)
+            l_pred = l - step * dF_da / dF_dl
+
+            # corrector: Newton's method at fixed alpha
+            l_new = l_pred
+            converged = False
+            for n_iter in range(max_newton_iter):
+                F_new, dF_dl_new, dF_da_new = chareq(l_new, alpha + step)
+                delta = F_new / dF_dl_new
+                l_new -= delta
+                if abs(delta) <= tol * max(1., abs(l_new)):
+                    converged = True
+                    break
+
+            if not converged:
+                step /= 2.
+                continue
+
+            # predictor error ~ step**2 sets the size of the next step
+            distance = abs(l_new - l_pred) / max(1., abs(l_new))
+            if distance > 0:
+                factor = 0.9 * np.sqrt(max_distance / distance)
+            else:
+                factor = 2.
+            if distance > max_distance:
+                step *= max(factor, 0.1)
+                continue
+
+            alpha += step
+            l, dF_dl, dF_da = l_new, dF_dl_new, dF_da_new
+            n_steps += 1
+            step *= min(factor, 2.)
+        lambdas_of_alpha[i] = l
+    return lambdas_of_alpha, n_steps
+
+
+def _chareq_alpha(l, alpha, k, delay,
         mu, sigma, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, J, K, dimension,
         tau, W_rate, width):
     """
-    Compute the derivative of lambda with respect to alpha.
+    Evaluate the interpolated characteristic equation and its derivatives.
     Requires a spatially organized network with boxcar connectivity profile.
 
+    The characteristic equation reads
+        F(lambda, alpha) = xi_eff_alpha(lambda) exp(-lambda delay) - 1 = 0
+    with xi_eff_alpha = alpha * xi_eff_s + (1 - alpha) * xi_eff_r.
+
     Parameters:
     -----------
     l: complex
         Eigenvalue.
     alpha: float
-        Interpolation parameters.
+        Interpolation parameter.
     k: float
         Wavenumber in 1/m.
     delay: float
@@ -1268,29 +2432,27 @@ def _d_lambda_d_alpha(l, alpha, k, delay,
 
     Returns:
     --------
-    deriv: complex
+    F: complex
+    dF_dlambda: complex
+    dF_dalpha: complex
     """
     xi_eff_s = _xi_eff_s(l, k, mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
                          J, K, dimension, width)
     xi_eff_r = _xi_eff_r(l, k, tau, W_rate, width)
-
-    xi_eff_sr = xi_eff_s - xi_eff_r
-
     xi_eff_alpha = alpha * xi_eff_s + (1.-alpha) * xi_eff_r
 
     d_xi_eff_s_d_lambda = _d_xi_eff_s_d_lambda(l, k, mu, sigma, tau_m, tau_s,
                                                tau_r, V_th_rel, V_0_rel,
                                                J, K, dimension, width)
-
     d_xi_eff_r_d_lambda = _d_xi_eff_r_d_lambda(l, k, tau, W_rate, width)
+    d_xi_eff_alpha_d_lambda = (alpha * d_xi_eff_s_d_lambda
+                               + (1.-alpha) * d_xi_eff_r_d_lambda)
 
-    d_xi_eff_alpha_d_lambda = alpha * d_xi_eff_s_d_lambda + (1.-alpha) * d_xi_eff_r_d_lambda
-
-    nominator = xi_eff_sr
-    denominator = d_xi_eff_alpha_d_lambda - delay * xi_eff_alpha
-
-    deriv = - nominator / denominator
-    return deriv
+    delay_term = np.exp(-l * delay)
+    F = xi_eff_alpha * delay_term - 1.
+    dF_dlambda = (d_xi_eff_alpha_d_lambda - delay * xi_eff_alpha) * delay_term
+    dF_dalpha = (xi_eff_s - xi_eff_r) * delay_term
+    return F, dF_dlambda, dF_dalpha
 
 
 def _xi_eff_s(l, k, mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
@@ -1375,7 +2537,7 @@ def _d_xi_eff_s_d_lambda(l, k, mu, sigma, tau_m, tau_s, tau_r, Vth_rel, V_0_rel,
                          J, K, dimension, width):
     """
     Computes the derivative of He_lif wrt lambda,
-    numerically.
+    analytical expression.
     Requires a spatially organized network with boxcar connectivity profile.
 
     Parameters:
@@ -1411,12 +2573,18 @@ def _d_xi_eff_s_d_lambda(l, k, mu, sigma, tau_m, tau_s, tau_r, Vth_rel, V_0_rel,
     --------
     deriv: complex
     """
-    def f(x):
-        omega = complex(0, -l)
-        return _xi_eff_s(l, k, mu, sigma, tau_m, tau_s, tau_r, Vth_rel, V_0_rel,
-                         J, K, dimension, width)
+    omega = complex(0, -l)
+    d_transfer_func_d_omega = _d_transfer_function_1p_shift_d_omega( \
+        mu, sigma, tau_m, tau_s, tau_r, Vth_rel, V_0_rel, omega)
+
+    # the effective connectivity is linear in the transfer function and its
+    # only non-trivial eigenvalue equals the trace
+    d_MH_s_d_omega = _effective_connectivity(omega, d_transfer_func_d_omega,
+                                             tau_m, J, K, dimension)
+    P_hat = aux_calcs.p_hat_boxcar(k, width)
 
-    deriv = smisc.derivative(func=f, x0=l, dx=1e-10) # TODO: check precision
+    # domega / dlambda = -i
+    deriv = -1j * np.trace(d_MH_s_d_omega * P_hat)
     return deriv
 
 
@@ -1449,81 +2617,20 @@ def _d_xi_eff_r_d_lambda(l, k, tau, W_rate, width):
     return deriv
 
 
-def _solve_chareq_numerically_alpha(lambda_guess, alpha, k, delay, mu, sigma,
-                                    tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
-                                    J, K, dimension, tau, W_rate, width):
-    """
-    Uses scipy.optimize.fsolve to solve the characteristic equation.
-    Compute the derivative of lambda with respect to alpha.
-    Requires a spatially organized network with boxcar connectivity profile.
-
-    Parameters:
-    -----------
-    lambda_guess: complex
-        Guess for eigenvalue.
-    alpha: float
-        Interpolation parameters.
-    k: float
-        Wavenumber in 1/m.
-    delay: float
-        Delay in s.
-    mu: float
-        Mean input in mV.
-    sigma: float
-        Standard deviation of input in mV.
-    tau_m: float
-        Membrane time constant in s.
-    tau_s: float
-        Synaptic time constant in s.
-    tau_r: float
-        Refractory time in s.
-    V_th_rel: float
-        Relative threshold potential in mV.
-    V_0_rel: float
-        Relative reset potential in mV.
-    J: np.ndarray
-        Weight matrix in mV.
-    K: np.ndarray
-        Indegree matrix.
-    dimension: int
-        Dimension of the system / number of populations.
-    tau: float
-        Time constant from fit in s.
-    W_rate: np.ndarray
-        Weights from fit.
-    width: np.ndarray
-        Spatial widths of boxcar connectivtiy profile in m.
-
-    Returns:
-    --------
-    lamb: complex
-
-    """
-    def fsolve_complex(l_re_im):
-        l = complex(l_re_im[0], l_re_im[1])
-
-        xi_eff_s = _xi_eff_s(l, k, mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
-                             J, K, dimension, width)
-        xi_eff_r = _xi_eff_r(l, k, tau, W_rate, width)
-
-        xi_eff_alpha = alpha * xi_eff_s + (1.-alpha) * xi_eff_r
-        roots = xi_eff_alpha * np.exp(-l * delay) - 1.
-
-        return [roots.real, roots.imag]
-
-    lambda_guess_list = [np.real(lambda_guess), np.imag(lambda_guess)]
-    l_opt = sopt.fsolve(fsolve_complex, lambda_guess_list)
-    lamb = complex(l_opt[0], l_opt[1])
-    return lamb
-
+@profiling.profiled
 @ureg.wraps((None, None, (1/ureg.mm).units, (1/ureg.mm).units),
-            ((1/ureg.mm).units, None, ureg.mm))
-def xi_of_k(ks, W_rate, width):
+            ((1/ureg.mm).units, None, ureg.mm, None))
+def xi_of_k(ks, W_rate, width, refine=False):
     """
     Compute minimum and maximum of spatial profile xi of k
     for linearized rate model.
     Requires a spatially organized network with boxcar connectivity profile.
 
+    The profile is evaluated for all wavenumbers at once. Optionally, the
+    extrema found on the grid are refined with a bounded scalar optimizer in
+    the interval between the neighbouring grid points, such that accurate
+    values are obtained without a dense grid of wavenumbers.
+
     Parameters:
     -----------
     ks: Quantity(np.ndarray, '1/mm')
@@ -1532,6 +2639,8 @@ def xi_of_k(ks, W_rate, width):
         Weights from fit.
     width: Quantity(np.ndarray, 'mm')
         Spatial widths of boxcar connectivtiy profile.
+    refine: bool
+        Whether extrema are refined between grid points.
 
     Returns:
     --------
@@ -1540,19 +2649,38 @@ def xi_of_k(ks, W_rate, width):
     k_min: Quantity(float, '1/mm')
     k_max: Quantity(float, '1/mm')
     """
-    xis = np.zeros(len(ks))
-    for i,k in enumerate(ks):
+    def xi(k):
+        """ Non-trivial eigenvalue of W_rate * P_hat for wavenumber(s) k. """
         P_hat = aux_calcs.p_hat_boxcar(k, width)
-        xis[i] = aux_calcs.determinant(W_rate * P_hat)
-
-        xi_min = np.min(xis)
-        xi_max = np.max(xis)
-        k_min = ks[np.argmin(xis)]
-        k_max = ks[np.argmax(xis)]
-        if k_min == ks[-1]:
-            print('WARNING: k_min==ks[-1] = {}'.format(k_max))
-        if k_max == ks[-1]:
-            print('WARNING: k_max==ks[-1] = {}'.format(k_max))
+        return np.real(aux_calcs.determinant(W_rate * P_hat[..., np.newaxis, :]))
+
+    def refine_extremum(idx, sign):
+        """ Minimize sign * xi between the neighbours of ks[idx]. """
+        bounds = (ks[max(idx - 1, 0)], ks[min(idx + 1, len(ks) - 1)])
+        res = sopt.minimize_scalar(lambda k: sign * xi(k), bounds=bounds,
+                                   method='bounded',
+                                   options={'xatol': 1e-10 * np.max(np.abs(ks))})
+        # keep the grid value if the optimizer did not improve it
+        if res.success and res.fun < sign * xis[idx]:
+            return sign * res.fun, res.x
+        return xis[idx], ks[idx]
+
+    ks = np.asarray(ks)
+    xis = xi(ks)
+    idx_min = np.argmin(xis)
+    idx_max = np.argmax(xis)
+
+    if refine:
+        xi_min, k_min = refine_extremum(idx_min, 1.)
+        xi_max, k_max = refine_extremum(idx_max, -1.)
+    else:
+        xi_min, k_min = xis[idx_min], ks[idx_min]
+        xi_max, k_max = xis[idx_max], ks[idx_max]
+
+    if idx_min == len(ks) - 1:
+        print('WARNING: k_min==ks[-1] = {}'.format(k_min))
+    if idx_max == len(ks) - 1:
+        print('WARNING: k_max==ks[-1] = {}'.format(k_max))
     return xi_min, xi_max, k_min, k_max
 
 
@@ -1566,10 +2694,10 @@ def solve_chareq_rate_boxcar(branch, k_wavenumber, tau, W_rate, width, delay):
 
     Parameters:
     -----------
-    branch: float
-        Branch number.
-    k: Quantity(float, '1/mm')
-        Wavenumber.
+    branch: int or np.ndarray
+        Branch number(s).
+    k: Quantity(float or np.ndarray, '1/mm')
+        Wavenumber(s).
     tau: Quantity(float, 's')
         Time constant from fit.
     W_rate: np.ndarray
@@ -1581,7 +2709,7 @@ def solve_chareq_rate_boxcar(branch, k_wavenumber, tau, W_rate, width, delay):
 
     Returns:
     --------
-    eigenval: complex
+    eigenval: Quantity(complex or np.ndarray, '1/s')
     """
     eigenval = aux_calcs.solve_chareq_rate_boxcar(branch, k_wavenumber, tau,
                                                   W_rate, width, delay)
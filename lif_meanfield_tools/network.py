@@ -16,6 +16,9 @@ Network Methods:
 __init__
 save
 show
+stale_results
+profile_report
+profile_stats
 change_parameters
 firing_rates
 mean
@@ -29,19 +32,39 @@ transfer_function_multi
 transfer_function_single
 sensitivity_measure
 power_spectra
+cross_spectra
+covariance_functions
+coherence
+phase_spectra
+transfer_function_laplace
+effective_connectivity_laplace
+count_unstable_modes
 eigenvalue_spectra
 r_eigenvec_spectra
 l_eigenvec_spectra
+leading_modes
 additional_rates_for_fixed_input
 fit_transfer_function
 scan_fit_transfer_function_mean_std_input
 linear_interpolation_alpha
+compute_profile_characteristics
 _calculate_dependent_network_parameters
 _calculate_dependent_analysis_parameters
 _check_and_store
+_tf_mode
+_transfer_function_empirical
+
+Each computing method listed in Network._async_methods has an awaitable
+counterpart prefixed with 'a', e.g. aworking_point and apower_spectra, which
+runs the computation on the network's executor.
 """
 
 from __future__ import print_function
+import asyncio
+import copy
+import itertools
+import os
+import threading
 import numpy as np
 import functools
 from decorator import decorator
@@ -49,6 +72,21 @@ from decorator import decorator
 from . import ureg
 from . import input_output as io
 from . import meanfield_calcs
+from .catalogue import Catalogue
+from .profiling import Profile
+from .progress import step
+
+# unique versions of stored results, shared by all networks
+_result_versions = itertools.count(1)
+
+
+@decorator
+def _profiled(func, self, *args, **kwargs):
+    """ Decorator recording uncached computations in the network's profile. """
+    if self.profile is None:
+        return func(self, *args, **kwargs)
+    with self.profile.record(func.__name__):
+        return func(self, *args, **kwargs)
 
 
 class Network(object):
@@ -75,25 +113,144 @@ class Network(object):
     derive_params: bool
         whether parameters shall be derived from existing ones
         can be false if a complete set of network parameters is given
+    working_point_cache: WorkingPointCache
+        cache of solved working points used as initial guesses for the
+        firing rates, can be shared by several networks
+    precision: str
+        'double' or 'single', precision of the stored frequency resolved
+        results
+    profile: Profile or bool
+        profile recording the computations of the network, can be shared by
+        several networks; if True, a new profile is created
+    executor: concurrent.futures.Executor
+        executor running the computations of the awaitable methods, e.g.
+        aworking_point; if None, the default executor of the event loop is
+        used; a ProcessPoolExecutor computes on copies of the network, such
+        that the results are returned, but not cached in the network
     """
 
+    # Dependencies of the cached results: the results they are computed from,
+    # the network and analysis parameters entering directly, and the analysis
+    # key under which the inputs of results with arguments are stored.
+    _wp_params = ['dimension', 'tau_m', 'tau_s', 'tau_r', 'V_0_rel', 'V_th_rel',
+                  'K', 'J', 'j', 'nu_ext', 'K_ext', 'g', 'nu_e_ext', 'nu_i_ext']
+    _tf_params = ['tau_m', 'tau_s', 'tau_r', 'V_th_rel', 'V_0_rel', 'dimension']
+    _dd_params = ['dimension', 'Delay', 'Delay_sd', 'delay_dist']
+    _es_params = ['tau_m', 'tau_s', 'dimension', 'J', 'K']
+    _tf_analysis_params = ['tf_mode', 'tau_impulse', 'delta_f']
+    # methods with awaitable counterparts named 'a' + method
+    _async_methods = ['firing_rates', 'mean_input', 'std_input',
+                      'working_point', 'delay_dist_matrix', 'transfer_function',
+                      'sensitivity_measure', 'power_spectra', 'cross_spectra',
+                      'covariance_functions', 'coherence', 'phase_spectra',
+                      'transfer_function_laplace',
+                      'effective_connectivity_laplace', 'count_unstable_modes',
+                      'eigenvalue_spectra', 'r_eigenvec_spectra',
+                      'l_eigenvec_spectra', 'leading_modes',
+                      'additional_rates_for_fixed_input',
+                      'fit_transfer_function',
+                      'scan_fit_transfer_function_mean_std_input',
+                      'linear_interpolation_alpha',
+                      'compute_profile_characteristics',
+                      'extend_analysis_frequencies', 'save']
+    # number of frequencies computed at once by long computations, which
+    # are kept if the computation is cancelled
+    _frequency_chunk_size = 16
+    # frequency resolved results stored in single precision, if requested
+    _single_precision_results = ['delay_dist', 'transfer_function',
+                                 'power_spectra', 'cross_spectra',
+                                 'eigenvalue_spectra',
+                                 'r_eigenvec_spectra', 'l_eigenvec_spectra']
+    _result_dependencies = {
+        'firing_rates': dict(results=[], network_params=_wp_params,
+                             analysis_params=[]),
+        'mean_input': dict(results=['firing_rates'],
+                           network_params=_wp_params, analysis_params=[]),
+        'std_input': dict(results=['firing_rates'],
+                          network_params=_wp_params, analysis_params=[]),
+        'delay_dist': dict(results=[], network_params=_dd_params,
+                           analysis_params=['omegas']),
+        'delay_dist_single': dict(results=[], network_params=_dd_params,
+                                  analysis_params=[],
+                                  analysis_key='delay_dist_freqs'),
+        'transfer_function': dict(results=['mean_input', 'std_input'],
+                                  network_params=_tf_params,
+                                  analysis_params=(['omegas']
+                                                   + _tf_analysis_params)),
+        'transfer_function_single': dict(results=['mean_input', 'std_input'],
+                                         network_params=_tf_params,
+                                         analysis_params=_tf_analysis_params,
+                                         analysis_key='transfer_freqs'),
+        'sensitivity_measure': dict(results=['mean_input', 'std_input',
+                                             'delay_dist_single'],
+                                    network_params=_tf_params + ['J', 'K'],
+                                    analysis_params=_tf_analysis_params,
+                                    analysis_key='sensitivity_freqs'),
+        'power_spectra': dict(results=['delay_dist', 'firing_rates',
+                                       'transfer_function'],
+                              network_params=_es_params + ['N'],
+                              analysis_params=['omegas']),
+        'cross_spectra': dict(results=['delay_dist', 'firing_rates',
+                                       'transfer_function'],
+                              network_params=_es_params + ['N'],
+                              analysis_params=['omegas']),
+        'eigenvalue_spectra': dict(results=['transfer_function', 'delay_dist'],
+                                   network_params=_es_params,
+                                   analysis_params=['omegas'],
+                                   analysis_key='eigenvalue_matrix'),
+        'r_eigenvec_spectra': dict(results=['transfer_function', 'delay_dist'],
+                                   network_params=_es_params,
+                                   analysis_params=['omegas'],
+                                   analysis_key='r_eigenvec_matrix'),
+        'l_eigenvec_spectra': dict(results=['transfer_function', 'delay_dist'],
+                                   network_params=_es_params,
+                                   analysis_params=['omegas'],
+                                   analysis_key='l_eigenvec_matrix'),
+        'leading_modes': dict(results=['transfer_function', 'delay_dist'],
+                              network_params=_es_params,
+                              analysis_params=['omegas'],
+                              analysis_key='leading_modes_specs'),
+        }
+
     def __init__(self, network_params=None, analysis_params=None, new_network_params={},
-                 new_analysis_params={}, derive_params=True):
+                 new_analysis_params={}, derive_params=True,
+                 working_point_cache=None, precision='double', profile=None,
+                 executor=None):
         """
         Initiate Network class.
 
         Load parameters from given yaml files using input output handling
         implemented in io.py and store them as instance variables.
+        network_params and analysis_params may also be dictionaries of
+        already converted parameters, e.g. as returned by
+        io.load_params_bulk, which are used without parsing again.
         Overwrite parameters specified in new_network_parms and
         new_analysis_params.
         Calculate parameters which are derived from given parameters.
         #Try to load existing results.
+
+        With precision='single', the frequency resolved results listed in
+        _single_precision_results are stored in single precision, which
+        halves their memory and disk usage. Single precision only affects
+        storage, all computations are done in double precision.
+
+        The awaitable methods run on the given executor and share running
+        computations, see _run_async.
         """
+        if precision not in ('double', 'single'):
+            raise ValueError("precision must be 'double' or 'single', not "
+                             "{}.".format(precision))
+        self.precision = precision
 
         # no yaml file for network parameters given
-        if network_params==None:
+        if network_params is None:
             self.network_params_yaml = ''
             self.network_params = new_network_params
+        # already converted parameters given
+        elif isinstance(network_params, dict):
+            self.network_params_yaml = ''
+            self.network_params = dict(network_params)
+            self.network_params.update(new_network_params)
         else:
             self.network_params_yaml = network_params
             # read from yaml and convert to quantities
@@ -101,14 +258,19 @@ class Network(object):
             self.network_params.update(new_network_params)
 
         # no yaml file for analysis parameters given
-        if analysis_params==None:
+        if analysis_params is None:
             self.analysis_params_yaml = ''
             self.analysis_params = new_analysis_params
+        elif isinstance(analysis_params, dict):
+            self.analysis_params_yaml = ''
+            self.analysis_params = dict(analysis_params)
+            self.analysis_params.update(new_analysis_params)
         else:
             self.analysis_params_yaml = analysis_params
             self.analysis_params = io.load_params(analysis_params)
             self.analysis_params.update(new_analysis_params)
 
+        self._derive_params = derive_params
         if derive_params:
             # calculate dependend network parameters
             derived_network_params = self._calculate_dependent_network_parameters()
@@ -118,12 +280,26 @@ class Network(object):
             derived_analysis_params = self._calculate_dependent_analysis_parameters()
             self.analysis_params.update(derived_analysis_params)
 
-        # calc hash
-        self.hash = io.create_hash(self.network_params,
-                                   self.network_params.keys())
+        self._tf_mode()
+
+        # digests of the network parameters used for the hash
+        self._param_digests = {}
 
         # empty results
         self.results = {}
+        # parameters and parent results stored results were computed from
+        self._result_records = {}
+        # completed chunks of cancelled computations
+        self._partial_results = {}
+
+        self.working_point_cache = working_point_cache
+
+        if profile is True:
+            profile = Profile()
+        self.profile = profile or None
+
+        self.executor = executor
+        self._init_async()
 
         # TODO: LOAD RESULTS ONLY IF THE ANALYSIS PARAMS ARE THE SAME
         # OTHERWISE DANGER THAT EITHER ANALYSIS PARAMS GET OVERWRITTEN OR DON'T
@@ -134,6 +310,44 @@ class Network(object):
         # self.analysis_params.update(stored_analysis_params)
 
 
+    def _init_async(self):
+        """ Create the state of the awaitable methods. """
+        # serializes the computations of the awaitable methods
+        self._async_lock = threading.RLock()
+        # running computations of the awaitable methods
+        self._async_pending = {}
+
+
+    def __getstate__(self):
+        """
+        State for pickling and copying, without the executor and the state
+        of the awaitable methods, which cannot be pickled.
+        """
+        state = self.__dict__.copy()
+        for key in ('executor', '_async_lock', '_async_pending'):
+            state.pop(key, None)
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.executor = None
+        self._init_async()
+
+
+    @property
+    def hash(self):
+        """
+        Hash of the network parameters, used for naming output files.
+
+        Array parameters whose contents are unchanged since the last
+        evaluation, judged by a checksum, are not digested again.
+        """
+        return io.create_hash(self.network_params,
+                              self.network_params.keys(),
+                              digests=self._param_digests)
+
+
     def _calculate_dependent_network_parameters(self):
         """
         Calculate all network parameters derived from parameters in yaml file
@@ -236,6 +450,10 @@ class Network(object):
         """
         Decorator function that checks whether result are already existing.
 
+        Results with declared dependencies are recomputed, if any of the
+        parameters or results they depend on has changed since they have been
+        stored.
+
         This decorator serves as a wrapper for functions that calculate
         quantities which are to be stored in self.results. First it checks,
         whether the result already has been stored in self.results. If this is
@@ -263,11 +481,26 @@ class Network(object):
         @decorator
         def decorator_check_and_store(func, self, *args, **kwargs):
             """ Decorator with given parameters, returns expected results. """
+            # drop stored result if parameters it depends on have changed
+            if self._is_stale(result_key):
+                self._invalidate(result_key)
+
             # collect analysis_params
             analysis_params = getattr(self, 'analysis_params')
             # collect results
             results = getattr(self, 'results')
 
+            profile = self.profile
+
+            def compute():
+                """ Calculate new result, recording it in the profile. """
+                if profile is None:
+                    return self._apply_precision(result_key,
+                                                 func(self, *args, **kwargs))
+                with profile.record(result_key, miss=True):
+                    return self._apply_precision(result_key,
+                                                 func(self, *args, **kwargs))
+
             if analysis_key:
                 # collect input
                 analysis_param = args[0]
@@ -276,6 +509,8 @@ class Network(object):
                     if analysis_param in analysis_params[analysis_key]:
                         # get index of analysis_key
                         index = list(analysis_params[analysis_key]).index(analysis_param)
+                        if profile is not None:
+                            profile.hit(result_key)
                         # return corresponding result
                         return results[result_key][index]
                     else:
@@ -290,7 +525,7 @@ class Network(object):
 
                         setattr(self, 'analysis_params', analysis_params)
                         # calculate new results
-                        new_result = func(self, *args, **kwargs)
+                        new_result = compute()
                         # save new results
                         results[result_key] = list(results[result_key])
                         results[result_key].append(new_result)
@@ -307,8 +542,9 @@ class Network(object):
                         analysis_params[analysis_key] = np.array([analysis_param])
                     setattr(self, 'analysis_params', analysis_params)
                     # calculate new results
-                    new_result = func(self, *args, **kwargs)
+                    new_result = compute()
                     results[result_key] = [new_result]
+                    self._record_result(result_key)
                     # save new results
                     setattr(self, 'results', results)
                     # return new result
@@ -318,10 +554,13 @@ class Network(object):
                 # check if new result is already stored in self.results
                 if result_key in results.keys():
                     # if so, return already calcualted result
+                    if profile is not None:
+                        profile.hit(result_key)
                     return results[result_key]
                 else:
                     # if not, calculate new result
-                    results[result_key] = func(self, *args, **kwargs)
+                    results[result_key] = compute()
+                    self._record_result(result_key)
                     # update self.results
                     setattr(self, 'results', results)
                     # return new_result
@@ -331,11 +570,15 @@ class Network(object):
         return decorator_check_and_store
 
 
-    def save(self, output_key='', output={}, file_name=''):
+    def save(self, output_key='', output={}, file_name='', result_keys=None,
+             compression=None, catalogue=False):
         """
         Saves results and parameters to h5 file. If output is specified, this is
         saved to h5 file.
 
+        Everything is written while opening the file only once. Entries
+        already contained in the file are replaced, all others are kept.
+
         Parameters:
         -----------
         output_key: str
@@ -344,6 +587,17 @@ class Network(object):
             data that is stored in h5 file
         file_name: str
             if given, this is used as output file name
+        result_keys: list
+            if given, only these results are written, e.g. to add or update
+            single results in an existing file, and the parameters are not
+            written
+        compression: str or int or None
+            compression of large arrays, e.g. 'gzip', see io.write_h5
+        catalogue: bool
+            if True, results are recorded with the network and analysis
+            parameters in the catalogue of the output directory, see
+            catalogue.find_runs; default is False, such that no catalogue
+            file is created
 
         Returns:
         --------
@@ -357,18 +611,230 @@ class Network(object):
 
         # if output is given, save it to h5 file
         if output_key:
-            io.save(output_key, output, file_name)
-
+            data = {output_key: output}
+        # save only given results
+        elif result_keys is not None:
+            data = {'results': {key: self.results[key]
+                                for key in result_keys}}
         # else save results and parameters to h5 file
         else:
-            io.save('results', self.results, file_name)
-            io.save('network_params', self.network_params, file_name)
-            io.save('analysis_params', self.analysis_params, file_name)
+            data = {'results': self.results,
+                    'network_params': self.network_params,
+                    'analysis_params': self.analysis_params}
+        io.write_h5(file_name, data, compression=compression)
+
+        if catalogue and 'results' in data:
+            directory = os.path.dirname(os.path.abspath(file_name))
+            Catalogue(directory).register(file_name,
+                                          self.network_params,
+                                          self.analysis_params,
+                                          results=data['results'].keys(),
+                                          hash=self.hash)
 
 
     def show(self):
-        """ Returns which results have already been calculated """
-        return sorted(list(self.results.keys()))
+        """
+        Returns which results have already been calculated
+
+        Results that are outdated, because parameters they depend on have
+        been changed, are marked with ' (stale)'. They are recomputed when
+        they are requested the next time.
+        """
+        stale = self.stale_results()
+        return sorted(key + ' (stale)' if key in stale else key
+                      for key in self.results.keys())
+
+
+    def stale_results(self):
+        """ Returns which stored results are outdated """
+        return sorted(key for key in self.results if self._is_stale(key))
+
+
+    def profile_report(self):
+        """
+        Returns table of the recorded computation times and counts
+
+        See profiling.Profile for the meaning of the columns.
+        """
+        if self.profile is None:
+            return 'Profiling is disabled.'
+        return self.profile.report()
+
+
+    def profile_stats(self):
+        """
+        Returns recorded computation times and counts as dictionary
+
+        The statistics of each result key and each entry point of
+        meanfield_calcs are stored under that key, see profiling.Profile.
+        Empty if profiling is disabled.
+        """
+        if self.profile is None:
+            return {}
+        return self.profile.as_dict()
+
+
+    async def _run_async(self, name, *args, **kwargs):
+        """
+        Run a network method on the executor without blocking the event loop.
+
+        Concurrent awaits of the same method with equal arguments share one
+        computation. The computations of one network are run one after
+        another, so results computed by one of them, e.g. the working point,
+        are cached and reused by the following ones as in synchronous use.
+        Cancelling an await does not stop the running computation, whose
+        results are stored nonetheless. Pass a CancellationToken to stop long
+        computations.
+
+        Parameters:
+        -----------
+        name: str
+            Name of the network method.
+        args, kwargs:
+            Arguments passed to the method.
+
+        Returns:
+        --------
+        Result of the method.
+        """
+        loop = asyncio.get_running_loop()
+        key = _call_key(name, args, kwargs)
+        future = self._async_pending.get((loop, key)) if key else None
+        if future is None:
+            future = loop.run_in_executor(
+                self.executor, functools.partial(self._run_locked, name,
+                                                 *args, **kwargs))
+            if key:
+                self._async_pending[(loop, key)] = future
+                future.add_done_callback(
+                    lambda _: self._async_pending.pop((loop, key), None))
+        return await asyncio.shield(future)
+
+
+    def _run_locked(self, name, *args, **kwargs):
+        """ Run a network method while holding the lock of the network. """
+        with self._async_lock:
+            return getattr(self, name)(*args, **kwargs)
+
+
+    def _apply_precision(self, result_key, result):
+        """
+        Convert result to the storage precision of the network.
+
+        Parameters:
+        -----------
+        result_key: str
+            Key of the result.
+        result: Quantity or np.ndarray
+            Result computed in double precision.
+
+        Returns:
+        --------
+        Quantity or np.ndarray
+            Result in single precision, if the network uses single precision
+            and the result is listed in _single_precision_results, otherwise
+            the unchanged result.
+        """
+        if (self.precision != 'single'
+                or result_key not in self._single_precision_results):
+            return result
+        if isinstance(result, ureg.Quantity):
+            return _to_single_precision(result.magnitude) * result.units
+        return _to_single_precision(result)
+
+
+    def _record_result(self, result_key):
+        """
+        Record the parameters and parent results a new result depends on.
+
+        Parameters:
+        -----------
+        result_key: str
+            Key of the stored result.
+        """
+        if result_key not in self._result_dependencies:
+            return
+        self._result_records[result_key] = self._snapshot(result_key)
+
+
+    def _snapshot(self, result_key):
+        """
+        Current values of the parameters and versions of the parent results
+        a result depends on, see _record_result.
+        """
+        dependencies = self._result_dependencies[result_key]
+        return dict(
+            version=next(_result_versions),
+            network_params={key: copy.deepcopy(self.network_params[key])
+                            for key in dependencies['network_params']
+                            if key in self.network_params},
+            analysis_params={key: copy.deepcopy(self.analysis_params[key])
+                             for key in dependencies['analysis_params']
+                             if key in self.analysis_params},
+            results={key: self._result_records[key]['version']
+                     for key in dependencies['results']
+                     if key in self.results and key in self._result_records})
+
+
+    def _is_stale(self, result_key):
+        """
+        Check whether a stored result is outdated.
+
+        A result is outdated if a parameter it depends on has changed or if a
+        result it depends on is outdated or has been recomputed. Results
+        without record, e.g. loaded or set by hand, are never outdated.
+
+        Parameters:
+        -----------
+        result_key: str
+            Key of the stored result.
+
+        Returns:
+        --------
+        bool
+        """
+        if (result_key not in self.results
+                or result_key not in self._result_records):
+            return False
+        return self._is_outdated(self._result_records[result_key])
+
+
+    def _is_outdated(self, record):
+        """
+        Check whether parameters or parent results have changed since a
+        snapshot has been taken, see _is_stale.
+        """
+        for params, recorded in [(self.network_params,
+                                  record['network_params']),
+                                 (self.analysis_params,
+                                  record['analysis_params'])]:
+            if any(key not in params or _param_changed(value, params[key])
+                   for key, value in recorded.items()):
+                return True
+        for key, version in record['results'].items():
+            if (key not in self.results or key not in self._result_records
+                    or self._result_records[key]['version'] != version
+                    or self._is_stale(key)):
+                return True
+        return False
+
+
+    def _invalidate(self, result_key):
+        """
+        Remove a stored result, its record and the stored inputs of results
+        with arguments.
+
+        Parameters:
+        -----------
+        result_key: str
+            Key of the stored result.
+        """
+        self.results.pop(result_key, None)
+        self._result_records.pop(result_key, None)
+        analysis_key = self._result_dependencies.get(
+            result_key, {}).get('analysis_key')
+        if analysis_key:
+            self.analysis_params.pop(analysis_key, None)
 
 
     def change_parameters(self, changed_network_params={},
@@ -376,24 +842,96 @@ class Network(object):
         """
         Change parameters and return new network with specified parameters.
 
+        The network itself is left unchanged. The new network gets copies of
+        the parameter dictionaries, while the parameter values and results
+        are shared, as they are never altered in place. All results that do
+        not depend on changed parameters, directly or via other results, are
+        carried over.
+
         Parameters:
         -----------
-        new_network_parameters: dict
-            Dictionary specifying which parameters should be altered.
+        changed_network_params: dict
+            Dictionary specifying which network parameters should be altered.
+        changed_analysis_params: dict
+            Dictionary specifying which analysis parameters should be altered.
 
         Returns:
         Network object
             New network with specified parameters.
         """
 
-        new_network_params = self.network_params
+        new_network_params = dict(self.network_params)
         new_network_params.update(changed_network_params)
-        new_analysis_params = self.analysis_params
+        new_analysis_params = dict(self.analysis_params)
         new_analysis_params.update(changed_analysis_params)
 
-        return Network(self.network_params_yaml, self.analysis_params_yaml,
-                       new_network_params, new_analysis_params)
+        new_network = Network(new_network_params=new_network_params,
+                              new_analysis_params=new_analysis_params,
+                              derive_params=self._derive_params,
+                              working_point_cache=self.working_point_cache,
+                              precision=self.precision,
+                              profile=self.profile,
+                              executor=self.executor)
+        new_network.network_params_yaml = self.network_params_yaml
+        new_network.analysis_params_yaml = self.analysis_params_yaml
+        # only changed parameters need to be digested again
+        new_network._param_digests = dict(self._param_digests)
+
+        changed_network_keys = _changed_keys(self.network_params,
+                                             new_network.network_params)
+        changed_analysis_keys = _changed_keys(self.analysis_params,
+                                              new_network.analysis_params)
+        affected = self._affected_results(changed_network_keys,
+                                          changed_analysis_keys)
+
+        for key, result in self.results.items():
+            if key not in affected:
+                new_network.results[key] = result
+                if key in self._result_records:
+                    new_network._result_records[key] = \
+                        self._result_records[key]
+            else:
+                analysis_key = self._result_dependencies.get(
+                    key, {}).get('analysis_key')
+                if analysis_key:
+                    new_network.analysis_params.pop(analysis_key, None)
+
+        return new_network
+
+
+    def _affected_results(self, changed_network_keys, changed_analysis_keys):
+        """
+        Determine the stored results that depend on the changed parameters.
+
+        Results without declared dependencies are considered to be affected
+        by any change.
+
+        Parameters:
+        -----------
+        changed_network_keys: set
+            Keys of changed network parameters.
+        changed_analysis_keys: set
+            Keys of changed analysis parameters.
+
+        Returns:
+        --------
+        set
+            Keys of affected results.
+        """
+        any_change = bool(changed_network_keys or changed_analysis_keys)
+
+        def is_affected(key):
+            if key not in self._result_dependencies:
+                return any_change
+            dependencies = self._result_dependencies[key]
+            return (bool(changed_network_keys.intersection(
+                        dependencies['network_params']))
+                    or bool(changed_analysis_keys.intersection(
+                        dependencies['analysis_params']))
+                    or any(is_affected(parent)
+                           for parent in dependencies['results']))
 
+        return set(key for key in self.results if is_affected(key))
 
 
     def extend_analysis_frequencies(self, f_min, f_max):
@@ -411,8 +949,20 @@ class Network(object):
 
 
     @_check_and_store('firing_rates')
-    def firing_rates(self):
-        """ Calculates firing rates """
+    def firing_rates(self, nu_0=None):
+        """
+        Calculates firing rates
+
+        Parameters:
+        -----------
+        nu_0: Quantity(np.ndarray, 'hertz')
+            Initial guess of the firing rates. If not given, the nearest
+            working point stored in self.working_point_cache is used.
+
+        Returns:
+        --------
+        Quantity(np.ndarray, 'hertz')
+        """
         return meanfield_calcs.firing_rates(self.network_params['dimension'],
                                             self.network_params['tau_m'],
                                             self.network_params['tau_s'],
@@ -426,7 +976,9 @@ class Network(object):
                                             self.network_params['K_ext'],
                                             self.network_params['g'],
                                             self.network_params['nu_e_ext'],
-                                            self.network_params['nu_i_ext'])
+                                            self.network_params['nu_i_ext'],
+                                            nu_0,
+                                            self.working_point_cache)
 
 
     @_check_and_store('mean_input')
@@ -543,15 +1095,69 @@ class Network(object):
 
 
 
-    def transfer_function(self, freq=None, method='shift'):
+    def _tf_mode(self):
+        """
+        Mode of the transfer function given by analysis_params['tf_mode'].
+
+        In mode 'analytical', the default, the transfer function of the LIF
+        neuron is computed. In mode 'empirical', it is approximated by the
+        low-pass filters given by analysis_params['tau_impulse'] and
+        analysis_params['delta_f'], see
+        meanfield_calcs.transfer_function_empirical.
+
+        Returns:
+        --------
+        str
+            'analytical' or 'empirical'.
+
+        Raises:
+        -------
+        ValueError
+            If the mode is unknown or the parameters of the empirical mode
+            are missing.
+        """
+        tf_mode = self.analysis_params.get('tf_mode', 'analytical')
+        if tf_mode not in ('analytical', 'empirical'):
+            raise ValueError("tf_mode must be 'analytical' or 'empirical', not "
+                             "{}.".format(tf_mode))
+        if tf_mode == 'empirical':
+            missing = [key for key in ['tau_impulse', 'delta_f']
+                       if key not in self.analysis_params]
+            if missing:
+                raise ValueError("tf_mode 'empirical' needs the analysis "
+                                 "parameters {}.".format(', '.join(missing)))
+        return tf_mode
+
+
+    def _transfer_function_empirical(self, omegas):
+        """ Empirical transfer function at the given frequencies. """
+        return meanfield_calcs.transfer_function_empirical(
+            self.analysis_params['tau_impulse'],
+            self.analysis_params['delta_f'],
+            self.network_params['dimension'],
+            omegas)
+
+
+    def transfer_function(self, freq=None, method='shift', progress=None,
+                          cancel=None):
         """
         Calculates transfer function either for all frequencies or given one.
 
+        The transfer function is computed in the mode given by
+        analysis_params['tf_mode'], see _tf_mode. In mode 'empirical',
+        method is ignored.
+
         Paramters:
         ----------
         freq: Quantity(float, 'Hertz')
             Optional paramter. If given, transfer function is only calculated
             for this frequency.
+        progress: callable
+            Called as progress(done, total) with the number of completed
+            frequencies, see transfer_function_multi.
+        cancel: CancellationToken
+            Token for cancelling the computation for all frequencies, see
+            transfer_function_multi.
 
         Returns:
         --------
@@ -562,35 +1168,84 @@ class Network(object):
         """
 
         if freq == None:
-            return self.transfer_function_multi(method)
+            return self.transfer_function_multi(method, progress=progress,
+                                                cancel=cancel)
         else:
             return self.transfer_function_single(freq)
 
 
     @_check_and_store('transfer_function')
-    def transfer_function_multi(self, method='shift'):
+    def transfer_function_multi(self, method='shift', progress=None,
+                                cancel=None):
         """
         Calculates transfer function for each population.
 
+        The frequencies are computed in chunks of _frequency_chunk_size. If
+        the computation is cancelled, it raises ComputationCancelled, but the
+        completed chunks are kept, and the next call continues from there, as
+        long as the parameters and results the transfer function depends on
+        are unchanged.
+
+        Parameters:
+        -----------
+        method: str
+            String specifying transfer function to use ('shift', 'taylor').
+        progress: callable
+            Called as progress(done, total) with the number of completed
+            frequencies, including those of previously completed chunks.
+        cancel: CancellationToken
+            Token for cancelling the computation.
+
         Returns:
         --------
         Quantity(np.ndarray, 'dimensionless'):
             Transfer functions for all populations evaluated at specified
             omegas.
         """
+        omegas = self.analysis_params['omegas']
+        if self._tf_mode() == 'empirical':
+            step(0, len(omegas), progress, cancel)
+            transfer_functions = self._transfer_function_empirical(omegas)
+            step(len(omegas), len(omegas), progress, cancel)
+            return transfer_functions
+
+        mean_input = self.mean_input()
+        std_input = self.std_input()
+
+        partial = self._partial_results.get('transfer_function')
+        if (partial is None or partial['method'] != method
+                or self._is_outdated(partial['record'])):
+            partial = dict(method=method,
+                           record=self._snapshot('transfer_function'),
+                           chunks=[], done=0)
+            self._partial_results['transfer_function'] = partial
+        chunks = partial['chunks']
+
+        while partial['done'] < len(omegas):
+            done = partial['done']
+            chunk_omegas = omegas[done:done + self._frequency_chunk_size]
+            chunk_progress = None
+            if progress is not None:
+                def chunk_progress(chunk_done, chunk_total, offset=done):
+                    progress(offset + chunk_done, len(omegas))
+            chunks.append(meanfield_calcs.transfer_function(
+                mean_input, std_input,
+                self.network_params['tau_m'],
+                self.network_params['tau_s'],
+                self.network_params['tau_r'],
+                self.network_params['V_th_rel'],
+                self.network_params['V_0_rel'],
+                self.network_params['dimension'],
+                chunk_omegas,
+                method=method, progress=chunk_progress, cancel=cancel))
+            partial['done'] += len(chunk_omegas)
+        del self._partial_results['transfer_function']
 
-        transfer_functions = meanfield_calcs.transfer_function(self.mean_input(),
-                                                 self.std_input(),
-                                                 self.network_params['tau_m'],
-                                                 self.network_params['tau_s'],
-                                                 self.network_params['tau_r'],
-                                                 self.network_params['V_th_rel'],
-                                                 self.network_params['V_0_rel'],
-                                                 self.network_params['dimension'],
-                                                 self.analysis_params['omegas'],
-                                                 method=method)
-
-        return transfer_functions
+        if len(chunks) == 1:
+            return chunks[0]
+        unit = chunks[0].units
+        return np.concatenate([chunk.to(unit).magnitude
+                               for chunk in chunks]) * unit
 
 
 
@@ -608,6 +1263,10 @@ class Network(object):
 
         omega = freq * 2 * np.pi
 
+        if self._tf_mode() == 'empirical':
+            return self._transfer_function_empirical([omega.magnitude]
+                                                     * omega.units)
+
         transfer_functions = meanfield_calcs.transfer_function(self.mean_input(),
                                                  self.std_input(),
                                                  self.network_params['tau_m'],
@@ -645,18 +1304,23 @@ class Network(object):
         omega = freq * 2 * np.pi
 
         # calculate needed transfer_function
-        transfer_function = meanfield_calcs.transfer_function(self.mean_input(),
-                                                              self.std_input(),
-                                                              self.network_params['tau_m'],
-                                                              self.network_params['tau_s'],
-                                                              self.network_params['tau_r'],
-                                                              self.network_params['V_th_rel'],
-                                                              self.network_params['V_0_rel'],
-                                                              self.network_params['dimension'],
-                                                              [omega],
-                                                              method=method)
-        if omega.magnitude < 0:
-            transfer_function = np.conjugate(transfer_function)
+        if self._tf_mode() == 'empirical':
+            # the low-pass filter is already conjugated for omega < 0
+            transfer_function = self._transfer_function_empirical(
+                [omega.magnitude] * omega.units)
+        else:
+            transfer_function = meanfield_calcs.transfer_function(self.mean_input(),
+                                                                  self.std_input(),
+                                                                  self.network_params['tau_m'],
+                                                                  self.network_params['tau_s'],
+                                                                  self.network_params['tau_r'],
+                                                                  self.network_params['V_th_rel'],
+                                                                  self.network_params['V_0_rel'],
+                                                                  self.network_params['dimension'],
+                                                                  [omega],
+                                                                  method=method)
+            if omega.magnitude < 0:
+                transfer_function = np.conjugate(transfer_function)
 
         # calculate needed delay distribution matrix
         delay_dist_matrix = self.delay_dist_matrix(omega)
@@ -690,6 +1354,204 @@ class Network(object):
 
 
 
+    @_check_and_store('cross_spectra')
+    def cross_spectra(self, method='shift'):
+        """
+        Calculates the cross-spectral matrices of all populations.
+
+        Only the upper triangles of the Hermitian matrices are stored, see
+        meanfield_calcs.cross_spectra and meanfield_calcs.unpack_hermitian.
+
+        Returns:
+        --------
+        Quantity(np.ndarray, 'hertz')
+            Packed cross-spectral matrices of shape
+            (len(omegas), dimension * (dimension + 1) / 2).
+        """
+        return meanfield_calcs.cross_spectra(self.network_params['tau_m'],
+                                             self.network_params['tau_s'],
+                                             self.network_params['dimension'],
+                                             self.network_params['J'],
+                                             self.network_params['K'],
+                                             self.delay_dist_matrix(),
+                                             self.network_params['N'],
+                                             self.firing_rates(),
+                                             self.transfer_function(method=method),
+                                             self.analysis_params['omegas'])
+
+
+    @_profiled
+    def covariance_functions(self, method='shift'):
+        """
+        Calculates the cross-covariance functions of the population rates.
+
+        They are transformed from the stored cross spectra, which requires
+        analysis frequencies on an FFT grid, i.e. f_min = 0, see
+        meanfield_calcs.covariance_functions.
+
+        Returns:
+        --------
+        Quantity(np.ndarray, 'second')
+            Time lags.
+        Quantity(np.ndarray, 'hertz**2')
+            Covariance functions of shape (len(time lags), dimension,
+            dimension).
+        """
+        return meanfield_calcs.covariance_functions(
+            self.cross_spectra(method=method), self.analysis_params['omegas'])
+
+
+    @_profiled
+    def coherence(self, method='shift'):
+        """
+        Calculates the coherence of all pairs of populations from the stored
+        cross spectra, see meanfield_calcs.coherence.
+
+        Returns:
+        --------
+        Quantity(np.ndarray, 'dimensionless')
+            Coherences of shape (len(omegas), dimension, dimension).
+        """
+        return meanfield_calcs.coherence(self.cross_spectra(method=method))
+
+
+    @_profiled
+    def phase_spectra(self, method='shift'):
+        """
+        Calculates the phases of the cross spectra of all pairs of
+        populations, see meanfield_calcs.phase_spectra.
+
+        Returns:
+        --------
+        np.ndarray
+            Phases in radians of shape (len(omegas), dimension, dimension).
+        """
+        return meanfield_calcs.phase_spectra(self.cross_spectra(method=method))
+
+
+    @_profiled
+    def transfer_function_laplace(self, lambdas):
+        """
+        Calculates transfer functions of all populations at complex
+        frequencies lambda.
+
+        See meanfield_calcs.transfer_function_laplace for the range of
+        validity. The analytical transfer function is continued, irrespective
+        of analysis_params['tf_mode'].
+
+        Parameters:
+        -----------
+        lambdas: Quantity(np.ndarray, '1/s')
+            Complex frequencies of arbitrary shape.
+
+        Returns:
+        --------
+        Quantity(np.ndarray, 'hertz/millivolt'):
+            Transfer functions with shape lambdas.shape + (dimension,).
+        """
+        return meanfield_calcs.transfer_function_laplace(
+            self.mean_input(),
+            self.std_input(),
+            self.network_params['tau_m'],
+            self.network_params['tau_s'],
+            self.network_params['tau_r'],
+            self.network_params['V_th_rel'],
+            self.network_params['V_0_rel'],
+            self.network_params['dimension'],
+            lambdas)
+
+
+    @_profiled
+    def effective_connectivity_laplace(self, lambdas):
+        """
+        Calculates effective connectivity matrices at complex frequencies
+        lambda, including the delay distribution.
+
+        Parameters:
+        -----------
+        lambdas: Quantity(np.ndarray, '1/s')
+            Complex frequencies of arbitrary shape.
+
+        Returns:
+        --------
+        Quantity(np.ndarray, 'dimensionless'):
+            Effective connectivity with shape
+            lambdas.shape + (dimension, dimension).
+        """
+        return meanfield_calcs.effective_connectivity_laplace(
+            self.mean_input(),
+            self.std_input(),
+            self.network_params['tau_m'],
+            self.network_params['tau_s'],
+            self.network_params['tau_r'],
+            self.network_params['V_th_rel'],
+            self.network_params['V_0_rel'],
+            self.network_params['J'],
+            self.network_params['K'],
+            self.network_params['dimension'],
+            self.network_params['Delay'],
+            self.network_params['Delay_sd'],
+            self.network_params['delay_dist'],
+            lambdas)
+
+
+    @_profiled
+    def count_unstable_modes(self, max_real=None, max_imag=None,
+                             n_points=1000):
+        """
+        Counts the unstable modes of the network, i.e. the zeros of the
+        characteristic function det(I - MH(lambda)) with positive real part,
+        using the argument principle.
+
+        Only zeros with real part below max_real and imaginary part below
+        max_imag are counted. A warning is issued if the effective
+        connectivity has not decayed on the edges of this region, such that
+        unstable modes outside of it cannot be excluded.
+
+        Parameters:
+        -----------
+        max_real: Quantity(float, '1/s')
+            Largest real part of the searched region. Default is the largest
+            analysed angular frequency.
+        max_imag: Quantity(float, '1/s')
+            Largest imaginary part of the searched region. Default is the
+            largest analysed angular frequency.
+        n_points: int
+            Number of evaluation points on the upper half of the contour.
+
+        Returns:
+        --------
+        int:
+            Number of unstable modes.
+        float:
+            Error estimate of the count, should be well below 0.5.
+        """
+        omega_max = np.max(self.analysis_params['omegas'])
+        if max_real is None:
+            max_real = omega_max
+        if max_imag is None:
+            max_imag = omega_max
+
+        return meanfield_calcs.count_unstable_modes(
+            self.mean_input(),
+            self.std_input(),
+            self.network_params['tau_m'],
+            self.network_params['tau_s'],
+            self.network_params['tau_r'],
+            self.network_params['V_th_rel'],
+            self.network_params['V_0_rel'],
+            self.network_params['J'],
+            self.network_params['K'],
+            self.network_params['dimension'],
+            self.network_params['Delay'],
+            self.network_params['Delay_sd'],
+            self.network_params['delay_dist'],
+            0 * omega_max,
+            max_real,
+            max_imag,
+            n_points)
+
+
     @_check_and_store('eigenvalue_spectra', 'eigenvalue_matrix')
     def eigenvalue_spectra(self, matrix, method='shift'):
         """
@@ -778,6 +1640,59 @@ class Network(object):
                                                    matrix)
 
 
+    def leading_modes(self, k=1, criterion='closest_to_one', matrix='MH'):
+        """
+        Calculates the k leading eigenmodes of the specified matrix at all
+        frequencies.
+
+        In contrast to the eigen spectra, only the selected eigenvalues and
+        eigenvectors are computed and stored, see
+        meanfield_calcs.leading_modes.
+
+        Parameters:
+        -----------
+        k: int
+            Number of modes.
+        criterion: str
+            Selects the leading modes. Options are the eigenvalues closest to
+            1 ('closest_to_one'), with largest absolute value
+            ('largest_magnitude') and with largest real part
+            ('largest_real').
+        matrix: str
+            Specifying matrix which is analysed. Options are the effective
+            connectivity matrix ('MH'), the propagator ('prop') and
+            the inverse of the propagator ('prop_inv').
+
+        Returns:
+        --------
+        dict
+            Eigenvalues of shape (n_omegas, k) under key 'eigenvalues', and
+            right and left eigenvectors of shape (n_omegas, k, dimension)
+            under keys 'right_eigenvectors' and 'left_eigenvectors'.
+        """
+        # the stored results are identified by one string of all arguments
+        return self._leading_modes('{}:{}:{}'.format(matrix, criterion,
+                                                     int(k)))
+
+
+    @_check_and_store('leading_modes', 'leading_modes_specs')
+    def _leading_modes(self, spec):
+        """ Calculates leading_modes for spec 'matrix:criterion:k'. """
+        matrix, criterion, k = spec.split(':')
+        return meanfield_calcs.leading_modes(self.network_params['tau_m'],
+                                             self.network_params['tau_s'],
+                                             self.transfer_function(),
+                                             self.network_params['dimension'],
+                                             self.delay_dist_matrix(),
+                                             self.network_params['J'],
+                                             self.network_params['K'],
+                                             self.analysis_params['omegas'],
+                                             int(k),
+                                             criterion,
+                                             matrix)
+
+
+    @_profiled
     def additional_rates_for_fixed_input(self, mean_input_set, std_input_set):
         """
         Calculate additional external excitatory and inhibitory Poisson input
@@ -815,6 +1730,7 @@ class Network(object):
         return nu_e_ext, nu_i_ext
 
 
+    @_profiled
     def fit_transfer_function(self):
         """
         Fit the absolute value of the LIF transfer function to the one of a
@@ -860,7 +1776,9 @@ class Network(object):
         return tau_rate, W_rate, W_rate_sim, fit_tf, tf0_ecs
 
 
-    def scan_fit_transfer_function_mean_std_input(self, mean_inputs, std_inputs):
+    @_profiled
+    def scan_fit_transfer_function_mean_std_input(self, mean_inputs, std_inputs,
+                                                  progress=None, cancel=None):
         """
         Scan all combinations of mean_inputs and std_inputs: Compute and fit the
         transfer function for each case and return the relative fit errors on
@@ -872,6 +1790,12 @@ class Network(object):
             List of mean inputs to scan.
         std_inputs: Quantity(np.ndarray, 'mV')
             List of standard deviation of inputs to scan.
+        progress: callable
+            Called as progress(done, total) with the number of completed
+            combinations.
+        cancel: CancellationToken
+            Token for cancelling the scan, which then raises
+            ComputationCancelled.
 
         Returns:
         --------
@@ -888,16 +1812,19 @@ class Network(object):
                 self.network_params['tau_r'],
                 self.network_params['V_0_rel'],
                 self.network_params['V_th_rel'],
-                self.analysis_params['omegas'])
+                self.analysis_params['omegas'],
+                progress=progress, cancel=cancel)
         return errs_tau, errs_h0
 
 
-    def linear_interpolation_alpha(self, k_wavenumbers, network):
+    @_profiled
+    def linear_interpolation_alpha(self, k_wavenumbers, network, alphas=None,
+                                   n_jobs=1):
         """
         Linear interpolation between analytically solved characteristic equation
         for linear rate model and equation solved for lif model.
-        Eigenvalues lambda are computed by solving the characteristic equation
-        numerically or by solving an integral.
+        Eigenvalues lambda are followed from the rate model to the lif model
+        by predictor-corrector continuation.
         Reguires a spatially organized network with boxcar connectivity profile.
 
         Parameters:
@@ -906,17 +1833,22 @@ class Network(object):
             Range of wave numbers.
         network: Network object
             A network.
+        alphas: np.ndarray
+            Increasing interpolation parameters in [0, 1]. Default is
+            np.linspace(0, 1, 5).
+        n_jobs: int
+            Number of processes the branches are distributed to.
 
         Returns:
         --------
         alphas: np.ndarray
-        lambdas_chareq: Quantity(np.ndarray, '1/s')
-        lambdas_integral: Quantity(np.ndarray, '1/s')
+        lambdas: Quantity(np.ndarray, '1/s')
+        n_steps: np.ndarray
         k_eig_max: Quantity(float, '1/m')
         eigenval_max: Quantity(complex, '1/s')
         eigenvals: Quantity(np.ndarray, '1/s')
         """
-        alphas, lambdas_chareq, lambdas_integral, k_eig_max, eigenval_max, eigenvals = \
+        alphas, lambdas, n_steps, k_eig_max, eigenval_max, eigenvals = \
             meanfield_calcs.linear_interpolation_alpha( \
                 k_wavenumbers,
                 self.analysis_params['branches'],
@@ -935,29 +1867,39 @@ class Network(object):
                 self.network_params['J'],
                 self.network_params['K'],
                 self.network_params['dimension'],
+                alphas,
+                n_jobs,
                 )
-        return alphas, lambdas_chareq, lambdas_integral, k_eig_max, eigenval_max, eigenvals
+        return alphas, lambdas, n_steps, k_eig_max, eigenval_max, eigenvals
 
 
-    def compute_profile_characteristics(self):
+    @_profiled
+    def compute_profile_characteristics(self, refine=False):
         """
+        Compute characteristics of the spatial profile of the linearized rate
+        model and store them in self.results.
+
+        Requires a spatially organized network with boxcar connectivity
+        profile.
+
+        Parameters:
+        -----------
+        refine: bool
+            Whether the extrema of the profile are refined between the
+            wavenumbers in analysis_params['k_wavenumbers'].
         """
         xi_min, xi_max, k_min, k_max = \
             meanfield_calcs.xi_of_k(self.analysis_params['k_wavenumbers'],
                                     self.network_params['W_rate'],
-                                    self.network_params['width'])
+                                    self.network_params['width'],
+                                    refine)
 
-        lambda_min = meanfield_calcs.solve_chareq_rate_boxcar( \
+        # solve characteristic equation at k_min and k_max in one call
+        k_extrema = (np.array([k_min.magnitude, k_max.to(k_min.units).magnitude])
+                     * k_min.units)
+        lambda_min, lambda_max = meanfield_calcs.solve_chareq_rate_boxcar( \
             0, # branch
-            k_min,
-            self.network_params['tau_rate'][0],
-            self.network_params['W_rate'],
-            self.network_params['width'],
-            self.network_params['d_e']
-            )
-        lambda_max = meanfield_calcs.solve_chareq_rate_boxcar( \
-            0, # branch
-            k_max,
+            k_extrema,
             self.network_params['tau_rate'][0],
             self.network_params['W_rate'],
             self.network_params['width'],
@@ -979,7 +1921,91 @@ class Network(object):
                           self.network_params['d_e'].to(ureg.ms).magnitude,
             'lambda_min' : lambda_min,
             'lambda_max' : lambda_max,
-            'lambda_f_min' : np.imag(lambda_min) / (2.*np.pi),
-            'speed' : np.imag(lambda_min.to(1/ureg.s)) / k_min.to(1/ureg.m),
+            'lambda_f_min' : lambda_min.imag / (2.*np.pi),
+            'speed' : lambda_min.to(1/ureg.s).imag / k_min.to(1/ureg.m),
             })
         return
+
+
+def _awaitable(name):
+    """ Create the awaitable counterpart of the network method name. """
+    async def method(self, *args, **kwargs):
+        return await self._run_async(name, *args, **kwargs)
+    method.__name__ = 'a' + name
+    method.__qualname__ = 'Network.a' + name
+    method.__doc__ = (
+        """
+        Awaitable counterpart of {0}, see Network.{0}.
+
+        The computation runs on the executor of the network, see
+        Network._run_async.
+        """.format(name))
+    return method
+
+
+for _name in Network._async_methods:
+    setattr(Network, 'a' + _name, _awaitable(_name))
+
+
+def _call_key(name, args, kwargs):
+    """
+    Hashable key identifying a method call by its arguments.
+
+    Quantities and arrays are identified by their values. Returns None if an
+    argument cannot be identified, in which case the call is not shared.
+    """
+    def identify(value):
+        if isinstance(value, ureg.Quantity):
+            return ('quantity', identify(value.magnitude), str(value.units))
+        if isinstance(value, np.ndarray):
+            return ('array', value.dtype.str, value.shape, value.tobytes())
+        if isinstance(value, (list, tuple)):
+            return (type(value).__name__,) + tuple(identify(v) for v in value)
+        if isinstance(value, dict):
+            return ('dict',) + tuple(sorted((k, identify(v))
+                                            for k, v in value.items()))
+        hash(value)
+        return value
+
+    try:
+        return (name, identify(args),
+                tuple(sorted((k, identify(v)) for k, v in kwargs.items())))
+    except TypeError:
+        return None
+
+
+def _to_single_precision(array):
+    """ Convert double precision array to single precision. """
+    array = np.asarray(array)
+    if array.dtype == np.complex128:
+        return array.astype(np.complex64)
+    if array.dtype == np.float64:
+        return array.astype(np.float32)
+    return array
+
+
+def _changed_keys(old_params, new_params):
+    """
+    Return the keys of all parameters that differ between two dictionaries.
+    """
+    return set(key for key in set(old_params).union(new_params)
+               if key not in old_params or key not in new_params
+               or _param_changed(old_params[key], new_params[key]))
+
+
+def _param_changed(old, new):
+    """ Compare two parameter values, which may be quantities or arrays. """
+    if old is new:
+        return False
+    if isinstance(old, ureg.Quantity) != isinstance(new, ureg.Quantity):
+        return True
+    if isinstance(old, ureg.Quantity):
+        try:
+            new = new.to(old.units)
+        except Exception:
+            return True
+        old, new = old.magnitude, new.magnitude
+    try:
+        return not np.array_equal(old, new)
+    except Exception:
+        return old != new
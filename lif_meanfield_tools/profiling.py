@@ -0,0 +1,193 @@
+"""
+Opt-in profiling of network computations.
+
+A Profile collects for each result key of a network, and for each entry
+point of meanfield_calcs, the number of calls, the hits and misses of the
+result cache, the wall time spent computing and the number of evaluations of
+expensive kernels, like the integrals of the Siegert formula, evaluations of
+the parabolic cylinder functions and matrix inversions and decompositions.
+
+Computations are only timed and counted while a profile is recording, see
+Profile.record. Otherwise the instrumentation reduces to checking whether any
+profile is recording. Computations nested in other computations, e.g. the
+transfer function computed for the power spectra, are recorded under their
+own key and in addition contribute to the time and kernel counts of all
+enclosing computations. The time spent in a computation excluding nested
+recorded computations is given as self time.
+
+Kernels evaluated in other processes, e.g. with n_jobs > 1, are not counted.
+
+Classes:
+--------
+Profile
+
+Functions:
+----------
+count
+profiled
+"""
+
+from __future__ import print_function
+import contextlib
+import copy
+import functools
+import threading
+import time
+
+# computations currently recorded in this thread, innermost last
+_recording = threading.local()
+
+
+def _frames():
+    """ Stack of the computations currently recorded in this thread. """
+    frames = getattr(_recording, 'frames', None)
+    if frames is None:
+        frames = _recording.frames = []
+    return frames
+
+
+def count(kernel, n=1):
+    """
+    Count evaluations of an expensive kernel.
+
+    The evaluations are added to all computations currently recorded. Does
+    nothing if no profile is recording.
+
+    Parameters:
+    -----------
+    kernel: str
+        Name of the kernel, e.g. 'siegert_quad' or 'inv'.
+    n: int
+        Number of evaluations.
+    """
+    frames = getattr(_recording, 'frames', None)
+    if frames:
+        for frame in frames:
+            kernels = frame['stats']['kernels']
+            kernels[kernel] = kernels.get(kernel, 0) + n
+
+
+def profiled(func):
+    """
+    Decorator recording calls of a function in the innermost active profile.
+
+    The calls are recorded under '<module>.<function>', e.g.
+    'meanfield_calcs.power_spectra'. If no profile is recording, the function
+    is called without overhead other than this check.
+    """
+    key = '{}.{}'.format(func.__module__.split('.')[-1], func.__name__)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        frames = getattr(_recording, 'frames', None)
+        if not frames:
+            return func(*args, **kwargs)
+        with frames[-1]['profile'].record(key):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class Profile(object):
+    """
+    Timings and counts of the computations of one or several networks.
+
+    A profile can be shared by several networks, e.g. all networks of a
+    parameter sweep, which then accumulate their statistics.
+
+    The statistics of each key are a dictionary with entries
+
+    calls: int
+        Number of recorded computations.
+    hits: int
+        Number of requests answered from the result cache.
+    misses: int
+        Number of requests that required a computation.
+    time: float
+        Wall time of all computations in seconds, including nested ones.
+    self_time: float
+        Wall time in seconds, excluding nested recorded computations.
+    kernels: dict
+        Number of evaluations of each expensive kernel.
+    """
+
+    def __init__(self):
+        self._stats = {}
+
+    def _entry(self, key):
+        if key not in self._stats:
+            self._stats[key] = {'calls': 0, 'hits': 0, 'misses': 0,
+                                'time': 0., 'self_time': 0., 'kernels': {}}
+        return self._stats[key]
+
+    def hit(self, key):
+        """ Count a request answered from the result cache. """
+        self._entry(key)['hits'] += 1
+
+    @contextlib.contextmanager
+    def record(self, key, miss=False):
+        """
+        Context manager recording the computation of a result.
+
+        Parameters:
+        -----------
+        key: str
+            Key the computation is recorded under.
+        miss: bool
+            Whether the computation is due to a miss of the result cache.
+        """
+        stats = self._entry(key)
+        stats['calls'] += 1
+        if miss:
+            stats['misses'] += 1
+        frames = _frames()
+        frame = {'profile': self, 'stats': stats, 'nested_time': 0.}
+        frames.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            frames.pop()
+            stats['time'] += elapsed
+            stats['self_time'] += elapsed - frame['nested_time']
+            if frames:
+                frames[-1]['nested_time'] += elapsed
+
+    def reset(self):
+        """ Remove all recorded statistics. """
+        self._stats = {}
+
+    def as_dict(self):
+        """
+        Recorded statistics as a dictionary.
+
+        Returns:
+        --------
+        dict
+            Statistics of each key, see class docstring.
+        """
+        return copy.deepcopy(self._stats)
+
+    def report(self):
+        """
+        Recorded statistics as a table, sorted by decreasing time.
+
+        Returns:
+        --------
+        str
+        """
+        if not self._stats:
+            return 'No computations recorded.'
+        width = max(len('key'), max(len(key) for key in self._stats))
+        lines = ['{:<{w}} {:>6} {:>6} {:>6} {:>10} {:>10}  kernels'.format(
+            'key', 'calls', 'hits', 'misses', 'time [s]', 'self [s]',
+            w=width)]
+        for key, stats in sorted(self._stats.items(),
+                                 key=lambda item: -item[1]['time']):
+            kernels = ', '.join('{}: {}'.format(kernel, n) for kernel, n
+                                in sorted(stats['kernels'].items()))
+            lines.append(
+                '{:<{w}} {:>6} {:>6} {:>6} {:>10.4f} {:>10.4f}  {}'.format(
+                    key, stats['calls'], stats['hits'], stats['misses'],
+                    stats['time'], stats['self_time'], kernels, w=width))
+        return '\n'.join(lines)
@@ -0,0 +1,78 @@
+"""
+Progress reporting and cooperative cancellation of long computations.
+
+Long running computations accept a progress callback and a cancellation
+token. The callback is called as progress(done, total) whenever a step,
+e.g. one frequency of a transfer function, has been completed. The token is
+checked between steps, and a cancelled computation raises
+ComputationCancelled. The token may be cancelled from another thread, e.g. a
+user interface or a signal handler.
+
+Classes:
+--------
+CancellationToken
+ComputationCancelled
+
+Functions:
+----------
+step
+"""
+
+from __future__ import print_function
+import threading
+
+
+class ComputationCancelled(Exception):
+    """ Raised when a computation is cancelled by its CancellationToken. """
+
+
+class CancellationToken(object):
+    """
+    Token for cancelling running computations.
+
+    The same token can be passed to several computations, which are all
+    cancelled at their next step once the token is cancelled.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self):
+        """ Whether cancellation has been requested. """
+        return self._event.is_set()
+
+    def cancel(self):
+        """ Request cancellation. """
+        self._event.set()
+
+    def raise_if_cancelled(self):
+        """ Raise ComputationCancelled if cancellation has been requested. """
+        if self.cancelled:
+            raise ComputationCancelled('Computation has been cancelled.')
+
+
+def step(done, total, progress=None, cancel=None):
+    """
+    Report a completed step and check for cancellation.
+
+    Parameters:
+    -----------
+    done: int
+        Number of completed steps.
+    total: int
+        Total number of steps.
+    progress: callable
+        Called as progress(done, total), if given.
+    cancel: CancellationToken
+        Checked for cancellation if given, unless all steps are done.
+
+    Raises:
+    -------
+    ComputationCancelled
+        If cancel has been cancelled.
+    """
+    if progress is not None:
+        progress(done, total)
+    if cancel is not None and done < total:
+        cancel.raise_if_cancelled()
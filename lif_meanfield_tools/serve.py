@@ -0,0 +1,413 @@
+"""
+Long-lived compute server keeping warm networks in memory.
+
+Analysis jobs that connect to a running server do not pay for importing the
+package, parsing the parameter files and computing results that have been
+requested before. The server holds a pool of networks, keyed by the hashes of
+their network and analysis parameters, and answers the queries of clients,
+e.g. for working points, transfer functions and spectra, from the cached
+results of these networks.
+
+Start a server on a Unix socket or on a localhost port with
+
+    python -m lif_meanfield_tools.serve --socket /tmp/lmt.sock
+    python -m lif_meanfield_tools.serve --port 6006
+
+and query it with
+
+    with Client('/tmp/lmt.sock') as client:
+        network = client.network('network_params.yaml',
+                                 'analysis_params.yaml')
+        power = network.power_spectra()
+
+The remote network mirrors the computing methods of Network listed in
+SERVED_METHODS. Requests and results are pickled, so clients need to be
+trusted. The server only accepts connections authenticated with the key in
+the environment variable LMT_SERVE_AUTHKEY, which is required for a port.
+Unix sockets are only accessible for the user running the server.
+
+Classes:
+--------
+Server
+Client
+RemoteNetwork
+
+Functions:
+----------
+main
+"""
+
+from __future__ import print_function
+import argparse
+import collections
+import copyreg
+import io as _io
+import os
+import pickle
+import socket
+import sys
+import threading
+from multiprocessing import connection
+
+from . import ureg
+from . import input_output as io
+from .network import Network
+from .working_point_cache import WorkingPointCache
+
+# computing methods of Network that can be called remotely
+SERVED_METHODS = ['firing_rates', 'mean_input', 'std_input', 'working_point',
+                  'delay_dist_matrix', 'transfer_function',
+                  'sensitivity_measure', 'power_spectra', 'cross_spectra',
+                  'covariance_functions', 'coherence', 'phase_spectra',
+                  'transfer_function_laplace',
+                  'effective_connectivity_laplace', 'count_unstable_modes',
+                  'eigenvalue_spectra', 'r_eigenvec_spectra',
+                  'l_eigenvec_spectra', 'leading_modes',
+                  'additional_rates_for_fixed_input',
+                  'fit_transfer_function',
+                  'scan_fit_transfer_function_mean_std_input']
+
+AUTHKEY_VARIABLE = 'LMT_SERVE_AUTHKEY'
+
+# quantities are pickled by magnitude and unit, such that they are
+# unpickled in the registry of this package instead of pint's default one
+_dispatch_table = copyreg.dispatch_table.copy()
+_dispatch_table[ureg.Quantity] = lambda quantity: (
+    _make_quantity, (quantity.magnitude, str(quantity.units)))
+
+
+def _make_quantity(magnitude, units):
+    return ureg.Quantity(magnitude, units)
+
+
+def _send(conn, obj):
+    """ Pickle obj with quantities in this package's registry and send it. """
+    buffer = _io.BytesIO()
+    pickler = pickle.Pickler(buffer, pickle.HIGHEST_PROTOCOL)
+    pickler.dispatch_table = _dispatch_table
+    pickler.dump(obj)
+    conn.send_bytes(buffer.getvalue())
+
+
+def _receive(conn):
+    return pickle.loads(conn.recv_bytes())
+
+
+def _family(address):
+    """ Connection family of a Unix socket path or a (host, port) tuple. """
+    return 'AF_UNIX' if isinstance(address, str) else 'AF_INET'
+
+
+class Server(object):
+    """
+    Server answering queries with a pool of warm networks.
+
+    Networks are identified by the hashes of their network and analysis
+    parameters, such that queries for the same parameters given in different
+    ways share one network. The least recently used networks are dropped if
+    the pool exceeds max_networks. All networks share one working point
+    cache, such that networks with new parameters start from the working
+    point of the nearest known parameters.
+
+    Each client connection is handled in its own thread. Computations on the
+    same network are run one after another.
+
+    Parameters:
+    -----------
+    address: str or tuple
+        Path of a Unix socket or (host, port); port 0 selects a free port.
+    authkey: bytes
+        Key clients need to authenticate with. Required for a port.
+    max_networks: int
+        Maximal number of networks kept in memory.
+    working_point_cache: WorkingPointCache
+        Cache of working points shared by all networks, if given.
+    """
+
+    def __init__(self, address, authkey=None, max_networks=16,
+                 working_point_cache=None):
+        if authkey is None and _family(address) == 'AF_INET':
+            raise ValueError('An authkey is required for serving on a port, '
+                             'set {}.'.format(AUTHKEY_VARIABLE))
+        self.max_networks = max_networks
+        self.working_point_cache = working_point_cache
+        self.networks = collections.OrderedDict()
+        # keys of the networks built for each request specification
+        self._specs = {}
+        self._lock = threading.Lock()
+        self._authkey = authkey
+        self._closed = False
+        umask = os.umask(0o177)
+        try:
+            self._listener = connection.Listener(address, _family(address),
+                                                 authkey=authkey)
+        finally:
+            os.umask(umask)
+        self.address = self._listener.address
+
+    def network(self, spec):
+        """
+        Return the network for the given specification from the pool.
+
+        Parameters:
+        -----------
+        spec: dict
+            Arguments network_params, analysis_params, new_network_params
+            and new_analysis_params for creating the network. Parameter
+            files must be given by absolute paths.
+
+        Returns:
+        --------
+        Network
+        """
+        spec_key = _spec_key(spec)
+        with self._lock:
+            key = self._specs.get(spec_key)
+            if key in self.networks:
+                self.networks.move_to_end(key)
+                return self.networks[key]
+
+        network = Network(working_point_cache=self.working_point_cache,
+                          **spec)
+        key = (network.hash,
+               io.create_hash(network.analysis_params,
+                              network.analysis_params.keys()))
+        with self._lock:
+            network = self.networks.setdefault(key, network)
+            self.networks.move_to_end(key)
+            self._specs[spec_key] = key
+            while len(self.networks) > self.max_networks:
+                dropped, _ = self.networks.popitem(last=False)
+                self._specs = {spec: kept for spec, kept
+                               in self._specs.items() if kept != dropped}
+        return network
+
+    def handle(self, request):
+        """
+        Answer a request.
+
+        Parameters:
+        -----------
+        request: dict
+            With entry 'op', which is 'call' for calling a network method,
+            given by entries spec, method, args and kwargs, or 'stats' for
+            the keys of the networks in the pool.
+
+        Returns:
+        --------
+        Result of the request.
+        """
+        if request['op'] == 'call':
+            if request['method'] not in SERVED_METHODS:
+                raise ValueError('Method {} is not served.'.format(
+                    request['method']))
+            network = self.network(request['spec'])
+            return network._run_locked(request['method'], *request['args'],
+                                       **request['kwargs'])
+        elif request['op'] == 'stats':
+            with self._lock:
+                return {'networks': list(self.networks)}
+        raise ValueError('Unknown request {}.'.format(request['op']))
+
+    def _serve_connection(self, conn):
+        """ Answer the requests of one client until it disconnects. """
+        with conn:
+            while True:
+                try:
+                    request = _receive(conn)
+                except (EOFError, OSError):
+                    return
+                try:
+                    response = ('ok', self.handle(request))
+                except Exception as error:
+                    response = ('error', error)
+                try:
+                    _send(conn, response)
+                except (pickle.PicklingError, TypeError, AttributeError):
+                    _send(conn, ('error', RuntimeError(repr(response[1]))))
+
+    def serve_forever(self):
+        """ Accept and serve clients until the server is closed. """
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError, connection.AuthenticationError):
+                # failed handshake or closed listener
+                continue
+            if self._closed:
+                conn.close()
+                break
+            threading.Thread(target=self._serve_connection, args=(conn,),
+                             daemon=True).start()
+
+    def close(self):
+        """ Stop serving and close the listener. """
+        if self._closed:
+            return
+        self._closed = True
+        # wake up a blocking accept, without waiting for a handshake
+        try:
+            with socket.socket(getattr(socket, _family(self.address))) as sock:
+                sock.settimeout(1)
+                sock.connect(self.address)
+        except OSError:
+            pass
+        self._listener.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _spec_key(spec):
+    """
+    Hash of a network specification.
+
+    Parameter files are represented by their path and modification time,
+    such that edited files are loaded again.
+    """
+    spec = dict(spec)
+    for key in ['network_params', 'analysis_params']:
+        if isinstance(spec.get(key), str):
+            spec[key] = (spec[key], os.path.getmtime(spec[key]))
+    return io.create_hash(spec, spec.keys())
+
+
+class Client(object):
+    """
+    Connection to a server.
+
+    The connection can be shared by several threads, whose requests are sent
+    one after another.
+
+    Parameters:
+    -----------
+    address: str or tuple
+        Path of the Unix socket or (host, port) of the server.
+    authkey: bytes
+        Key to authenticate with; defaults to the environment variable
+        LMT_SERVE_AUTHKEY.
+    """
+
+    def __init__(self, address, authkey=None):
+        if authkey is None and AUTHKEY_VARIABLE in os.environ:
+            authkey = os.environ[AUTHKEY_VARIABLE].encode()
+        self._conn = connection.Client(address, _family(address),
+                                       authkey=authkey)
+        self._lock = threading.Lock()
+
+    def request(self, request):
+        """ Send a request, see Server.handle, and return the result. """
+        with self._lock:
+            _send(self._conn, request)
+            status, result = _receive(self._conn)
+        if status == 'error':
+            raise result
+        return result
+
+    def network(self, network_params=None, analysis_params=None,
+                new_network_params={}, new_analysis_params={}):
+        """
+        Remote network with the given parameters, see Network.
+
+        Returns:
+        --------
+        RemoteNetwork
+        """
+        spec = dict(network_params=network_params,
+                    analysis_params=analysis_params,
+                    new_network_params=new_network_params,
+                    new_analysis_params=new_analysis_params)
+        for key in ['network_params', 'analysis_params']:
+            if isinstance(spec[key], str):
+                spec[key] = os.path.abspath(spec[key])
+        return RemoteNetwork(self, spec)
+
+    def stats(self):
+        """ Keys of the networks held by the server. """
+        return self.request({'op': 'stats'})
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RemoteNetwork(object):
+    """
+    Network held by a server, with the methods listed in SERVED_METHODS.
+
+    Parameters:
+    -----------
+    client: Client
+        Connection to the server.
+    spec: dict
+        Arguments for creating the network, see Server.network.
+    """
+
+    def __init__(self, client, spec):
+        self.client = client
+        self.spec = spec
+
+    def call(self, method, *args, **kwargs):
+        """ Call a network method on the server and return its result. """
+        return self.client.request({'op': 'call', 'spec': self.spec,
+                                    'method': method, 'args': args,
+                                    'kwargs': kwargs})
+
+
+def _remote(name):
+    """ Create the remote counterpart of the network method name. """
+    def method(self, *args, **kwargs):
+        return self.call(name, *args, **kwargs)
+    method.__name__ = name
+    method.__qualname__ = 'RemoteNetwork.' + name
+    method.__doc__ = getattr(Network, name).__doc__
+    return method
+
+
+for _name in SERVED_METHODS:
+    setattr(RemoteNetwork, _name, _remote(_name))
+
+
+def main(argv=None):
+    """ Run a server until interrupted, see module docstring. """
+    parser = argparse.ArgumentParser(
+        prog='python -m lif_meanfield_tools.serve',
+        description='Serve lif_meanfield_tools networks from memory.')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--socket', help='path of the Unix socket')
+    target.add_argument('--port', type=int, help='localhost port')
+    parser.add_argument('--host', default='localhost',
+                        help='host to bind the port to')
+    parser.add_argument('--max-networks', type=int, default=16,
+                        help='maximal number of networks kept in memory')
+    args = parser.parse_args(argv)
+
+    address = args.socket if args.socket else (args.host, args.port)
+    authkey = os.environ.get(AUTHKEY_VARIABLE)
+    try:
+        server = Server(address,
+                        authkey=authkey.encode() if authkey else None,
+                        max_networks=args.max_networks,
+                        working_point_cache=WorkingPointCache())
+    except ValueError as error:
+        parser.error(str(error))
+    print('Serving on {}'.format(server.address))
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
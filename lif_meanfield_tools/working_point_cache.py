@@ -0,0 +1,161 @@
+"""
+In-process cache of solved working points.
+
+The stationary firing rates are found by an iteration procedure, which
+converges much faster if it is started close to the solution. Parameter
+sweeps usually change parameters in small steps, such that the working point
+of a neighbouring parameter set is a good initial guess. The cache stores
+the firing rates of all solved working points together with the parameters
+they have been computed for and supplies the rates of the nearest stored
+parameter set.
+
+Classes:
+--------
+WorkingPointCache
+"""
+
+from __future__ import print_function
+import numpy as np
+
+
+class WorkingPointCache(object):
+    """
+    Cache of working points, searchable by relative parameter distance.
+
+    A lookup returns the firing rates of the stored parameter set with the
+    smallest relative distance to the requested one, if this distance does
+    not exceed max_distance. The relative distance is the largest relative
+    deviation of any parameter entry. Parameter sets of different shape,
+    e.g. networks with a different number of populations, are never
+    considered close.
+
+    The same cache can be shared by several networks, e.g. all networks of
+    a parameter sweep.
+
+    Networks can be multistable. Starting the iteration from the working
+    point of a distant parameter set may then converge to a different fixed
+    point than a cold start. Therefore, the default max_distance only
+    admits small parameter steps. Larger radii have to be requested
+    explicitly.
+
+    Parameters:
+    -----------
+    max_distance: float
+        Largest relative parameter distance for which a stored working point
+        is used as initial guess. Default is 0.05.
+    max_size: int
+        Maximal number of stored working points. If exceeded, the oldest
+        entries are dropped.
+
+    Attributes:
+    -----------
+    hits: int
+        Number of lookups that supplied an initial guess.
+    misses: int
+        Number of lookups without suitable stored working point.
+    iterations: list
+        Number of iteration steps of each solve recorded in the cache.
+    """
+
+    def __init__(self, max_distance=0.05, max_size=1000):
+        self.max_distance = max_distance
+        self.max_size = max_size
+        self._params = []
+        self._rates = []
+        self.hits = 0
+        self.misses = 0
+        self.iterations = []
+
+    def __len__(self):
+        return len(self._rates)
+
+    @staticmethod
+    def _flatten(params):
+        """ Concatenate all parameters to one float array per shape. """
+        return [np.atleast_1d(np.asarray(p, dtype=float)).ravel()
+                for p in params]
+
+    def _distance(self, params, stored_params):
+        """ Largest relative deviation of any parameter entry. """
+        if len(params) != len(stored_params):
+            return np.inf
+        distance = 0.
+        for p, q in zip(params, stored_params):
+            if p.shape != q.shape:
+                return np.inf
+            scale = np.maximum(np.abs(p), np.abs(q))
+            deviation = np.abs(p - q)
+            nonzero = scale > 0
+            distance = max(distance,
+                           np.max(deviation[nonzero] / scale[nonzero],
+                                  initial=0.))
+        return distance
+
+    def lookup(self, params):
+        """
+        Find the working point of the nearest stored parameter set.
+
+        Parameters:
+        -----------
+        params: sequence
+            Parameters the firing rates depend on, without units.
+
+        Returns:
+        --------
+        np.ndarray or None
+            Stored firing rates, or None if no stored parameter set is close
+            enough.
+        """
+        params = self._flatten(params)
+        distances = [self._distance(params, stored)
+                     for stored in self._params]
+        if distances and np.isfinite(np.min(distances)) \
+                and np.min(distances) <= self.max_distance:
+            self.hits += 1
+            return self._rates[int(np.argmin(distances))].copy()
+        self.misses += 1
+        return None
+
+    def store(self, params, rates, n_iterations=None):
+        """
+        Store a solved working point.
+
+        Parameters:
+        -----------
+        params: sequence
+            Parameters the firing rates depend on, without units.
+        rates: np.ndarray
+            Firing rates, without units.
+        n_iterations: int
+            Number of iteration steps the solution took.
+        """
+        self._params.append(self._flatten(params))
+        self._rates.append(np.array(rates, dtype=float))
+        if len(self._rates) > self.max_size:
+            self._params.pop(0)
+            self._rates.pop(0)
+        if n_iterations is not None:
+            self.iterations.append(n_iterations)
+
+    def clear(self):
+        """ Remove all stored working points and reset the statistics. """
+        self.__init__(self.max_distance, self.max_size)
+
+    def stats(self):
+        """
+        Summary of the cache usage.
+
+        Returns:
+        --------
+        dict
+            Number of stored working points, hits, misses, hit rate and
+            the total and mean number of iteration steps.
+        """
+        lookups = self.hits + self.misses
+        return {'size': len(self),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.,
+                'total_iterations': int(np.sum(self.iterations)),
+                'mean_iterations': (float(np.mean(self.iterations))
+                                    if self.iterations else 0.)}
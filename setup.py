@@ -17,7 +17,6 @@ setup(name = 'lif_meanfield_tools',
         'h5py>=2.5',
         'matplotlib>=2.0',
         'pint',
-        'h5py_wrapper',
         'pyyaml',
         'requests',
         'mpmath',
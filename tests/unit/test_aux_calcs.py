@@ -1,6 +1,7 @@
 import pytest
 import numpy as np
-from numpy.testing import assert_array_almost_equal
+import mpmath
+from numpy.testing import assert_array_almost_equal, assert_allclose
 from scipy.special import erf, zetac
 from scipy.integrate import quad
 
@@ -19,6 +20,8 @@ from lif_meanfield_tools.aux_calcs import (
     nu0_fb433,
     nu0_fb,
     nu_0,
+    nu_0_array,
+    nu0_fb433_array,
     Phi,
     Phi_prime_mu,
     d_nu_d_mu,
@@ -27,9 +30,24 @@ from lif_meanfield_tools.aux_calcs import (
     Psi,
     d_Psi,
     d_2_Psi,
+    d_Psi_d_z,
+    d_d_Psi_d_z,
+    Psi_and_derivative,
+    Psi_x_r,
+    dPsi_x_r,
+    d2Psi_x_r,
+    Psi_x_r_derivatives,
+    Psi_x_r_derivatives_d_z,
     p_hat_boxcar,
     determinant,
+    solve_chareq_rate_boxcar,
+    PSI_RTOL,
+    _Psi_asymptotic,
+    _Psi_series,
+    _Psi_recurrence,
+    _Psi_mpmath,
     )
+from lif_meanfield_tools import aux_calcs
 
 ureg = lmt.ureg
 
@@ -192,6 +210,82 @@ class Test_nu_0:
         mock.assert_called_once()
         
         
+class Test_nu_0_array:
+
+    func = staticmethod(nu_0_array)
+    mus = np.linspace(-30, 40, 36)
+    sigmas = np.array([0.5, 1, 2, 5, 10, 20])
+
+    def test_agrees_with_nu_0(self):
+        mu, sigma = np.meshgrid(self.mus, self.sigmas)
+        args = (10e-3, 2e-3, 15., 0.)
+        rates = self.func(*args, mu, sigma)
+        expected = np.array([[nu_0(*args, m, s) for m in self.mus]
+                             for s in self.sigmas])
+        assert rates.shape == mu.shape
+        assert_allclose(rates, expected, rtol=1e-11, atol=1e-20)
+
+    def test_parameters_are_broadcast(self):
+        tau_m = np.array([[10e-3], [20e-3]])
+        rates = self.func(tau_m, 2e-3, 15., 0., np.array([5., 10.]), 5.)
+        assert rates.shape == (2, 2)
+        assert_allclose(rates[1, 0], nu_0(20e-3, 2e-3, 15., 0., 5., 5.),
+                        rtol=1e-11)
+
+    def test_zero_for_far_subthreshold_input(self):
+        assert self.func(10e-3, 2e-3, 15., 0., np.array([-100.]), 1.) == 0
+
+    @pytest.mark.parametrize('mu, sigma', [(14.87, 0.066), (15., 0.05),
+                                           (40., 0.1), (10., 1.)])
+    def test_accurate_for_reset_far_below_mean_input(self, mu, sigma):
+        tau_m, tau_r, V_th, V_0 = 10e-3, 2e-3, 15., 0.
+        with mpmath.workdps(30):
+            y_th = mpmath.mpf(V_th - mu) / sigma
+            y_r = mpmath.mpf(V_0 - mu) / sigma
+            integral = mpmath.quad(
+                lambda u: mpmath.exp(u**2) * mpmath.erfc(-u),
+                [y_r] + [p for p in (-100, -10, -1, 0, 1) if y_r < p < y_th]
+                + [y_th])
+            expected = float(1 / (tau_r + tau_m * mpmath.sqrt(mpmath.pi)
+                                  * integral))
+        rate = self.func(tau_m, tau_r, V_th, V_0, mu, sigma)
+        assert_allclose(rate, expected, rtol=1e-12)
+
+
+class Test_nu0_fb433_array:
+
+    func = staticmethod(nu0_fb433_array)
+
+    def test_agrees_with_nu0_fb433(self):
+        mus = np.linspace(-20, 10, 16)
+        sigmas = np.array([1, 2, 5, 10])
+        mu, sigma = np.meshgrid(mus, sigmas)
+        args = (10e-3, 0.5e-3, 2e-3, 15., 0.)
+        rates = self.func(*args, mu, sigma)
+        expected = np.array([[nu0_fb433(*args, m, s) for m in mus]
+                             for s in sigmas])
+        assert_allclose(rates, expected, rtol=1e-6, atol=1e-20)
+
+    def test_accurate_for_strongly_driven_neurons(self):
+        # Phi in nu0_fb433 loses all digits in 1 + erf(s) for s << 0
+        tau_m, tau_s, tau_r, V_th, V_0, mu, sigma = (10e-3, 0.5e-3, 2e-3,
+                                                     15., 0., 40., 5.)
+
+        def mp_Phi(s):
+            s = mpmath.mpf(s)
+            return (mpmath.sqrt(mpmath.pi / 2) * mpmath.exp(s**2 / 2)
+                    * mpmath.erfc(-s / mpmath.sqrt(2)))
+
+        alpha = np.sqrt(2.) * abs(zetac(0.5) + 1)
+        r = nu_0(tau_m, tau_r, V_th, V_0, mu, sigma)
+        dPhi = float(mp_Phi(np.sqrt(2.) * (V_th - mu) / sigma)
+                     - mp_Phi(np.sqrt(2.) * (V_0 - mu) / sigma))
+        expected = (r - np.sqrt(tau_s / tau_m) * alpha / (tau_m * np.sqrt(2))
+                    * dPhi * (r * tau_m)**2)
+        rate = self.func(tau_m, tau_s, tau_r, V_th, V_0, mu, sigma)
+        assert_allclose(rate, expected, rtol=1e-10)
+
+
 class Test_Phi:
     
     func = staticmethod(Phi)
@@ -316,17 +410,127 @@ class Test_Psi:
     
     func = staticmethod(Psi)
 
-    def test_correct_output(self, mocker):
+    def test_correct_output(self):
         fixtures = np.load(fixture_path + 'Psi.npz')
         zs = fixtures['zs']
         xs = fixtures['xs']
-        pcfus = fixtures['pcfus']
         outputs = fixtures['outputs']
-        mock = mocker.patch('lif_meanfield_tools.aux_calcs.mpmath.pcfu')
-        mock.side_effect = pcfus
         for z, x, output in zip(zs, xs, outputs):
             result = self.func(z, x)
-            assert result == output
+            assert_allclose(result, output, rtol=1e-10)
+
+    @pytest.mark.parametrize('tier', [_Psi_asymptotic,
+                                      _Psi_series,
+                                      _Psi_recurrence])
+    def test_tiers_are_as_accurate_as_estimated(self, tier):
+        used = 0
+        for z in -0.5 + 1j * np.linspace(0, 30, 7):
+            for x in np.linspace(-12, 6, 10):
+                value, d_value, error = tier(z, x)
+                if error > PSI_RTOL:
+                    continue
+                used += 1
+                with mpmath.workdps(30):
+                    expected = complex(_Psi_mpmath(z, x))
+                    d_expected = complex((0.5 + z) * _Psi_mpmath(z + 1, x))
+                assert_allclose(value, expected, rtol=10 * PSI_RTOL)
+                assert_allclose(d_value, d_expected, rtol=10 * PSI_RTOL)
+        assert used > 0
+
+    def test_falls_back_to_mpmath_if_tiers_are_inaccurate(self, mocker):
+        mocker.patch('lif_meanfield_tools.aux_calcs._Psi_asymptotic',
+                     return_value=(np.nan, np.nan, np.inf))
+        mocker.patch('lif_meanfield_tools.aux_calcs._Psi_series',
+                     return_value=(np.nan, np.nan, np.inf))
+        mocker.patch('lif_meanfield_tools.aux_calcs._Psi_recurrence',
+                     return_value=(np.nan, np.nan, np.inf))
+        mock = mocker.patch('lif_meanfield_tools.aux_calcs.mpmath.pcfu',
+                            return_value=mpmath.mpc(1, 2))
+        z, x = -0.5 + 2j, 1.
+        result = self.func(z, x)
+        mock.assert_called_once_with(z, -x)
+        assert result == np.exp(0.25) * (1 + 2j)
+
+    @pytest.mark.parametrize('x', [40., 43., 60.])
+    def test_recurrence_gives_up_beyond_float_range(self, x):
+        # Psi exceeds the float range, which is left to mpmath
+        value, d_value, error = _Psi_recurrence(-0.5 + 50j, x)
+        assert np.isnan(value) and np.isnan(d_value)
+        assert error == np.inf
+        result = self.func(-0.5 + 50j, x)
+        assert result == complex(_Psi_mpmath(-0.5 + 50j, x))
+
+
+class Test_Psi_and_derivative:
+
+    func = staticmethod(Psi_and_derivative)
+
+    @pytest.mark.parametrize('z, x', [(-0.5 + 0.2j, 1.5), (-0.5 + 12j, -3.),
+                                      (-0.5 + 25j, 4.), (0.3 - 1j, -10.)])
+    def test_agrees_with_Psi_and_d_Psi(self, z, x):
+        value, d_value = self.func(z, x)
+        assert_allclose(value, Psi(z, x), rtol=1e-10)
+        assert_allclose(d_value, d_Psi(z, x), rtol=1e-10)
+
+    def test_mpmath_fallback_uses_recurrence_for_derivative(self, mocker):
+        mocker.patch('lif_meanfield_tools.aux_calcs._Psi_fast',
+                     return_value=None)
+        z, x = -0.5 + 2j, 1.
+        with mpmath.workdps(30):
+            expected = (complex(_Psi_mpmath(z, x)),
+                        complex((0.5 + z) * _Psi_mpmath(z + 1, x)))
+        assert_allclose(self.func(z, x), expected, rtol=1e-14)
+
+
+class Test_Psi_x_r:
+
+    func = staticmethod(Psi_x_r)
+
+    @pytest.mark.parametrize('z, x, y', [(-0.5 + 3j, 1.2, 2.5),
+                                         (-0.5 + 3j, 1.2, 1.2 + 1e-9),
+                                         (-0.5 + 20j, -4., -4. - 1e-7)])
+    def test_correct_output(self, z, x, y):
+        with mpmath.workdps(50):
+            expected = complex(_Psi_mpmath(z, x) - _Psi_mpmath(z, y))
+        result = self.func(z, x, y)
+        assert_allclose(result, expected, rtol=1e-8)
+
+    def test_precision_is_only_raised_if_difference_cancels(self, mocker):
+        spy = mocker.spy(aux_calcs, '_Psi_mpmath')
+        self.func(-0.5 + 3j, 1.2, 2.5)
+        assert spy.call_count == 0
+        self.func(-0.5 + 3j, 1.2, 1.2 + 1e-9)
+        assert spy.call_count == 2
+
+
+class Test_Psi_x_r_derivatives:
+
+    func = staticmethod(Psi_x_r_derivatives)
+
+    @pytest.mark.parametrize('z, x, y', [(-0.5 + 0.1j, 1.2, -2.5),
+                                         (-0.5 + 3j, 1.2, 1.2 + 1e-9),
+                                         (-0.5 + 20j, 0.5, -4.),
+                                         (-0.5 + 0j, 2., -1.)])
+    def test_agrees_with_separate_differences(self, z, x, y):
+        expected = (Psi_x_r(z, x, y), dPsi_x_r(z, x, y), d2Psi_x_r(z, x, y))
+        result = self.func(z, x, y)
+        assert_allclose(result, expected, rtol=1e-8, atol=1e-300)
+
+    @pytest.mark.parametrize('order', [0, 1, 2])
+    def test_returns_differences_up_to_order(self, order):
+        result = self.func(-0.5 + 3j, 1.2, -2.5, order=order)
+        assert len(result) == order + 1
+
+    def test_evaluates_Psi_only_at_order_z(self, mocker):
+        spy = mocker.spy(aux_calcs, 'Psi_and_derivative')
+        z = -0.5 + 3j
+        self.func(z, 1.2, -2.5)
+        assert spy.call_count == 2
+        assert all(call[0][0] == z for call in spy.call_args_list)
+
+    def test_invalid_order_raises_error(self):
+        with pytest.raises(ValueError):
+            self.func(-0.5 + 3j, 1.2, -2.5, order=3)
 
 
 class Test_d_Psi:
@@ -363,6 +567,28 @@ class Test_d_2_Psi:
             assert result == output
 
 
+class Test_d_Psi_d_z:
+
+    func = staticmethod(d_Psi_d_z)
+
+    @pytest.mark.parametrize('z, x', [(-0.5 + 0.2j, 1.5), (0.3 - 1j, -0.7),
+                                      (-0.5 + 40j, 3.), (-0.5 + 0.01j, -6.)])
+    def test_agrees_with_mpmath(self, z, x):
+        with mpmath.workdps(30):
+            expected = complex(mpmath.exp(mpmath.mpf(x)**2 / 4) * mpmath.diff(
+                lambda a: mpmath.pcfu(a, -x), z))
+        result = self.func(z, x)
+        assert_allclose(result, expected, rtol=1e-9)
+
+    @pytest.mark.parametrize('z, x, y', [(-0.5 + 0.3j, 3., 0.5),
+                                         (-0.5 + 10j, 0.2, -6.)])
+    def test_fused_derivatives_of_differences(self, z, x, y):
+        d_psi, d_dpsi = Psi_x_r_derivatives_d_z(z, x, y)
+        assert_allclose(d_psi, self.func(z, x) - self.func(z, y), rtol=1e-8)
+        assert_allclose(d_dpsi, d_d_Psi_d_z(z, x) - d_d_Psi_d_z(z, y),
+                        rtol=1e-8)
+
+
 @pytest.mark.xfail
 class Test_determinant:
     
@@ -419,9 +645,65 @@ class Test_p_hat_boxcar:
             result = self.func(z, x)
             assert result == output
 
+    def test_array_of_wavenumbers(self):
+        ks = np.array([0, 1.5, 20])
+        widths = np.array([0.1, 0.3])
+        result = self.func(ks, widths)
+        assert result.shape == (3, 2)
+        for k, row in zip(ks, result):
+            assert_array_almost_equal(row, self.func(k, widths))
+
+    def test_array_of_wavenumbers_agrees_with_mpmath(self):
+        ks = np.array([0, 1.5, 20])
+        widths = np.array([0.1, 0.3])
+        result = self.func(ks, widths)
+        with mpmath.workdps(40):
+            expected = np.array([[float(mpmath.sinc(k * mpmath.mpf(w)))
+                                  for w in widths] for k in ks])
+        assert_allclose(result, expected, rtol=1e-14)
+
 
 class Test_solve_chareq_rate_boxcar:
     
+    func = staticmethod(solve_chareq_rate_boxcar)
+    
     @pytest.mark.xfail
     def test_something(self):
         pass
+
+    def test_arrays_of_branches_and_wavenumbers(self):
+        branches = np.array([[-1], [0], [1]])
+        ks = np.array([0, 1.5, 20])
+        params = dict(tau=0.01,
+                      W_rate=np.array([[2., -4.], [2., -4.]]),
+                      width=np.array([0.2, 0.4]),
+                      delay=0.002)
+        result = self.func(branches, ks, **params)
+        assert result.shape == (3, 3)
+        for i, branch in enumerate(branches[:, 0]):
+            for j, k in enumerate(ks):
+                assert_array_almost_equal(result[i, j],
+                                          self.func(branch, k, **params))
+
+    def test_arrays_agree_with_mpmath(self):
+        branches = np.array([[-1], [0], [1]])
+        ks = np.array([0, 1.5, 20])
+        tau, delay = 0.01, 0.002
+        W_rate = np.array([[2., -4.], [2., -4.]])
+        width = np.array([0.2, 0.4])
+        result = self.func(branches, ks, tau, W_rate, width, delay)
+        with mpmath.workdps(40):
+            for i, branch in enumerate(branches[:, 0]):
+                for j, k in enumerate(ks):
+                    # equal rows, such that the non-trivial eigenvalue of
+                    # W_rate * P_hat is its trace
+                    xi = mpmath.fsum(
+                        w * (mpmath.sinc(k * mpmath.mpf(b)))
+                        for w, b in zip(W_rate[0], width))
+                    expected = (-1 / mpmath.mpf(tau) + 1 / mpmath.mpf(delay)
+                                * mpmath.lambertw(
+                                    xi * delay / tau
+                                    * mpmath.exp(mpmath.mpf(delay) / tau),
+                                    int(branch)))
+                    assert_allclose(result[i, j], complex(expected),
+                                    rtol=1e-12)
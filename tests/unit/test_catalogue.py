@@ -0,0 +1,57 @@
+import os
+import pytest
+import numpy as np
+
+import lif_meanfield_tools as lmt
+from lif_meanfield_tools import Catalogue, find_runs
+
+ureg = lmt.ureg
+
+
+@pytest.fixture
+def catalogue(tmpdir):
+    catalogue = Catalogue(str(tmpdir))
+    catalogue.register(str(tmpdir.join('a.h5')),
+                       dict(label='test', g=4., nu_ext=8 * ureg.Hz,
+                            K=np.array([[1, 2], [3, 4]])),
+                       dict(omegas=[1, 2] * ureg.Hz),
+                       results=['firing_rates'], hash='a')
+    catalogue.register(str(tmpdir.join('b.h5')),
+                       dict(label='test', g=5., nu_ext=8 * ureg.Hz,
+                            K=np.array([[1, 2], [3, 5]])),
+                       results=['firing_rates'], hash='b')
+    return catalogue
+
+
+class Test_Catalogue:
+
+    def test_catalogue_file_created_in_directory(self, catalogue, tmpdir):
+        assert os.path.exists(str(tmpdir.join(lmt.catalogue.CATALOGUE_NAME)))
+
+    @pytest.mark.parametrize('criteria, hashes',
+                             [(dict(), ['a', 'b']),
+                              (dict(g=4.), ['a']),
+                              (dict(nu_ext=8 * ureg.Hz), ['a', 'b']),
+                              (dict(nu_ext=0.008 * ureg.kHz, g=5), ['b']),
+                              (dict(K=np.array([[1, 2], [3, 4]])), ['a']),
+                              (dict(omegas=[1, 2] * ureg.Hz), ['a']),
+                              (dict(label='test', hash='b'), ['b']),
+                              (dict(g=6.), []),
+                              (dict(unknown=1), [])])
+    def test_find_runs_with_given_params(self, catalogue, criteria, hashes):
+        runs = catalogue.find(**criteria)
+        assert sorted(run['hash'] for run in runs) == hashes
+
+    def test_file_names_are_absolute(self, catalogue, tmpdir):
+        runs = catalogue.find(g=4.)
+        assert runs[0]['file_name'] == str(tmpdir.join('a.h5'))
+
+    def test_registering_again_extends_results(self, catalogue, tmpdir):
+        catalogue.register(str(tmpdir.join('a.h5')), dict(g=4.),
+                           results=['mean_input'], hash='a')
+        runs = catalogue.find(hash='a')
+        assert len(runs) == 1
+        assert runs[0]['results'] == ['firing_rates', 'mean_input']
+
+    def test_find_runs_without_catalogue_returns_empty_list(self, tmpdir):
+        assert find_runs(str(tmpdir), g=4.) == []
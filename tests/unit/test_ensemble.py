@@ -0,0 +1,135 @@
+import pytest
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+
+import lif_meanfield_tools as lmt
+from lif_meanfield_tools import NetworkEnsemble
+
+ureg = lmt.ureg
+
+network_params = 'tests/fixtures/config/network_params_microcircuit.yaml'
+analysis_params = 'tests/fixtures/config/analysis_params_test.yaml'
+
+changed_params = [{'g': 3.5}, {'nu_ext': 8.5 * ureg.Hz}]
+
+
+@pytest.fixture
+def base():
+    return lmt.Network(network_params, analysis_params)
+
+
+@pytest.fixture
+def ensemble(base):
+    return NetworkEnsemble.from_changed_parameters(base, changed_params)
+
+
+@pytest.fixture
+def members(base):
+    return [base.change_parameters(changed) for changed in changed_params]
+
+
+class Test_NetworkEnsemble:
+
+    def test_len(self, ensemble):
+        assert len(ensemble) == 2
+
+    def test_empty_ensemble_raises_error(self):
+        with pytest.raises(ValueError):
+            NetworkEnsemble([])
+
+    def test_different_omegas_raise_error(self, base):
+        other = lmt.Network(network_params, analysis_params,
+                            new_analysis_params={'f_max': 200 * ureg.Hz})
+        with pytest.raises(ValueError):
+            NetworkEnsemble([base, other])
+
+    def test_firing_rates_agree_with_networks(self, ensemble, members):
+        rates = ensemble.firing_rates()
+        assert rates.shape == (2, 8)
+        for rate, member in zip(rates, members):
+            assert_allclose(rate.to(ureg.Hz).magnitude,
+                            member.firing_rates().to(ureg.Hz).magnitude,
+                            rtol=1e-4)
+
+    def test_inputs_agree_with_networks(self, ensemble, members):
+        for i, member in enumerate(members):
+            assert_allclose(ensemble.mean_input()[i].to(ureg.mV).magnitude,
+                            member.mean_input().to(ureg.mV).magnitude,
+                            rtol=1e-4)
+            assert_allclose(ensemble.std_input()[i].to(ureg.mV).magnitude,
+                            member.std_input().to(ureg.mV).magnitude,
+                            rtol=1e-4)
+
+    def test_transfer_function_agrees_with_networks(self, ensemble, members):
+        tf = ensemble.transfer_function()
+        n_omegas = len(members[0].analysis_params['omegas'])
+        assert tf.shape == (2, n_omegas, 8)
+        for i, member in enumerate(members):
+            expected = member.transfer_function(method='shift')
+            assert_allclose(tf[i].to(ureg.Hz / ureg.mV).magnitude,
+                            expected.to(ureg.Hz / ureg.mV).magnitude,
+                            rtol=1e-4)
+
+    def test_delay_dist_matrix_agrees_with_networks(self, ensemble, members):
+        ddm = ensemble.delay_dist_matrix()
+        for i, member in enumerate(members):
+            assert_allclose(ddm[i].magnitude,
+                            member.delay_dist_matrix().magnitude)
+
+    def test_power_spectra_agree_with_networks(self, ensemble, members):
+        power = ensemble.power_spectra()
+        for i, member in enumerate(members):
+            member.transfer_function(method='shift')
+            assert_allclose(power[i].to(ureg.Hz).magnitude,
+                            member.power_spectra().to(ureg.Hz).magnitude,
+                            rtol=1e-4)
+
+    def test_results_are_cached(self, ensemble, mocker):
+        ensemble.firing_rates()
+        mock = mocker.patch(
+            'lif_meanfield_tools.meanfield_calcs._firing_rates_ensemble')
+        ensemble.firing_rates()
+        mock.assert_not_called()
+
+    def test_networks_converge_independently(self, ensemble, members):
+        nu_0 = np.zeros((2, 8))
+        nu_0[0] = members[0].firing_rates().to(ureg.Hz).magnitude
+        ensemble.firing_rates(nu_0=nu_0 * ureg.Hz)
+        assert ensemble.n_iterations[0] < ensemble.n_iterations[1]
+
+    def test_equal_networks_give_equal_results(self, base):
+        ensemble = NetworkEnsemble([base, base])
+        rates = ensemble.firing_rates()
+        assert_array_equal(rates[0].magnitude, rates[1].magnitude)
+
+    def test_empirical_transfer_function(self, base):
+        empirical = base.change_parameters(changed_analysis_params=dict(
+            tf_mode='empirical',
+            tau_impulse=np.linspace(1, 8, 8) * ureg.ms,
+            delta_f=np.linspace(1, 2, 8) * ureg.Hz / ureg.mV))
+        members = [empirical, empirical.change_parameters(
+            changed_analysis_params={'tau_impulse': 2 * np.ones(8) * ureg.ms})]
+        tf = NetworkEnsemble(members).transfer_function()
+        for i, member in enumerate(members):
+            assert_allclose(tf[i].magnitude,
+                            member.transfer_function().magnitude)
+
+    def test_empirical_transfer_function_with_scalar_parameters(self, base):
+        empirical = base.change_parameters(changed_analysis_params=dict(
+            tf_mode='empirical', tau_impulse=2 * ureg.ms,
+            delta_f=1.5 * ureg.Hz / ureg.mV))
+        members = [empirical, empirical.change_parameters(
+            changed_analysis_params={'tau_impulse': 3 * ureg.ms})]
+        tf = NetworkEnsemble(members).transfer_function()
+        n_omegas = len(base.analysis_params['omegas'])
+        assert tf.shape == (2, n_omegas, 8)
+        for i, member in enumerate(members):
+            assert_allclose(tf[i].magnitude,
+                            member.transfer_function().magnitude)
+
+    def test_different_tf_modes_raise_error(self, base):
+        empirical = base.change_parameters(changed_analysis_params=dict(
+            tf_mode='empirical', tau_impulse=np.ones(8) * ureg.ms,
+            delta_f=np.ones(8) * ureg.Hz / ureg.mV))
+        with pytest.raises(ValueError):
+            NetworkEnsemble([base, empirical])
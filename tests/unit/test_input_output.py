@@ -4,6 +4,7 @@ Unit tests for the input output module.
 """
 
 import pytest
+import h5py
 import numpy as np
 from numpy.testing import assert_array_equal
 
@@ -192,6 +193,47 @@ class Test_load_params:
         check_quantity_dicts_are_equal(params, param_test_dict)
                 
 
+class Test_parse_unit:
+
+    def test_unit_parsed_only_once(self):
+        io.parse_unit.cache_clear()
+        io.parse_unit('mV')
+        io.parse_unit('mV')
+        assert io.parse_unit.cache_info().hits == 1
+        assert io.parse_unit('mV') == 1 * ureg.mV
+
+
+class Test_load_params_bulk:
+
+    def test_params_equal_to_single_file_loading(self, param_test_dict):
+        file_path = 'tests/fixtures/config/test.yaml'
+        params = io.load_params_bulk([file_path, file_path])
+        assert len(params) == 2
+        for p in params:
+            check_quantity_dicts_are_equal(p, param_test_dict)
+
+    def test_network_params_match_schema(self):
+        params = io.load_params_bulk(
+            ['tests/fixtures/config/network_params_microcircuit.yaml'],
+            schema=io.NETWORK_PARAMS_SCHEMA)
+        assert params[0]['tau_m'] == 10 * ureg.ms
+
+    def test_analysis_params_match_compiled_schema(self):
+        schema = io.compile_schema(io.ANALYSIS_PARAMS_SCHEMA)
+        params = io.load_params_bulk(
+            ['tests/fixtures/config/analysis_params_test.yaml'],
+            schema=schema)
+        assert params[0]['k_max'] == 100.5 / ureg.mm
+
+    @pytest.mark.parametrize('schema', [dict(quantity='mV'),
+                                        dict(quantity=None),
+                                        dict(numerical='Hz')])
+    def test_schema_mismatch_raises_error(self, schema):
+        with pytest.raises(ValueError, match='test.yaml'):
+            io.load_params_bulk(['tests/fixtures/config/test.yaml'],
+                                schema=schema)
+
+
 class Test_save:
     
     def test_h5_is_created(self, tmpdir, param_test_dict):
@@ -215,17 +257,118 @@ class Test_save:
                 io.save(output_key, param_test_dict, file_name)
 
 
+class Test_write_h5:
+
+    def test_units_stored_as_attributes(self, tmpdir):
+        with tmpdir.as_cwd():
+            io.write_h5('test.h5', dict(results=dict(nu=[1, 2] * ureg.Hz)))
+            with h5py.File('test.h5', 'r') as file:
+                dataset = file['results/nu']
+                assert_array_equal(dataset[()], [1, 2])
+                assert ureg.parse_expression(dataset.attrs['unit']) \
+                    == 1 * ureg.Hz
+
+    def test_large_arrays_chunked_and_compressed(self, tmpdir):
+        spectra = (np.ones((100, 8)) + 1j) * ureg.Hz
+        with tmpdir.as_cwd():
+            io.write_h5('test.h5', dict(results=dict(spectra=spectra)),
+                        compression='gzip', chunk_threshold=100)
+            with h5py.File('test.h5', 'r') as file:
+                assert file['results/spectra'].chunks is not None
+                assert file['results/spectra'].compression == 'gzip'
+            loaded = io.load_h5('test.h5')['results']['spectra']
+        assert_array_equal(loaded, spectra)
+        assert_units_equal(loaded, spectra)
+
+    def test_single_entry_updated_without_touching_others(self, tmpdir):
+        with tmpdir.as_cwd():
+            io.write_h5('test.h5', dict(results=dict(a=1 * ureg.s,
+                                                     b=2 * ureg.s)))
+            io.write_h5('test.h5', dict(results=dict(b=3 * ureg.mV)))
+            results = io.load_h5('test.h5')['results']
+        assert results == dict(a=1 * ureg.s, b=3 * ureg.mV)
+
+    def test_list_of_dicts_loaded_as_list(self, tmpdir):
+        modes = [dict(eigenvalues=np.array([1 + 1j, 2])),
+                 dict(eigenvalues=np.array([3j, 4]))]
+        with tmpdir.as_cwd():
+            io.write_h5('test.h5', dict(results=dict(modes=modes)))
+            loaded = io.load_h5('test.h5')['results']['modes']
+        assert isinstance(loaded, list)
+        assert len(loaded) == 2
+        assert_array_equal(loaded[1]['eigenvalues'], [3j, 4])
+
+    def test_shorter_list_of_dicts_replaces_stored_one(self, tmpdir):
+        modes = [dict(eigenvalues=np.array([1 + 1j, 2])),
+                 dict(eigenvalues=np.array([3j, 4]))]
+        with tmpdir.as_cwd():
+            io.write_h5('test.h5', dict(results=dict(modes=modes)))
+            io.write_h5('test.h5', dict(results=dict(modes=modes[1:])))
+            loaded = io.load_h5('test.h5')['results']['modes']
+        assert len(loaded) == 1
+        assert_array_equal(loaded[0]['eigenvalues'], [3j, 4])
+
+    def test_legacy_file_loaded(self):
+        data = io.load_h5('tests/fixtures/data/noise_driven_regime.h5')
+        assert data['network_params']['label'] == 'microcircuit'
+        assert_units_equal(data['results']['firing_rates'], 1 * ureg.Hz)
+
+
 class Test_create_hash:
     
     def test_correct_hash(self):
         params = dict(a=1, b=2)
         hash = io.create_hash(params, ['a', 'b'])
-        assert hash == 'c20ad4d76fe97759aa27a0c99bff6710'
+        assert hash == 'a99a91aaf055e8fe9ca3ad4365ee57e9'
         
     def test_hash_only_reflects_given_keys(self):
         params = dict(a=1, b=2, c=3)
         hash = io.create_hash(params, ['a', 'b'])
-        assert hash == 'c20ad4d76fe97759aa27a0c99bff6710'
+        assert hash == io.create_hash(dict(a=1, b=2), ['a', 'b'])
+
+    def test_large_arrays_differing_in_one_entry_give_different_hashes(self):
+        K = np.ones((100, 100))
+        K_changed = K.copy()
+        K_changed[50, 50] = 2
+        assert str(K) == str(K_changed)
+        assert (io.create_hash(dict(K=K), ['K'])
+                != io.create_hash(dict(K=K_changed), ['K']))
+
+    @pytest.mark.parametrize('a, b', [(np.array([1, 2]), np.array([1., 2.])),
+                                      (np.arange(4), np.arange(4).reshape(2, 2)),
+                                      ('12', 12),
+                                      (['a', 'bc'], ['ab', 'c']),
+                                      (1 * ureg.ms, 1 * ureg.mV)])
+    def test_different_values_give_different_hashes(self, a, b):
+        assert (io.create_hash(dict(a=a), ['a'])
+                != io.create_hash(dict(a=b), ['a']))
+
+    def test_hash_independent_of_unit_prefix(self):
+        assert (io.create_hash(dict(a=1000 * ureg.ms), ['a'])
+                == io.create_hash(dict(a=1 * ureg.s), ['a']))
+
+    def test_only_changed_params_digested_again(self, mocker):
+        params = dict(a=np.arange(3), b=2 * ureg.ms)
+        digests = {}
+        hash = io.create_hash(params, ['a', 'b'], digests=digests)
+        spy = mocker.spy(io, '_param_digest')
+        params['b'] = 3 * ureg.ms
+        new_hash = io.create_hash(params, ['a', 'b'], digests=digests)
+        spy.assert_called_once_with('b', params['b'])
+        assert new_hash != hash
+        assert new_hash == io.create_hash(params, ['a', 'b'])
+
+    def test_in_place_changes_change_hash(self):
+        params = dict(K=np.ones((10, 10)), J=np.ones(10) * ureg.mV)
+        digests = {}
+        hash = io.create_hash(params, ['K', 'J'], digests=digests)
+        params['K'][0, 0] += 100
+        new_hash = io.create_hash(params, ['K', 'J'], digests=digests)
+        assert new_hash != hash
+        assert new_hash == io.create_hash(params, ['K', 'J'])
+        params['J'][3] *= 2
+        assert (io.create_hash(params, ['K', 'J'], digests=digests)
+                == io.create_hash(params, ['K', 'J']) != new_hash)
 
 
 class Test_load_h5:
@@ -247,8 +390,70 @@ class Test_load_h5:
             
         params = params_h5['params']
         check_quantity_dicts_are_equal(params, param_test_dict)
-        
-        
+
+
+class Test_load_h5_lazy:
+
+    @pytest.mark.parametrize('compression', [None, 'gzip'])
+    def test_slices_read_with_units(self, tmpdir, compression):
+        spectra = np.arange(800).reshape(100, 8) * (1 + 1j) * ureg.Hz
+        with tmpdir.as_cwd():
+            io.write_h5('test.h5', dict(results=dict(spectra=spectra)),
+                        compression=compression, chunk_threshold=100)
+            with io.load_h5_lazy('test.h5') as data:
+                lazy = data['results']['spectra']
+                assert lazy.is_memmapped == (compression is None)
+                assert lazy.shape == (100, 8)
+                part = lazy[10:20, 3]
+        assert_array_equal(part, spectra[10:20, 3])
+        assert_units_equal(part, spectra)
+
+    def test_memmap_released_on_close(self, tmpdir):
+        spectra = np.ones((100, 8)) * ureg.Hz
+        with tmpdir.as_cwd():
+            io.write_h5('test.h5', dict(results=dict(spectra=spectra)))
+            with io.load_h5_lazy('test.h5') as data:
+                lazy = data['results']['spectra']
+                assert lazy.is_memmapped
+            assert not lazy.is_memmapped
+
+    def test_list_of_dicts_returned_as_list(self, tmpdir):
+        modes = [dict(eigenvalues=np.array([1 + 1j, 2])),
+                 dict(eigenvalues=np.array([3j, 4]))]
+        with tmpdir.as_cwd():
+            io.write_h5('test.h5', dict(results=dict(modes=modes)))
+            with io.load_h5_lazy('test.h5') as data:
+                loaded = data['results']['modes']
+                assert isinstance(loaded, list)
+                assert_array_equal(loaded[1]['eigenvalues'][:], [3j, 4])
+
+    def test_nothing_read_on_opening(self, tmpdir, mocker):
+        with tmpdir.as_cwd():
+            io.write_h5('test.h5', dict(results=dict(a=[1, 2] * ureg.s)))
+            mock = mocker.patch('lif_meanfield_tools.input_output.'
+                                '_read_dataset')
+            with io.load_h5_lazy('test.h5') as data:
+                assert list(data['results']) == ['a']
+            mock.assert_not_called()
+
+    def test_legacy_file_loaded(self):
+        file_name = 'tests/fixtures/data/noise_driven_regime.h5'
+        loaded = io.load_h5(file_name)
+        with io.load_h5_lazy(file_name) as data:
+            assert data['network_params']['label'] == 'microcircuit'
+            assert data['analysis_params']['df'] == \
+                loaded['analysis_params']['df']
+            rates = data['results']['firing_rates']
+            assert_array_equal(rates[:2],
+                               loaded['results']['firing_rates'][:2])
+            assert_units_equal(rates[:2], loaded['results']['firing_rates'])
+
+    def test_raise_exception_if_filename_not_existing(self, tmpdir):
+        with tmpdir.as_cwd():
+            with pytest.raises(OSError):
+                io.load_h5_lazy('test.h5')
+
+
 class Test_load_from_h5:
     
     @pytest.mark.xfail
@@ -1,5 +1,10 @@
+import warnings
+
 import pytest
-from numpy.testing import assert_array_equal
+import numpy as np
+from pint.errors import UnitStrippedWarning
+from numpy.testing import (assert_array_equal, assert_array_almost_equal,
+                           assert_allclose)
 
 from .checks import (check_pos_params_neg_raise_exception,
                      check_correct_output,
@@ -13,12 +18,39 @@ from lif_meanfield_tools.meanfield_calcs import (
     mean,
     standard_deviation,
     transfer_function,
+    transfer_function_1p_shift,
+    transfer_function_empirical,
+    transfer_function_laplace,
+    effective_connectivity_laplace,
+    count_unstable_modes,
     delay_dist_matrix,
     sensitivity_measure,
     power_spectra,
+    cross_spectra,
+    covariance_functions,
+    coherence,
+    phase_spectra,
+    pack_hermitian,
+    unpack_hermitian,
     eigen_spectra,
+    leading_modes,
     additional_rates_for_fixed_input,
-    effective_coupling_strength)
+    effective_coupling_strength,
+    linear_interpolation_alpha,
+    eigenvals_branches_rate,
+    xi_of_k,
+    _transfer_function_1p_shift,
+    _d_transfer_function_1p_shift_d_omega,
+    _effective_connectivity,
+    _delay_dist_matrix_laplace,
+    _xi_eff_s,
+    _d_xi_eff_s_d_lambda,
+    _chareq_alpha,
+    _lambda_of_alpha_continuation)
+
+from lif_meanfield_tools import aux_calcs, ureg
+from lif_meanfield_tools.progress import (CancellationToken,
+                                          ComputationCancelled)
 
 
 class Test_firing_rates:
@@ -79,6 +111,36 @@ class Test_transfer_function:
         self.func(**std_params_tf)
         mocked_tf.assert_called_once()
 
+    def test_progress_is_reported_for_each_frequency(self, std_params_tf):
+        std_params_tf['omegas'] = np.array([1, 2, 3]) * ureg.Hz
+        calls = []
+        self.func(**std_params_tf,
+                  progress=lambda done, total: calls.append((done, total)))
+        assert calls == [(0, 3), (1, 3), (2, 3), (3, 3)]
+
+    def test_cancelled_computation_raises(self, std_params_tf):
+        std_params_tf['omegas'] = np.array([1, 2, 3]) * ureg.Hz
+        token = CancellationToken()
+
+        def cancel_after_first(done, total):
+            if done == 1:
+                token.cancel()
+
+        with pytest.raises(ComputationCancelled):
+            self.func(**std_params_tf, progress=cancel_after_first,
+                      cancel=token)
+
+    def test_finished_computation_is_not_cancelled(self, std_params_tf):
+        std_params_tf['omegas'] = np.array([1, 2]) * ureg.Hz
+        token = CancellationToken()
+
+        def cancel_at_end(done, total):
+            if done == total:
+                token.cancel()
+
+        tf = self.func(**std_params_tf, progress=cancel_at_end, cancel=token)
+        assert tf.shape == (2, 1)
+
 
 class Test_transfer_function_1p_shift():
 
@@ -124,6 +186,153 @@ class Test_transfer_function_1p_taylor():
         check_correct_output(self.func, params, output)
 
 
+class Test_transfer_function_empirical:
+
+    func = staticmethod(transfer_function_empirical)
+
+    tau_impulse = np.array([2., 5.]) * ureg.ms
+    delta_f = np.array([1., 3.]) * ureg.Hz / ureg.mV
+    omegas = np.array([0., 100., 1000.]) * ureg.Hz
+
+    def test_low_pass_filter(self):
+        result = self.func(self.tau_impulse, self.delta_f, 2, self.omegas)
+        assert result.shape == (3, 2)
+        assert_units_equal(result, ureg.Hz / ureg.mV)
+        for i, omega in enumerate(self.omegas.magnitude):
+            expected = (self.delta_f.magnitude
+                        / (1 + 1j * omega * self.tau_impulse.to(ureg.s).magnitude))
+            assert_array_almost_equal(result[i].magnitude, expected)
+
+    def test_static_response_is_rate_jump(self):
+        result = self.func(self.tau_impulse, self.delta_f, 2, [0.] * ureg.Hz)
+        assert_array_equal(result[0].magnitude, self.delta_f.magnitude)
+
+    def test_negative_frequencies_give_complex_conjugate(self):
+        result = self.func(self.tau_impulse, self.delta_f, 2, self.omegas)
+        mirrored = self.func(self.tau_impulse, self.delta_f, 2, -self.omegas)
+        assert_array_almost_equal(mirrored.magnitude,
+                                  np.conjugate(result.magnitude))
+
+    def test_scalar_parameters_are_broadcast_to_all_populations(self):
+        result = self.func(2. * ureg.ms, 1. * ureg.Hz / ureg.mV, 3,
+                           self.omegas)
+        assert result.shape == (3, 3)
+        expected = self.func(np.full(3, 2.) * ureg.ms,
+                             np.ones(3) * ureg.Hz / ureg.mV, 3, self.omegas)
+        assert_array_equal(result.magnitude, expected.magnitude)
+
+
+class Test_transfer_function_laplace:
+
+    func = staticmethod(transfer_function_laplace)
+
+    params = dict(mu=np.array([10., 12.]) * ureg.mV,
+                  sigma=np.array([5., 4.]) * ureg.mV,
+                  tau_m=10. * ureg.ms,
+                  tau_s=0.5 * ureg.ms,
+                  tau_r=2. * ureg.ms,
+                  V_th_rel=15. * ureg.mV,
+                  V_0_rel=0. * ureg.mV,
+                  dimension=2)
+    lambdas = np.array([[0., 10. + 50j], [-20. + 300j, 5j]]) / ureg.s
+
+    def test_agrees_with_transfer_function_at_complex_omega(self):
+        result = self.func(lambdas=self.lambdas, **self.params)
+        assert result.shape == (2, 2, 2)
+        assert_units_equal(result, ureg.Hz / ureg.mV)
+        for idx in np.ndindex(self.lambdas.shape):
+            omega = -1j * self.lambdas[idx].magnitude * ureg.Hz
+            for i in range(2):
+                params = dict(self.params, mu=self.params['mu'][i],
+                              sigma=self.params['sigma'][i])
+                params.pop('dimension')
+                expected = transfer_function_1p_shift(omega=omega, **params)
+                assert_array_almost_equal(result[idx + (i,)].magnitude,
+                                          expected.magnitude)
+
+    def test_effective_connectivity(self):
+        J = np.array([[0.1, -0.5], [0.2, -0.4]]) * ureg.mV
+        K = np.array([[100., 50.], [80., 40.]])
+        Delay = np.array([[1., 2.], [1.5, 1.]]) * ureg.ms
+        result = effective_connectivity_laplace(
+            J=J, K=K, Delay=Delay, Delay_sd=0.1 * Delay, delay_dist='none',
+            lambdas=self.lambdas, **self.params)
+        assert result.shape == (2, 2, 2, 2)
+        tfs = self.func(lambdas=self.lambdas, **self.params).magnitude
+        for idx in np.ndindex(self.lambdas.shape):
+            l = self.lambdas[idx].magnitude
+            expected = _effective_connectivity(
+                -1j * l, tfs[idx], 0.01, J.magnitude, K, 2,
+                np.exp(-l * Delay.to(ureg.s).magnitude))
+            assert_array_almost_equal(result[idx].magnitude, expected)
+
+
+class Test_count_unstable_modes:
+
+    func = staticmethod(count_unstable_modes)
+
+    params = dict(mu=np.array([10.]) * ureg.mV,
+                  sigma=np.array([5.]) * ureg.mV,
+                  tau_m=10. * ureg.ms,
+                  tau_s=0.5 * ureg.ms,
+                  tau_r=2. * ureg.ms,
+                  V_th_rel=15. * ureg.mV,
+                  V_0_rel=0. * ureg.mV,
+                  dimension=1,
+                  Delay=np.array([[1.5]]) * ureg.ms,
+                  Delay_sd=np.array([[0.1]]) * ureg.ms,
+                  delay_dist='none',
+                  min_real=0. / ureg.s,
+                  max_real=2000. / ureg.s,
+                  max_imag=4000. / ureg.s,
+                  n_points=300)
+
+    # weak coupling, strong excitation (one real mode) and strong inhibition
+    # (one pair of oscillatory modes at 756 +- 1395i 1/s)
+    @pytest.mark.parametrize('JK, expected', [(1., 0), (50., 1), (-500., 2)])
+    def test_correct_count_for_single_population(self, JK, expected):
+        n_unstable, error = self.func(J=np.array([[JK / 100.]]) * ureg.mV,
+                                      K=np.array([[100.]]), **self.params)
+        assert n_unstable == expected
+        assert error < 0.5
+
+    def test_warning_if_contour_is_too_small(self):
+        params = dict(self.params, max_real=500. / ureg.s,
+                      max_imag=1000. / ureg.s)
+        with pytest.warns(UserWarning):
+            n_unstable, _ = self.func(J=np.array([[-5.]]) * ureg.mV,
+                                      K=np.array([[100.]]), **params)
+        # the oscillatory modes at 756 +- 1395i 1/s are outside
+        assert n_unstable == 0
+
+    def test_no_warning_if_contour_is_large_enough(self, recwarn):
+        params = dict(self.params, max_real=8000. / ureg.s,
+                      max_imag=8000. / ureg.s)
+        n_unstable, _ = self.func(J=np.array([[-5.]]) * ureg.mV,
+                                  K=np.array([[100.]]), **params)
+        assert n_unstable == 2
+        assert not [w for w in recwarn
+                    if 'Spectral radius' in str(w.message)]
+
+
+class Test_d_transfer_function_1p_shift_d_omega:
+
+    func = staticmethod(_d_transfer_function_1p_shift_d_omega)
+
+    params = dict(mu=10., sigma=5., tau_m=0.01, tau_s=0.0005, tau_r=0.002,
+                  V_th_rel=15., V_0_rel=0.)
+
+    @pytest.mark.parametrize('omega', [2., 20. + 5j, 100. - 30j])
+    def test_agrees_with_finite_differences(self, omega):
+        h = 1e-4 * abs(omega)
+        tf_plus = _transfer_function_1p_shift(omega=omega + h, **self.params)
+        tf_minus = _transfer_function_1p_shift(omega=omega - h, **self.params)
+        expected = (tf_plus - tf_minus) / (2 * h)
+        result = self.func(omega=omega, **self.params)
+        assert_array_almost_equal(result / abs(expected),
+                                  expected / abs(expected), decimal=6)
+
+
 class Test_delay_dist_matrix:
 
     func = staticmethod(delay_dist_matrix)
@@ -150,6 +359,16 @@ class Test_delay_dist_matrix_single:
         check_correct_output(self.func, params, output)
 
 
+class Test_delay_dist_matrix_laplace:
+
+    func = staticmethod(_delay_dist_matrix_laplace)
+
+    def test_unknown_delay_dist_raises_error(self):
+        with pytest.raises(ValueError):
+            self.func(np.ones((2, 2)), np.ones((2, 2)), 'unknown',
+                      np.array([1j]))
+
+
 class Test_sensitivity_measure:
 
     func = staticmethod(sensitivity_measure)
@@ -197,6 +416,144 @@ class Test_power_spectra:
         check_correct_output(self.func, params, output)
 
 
+class Test_cross_spectra:
+
+    func = staticmethod(cross_spectra)
+
+    rng = np.random.RandomState(2)
+    params = dict(tau_m=10. * ureg.ms,
+                  tau_s=0.5 * ureg.ms,
+                  dimension=3,
+                  J=np.array([[0.1, -0.4, 0.1],
+                              [0.2, -0.4, 0.],
+                              [0.1, 0., -0.2]]) * ureg.mV,
+                  K=np.array([[100., 50., 20.],
+                              [80., 40., 0.],
+                              [50., 0., 60.]]),
+                  delay_dist_matrix=np.exp(-1j * np.arange(33)[:, None, None]
+                                           * 2 * np.pi * 10 * 1.5e-3
+                                           * np.ones((3, 3)))
+                  * ureg.dimensionless,
+                  N=np.array([1000, 250, 500]),
+                  firing_rates=np.array([3., 8., 5.]) * ureg.Hz,
+                  transfer_function=(rng.rand(33, 3) + 1j * rng.rand(33, 3))
+                  * ureg.Hz / ureg.mV,
+                  omegas=np.arange(33) * 2 * np.pi * 10 * ureg.Hz)
+
+    def test_diagonal_is_power_spectrum(self):
+        cross = self.func(**self.params)
+        assert cross.shape == (33, 6)
+        assert_units_equal(cross, ureg.Hz)
+        power = power_spectra(**self.params)
+        diagonal = np.diagonal(unpack_hermitian(cross).magnitude,
+                               axis1=1, axis2=2)
+        assert_array_almost_equal(diagonal.real.T, power.magnitude)
+
+    def test_covariance_integral_is_cross_spectrum_at_zero(self):
+        cross = self.func(**self.params)
+        times, covariances = covariance_functions(cross,
+                                                  self.params['omegas'])
+        assert_units_equal(times, ureg.s)
+        assert_units_equal(covariances, ureg.Hz**2)
+        assert covariances.shape == (64, 3, 3)
+        dt = (times[1] - times[0]).to(ureg.s).magnitude
+        assert_array_almost_equal(
+            covariances.magnitude.sum(axis=0) * dt,
+            unpack_hermitian(cross)[0].magnitude.real)
+
+    def test_covariance_is_fourier_transform_of_cross_spectrum(self):
+        cross = self.func(**self.params)
+        times, covariances = covariance_functions(cross,
+                                                  self.params['omegas'])
+        C = unpack_hermitian(cross).magnitude
+        f = self.params['omegas'].magnitude / 2 / np.pi
+        # C(-f) = C(f)^*, the Nyquist frequency is counted once
+        weights = np.r_[1, 2 * np.ones(31), 1]
+        for m in [0, 20, 32, 50]:
+            tau = times[m].to(ureg.s).magnitude
+            expected = 10 * np.einsum(
+                'w,wij->ij', weights,
+                (C * np.exp(2j * np.pi * f * tau)[:, None, None]).real)
+            assert_allclose(covariances[m].magnitude, expected, atol=1e-10)
+
+    def test_covariance_of_reversed_pair_is_mirrored(self):
+        times, covariances = covariance_functions(self.func(**self.params),
+                                                  self.params['omegas'])
+        c = covariances.magnitude
+        assert_array_almost_equal(c[33:], np.swapaxes(c[31:0:-1], 1, 2))
+
+    def test_covariances_need_fft_frequencies(self):
+        cross = self.func(**self.params)
+        with pytest.raises(ValueError):
+            covariance_functions(cross, self.params['omegas'] + 1 * ureg.Hz)
+
+    def test_coherence_and_phase(self):
+        cross = self.func(**self.params)
+        C = unpack_hermitian(cross).magnitude
+        coh = coherence(cross)
+        assert_units_equal(coh, ureg.dimensionless)
+        assert_array_almost_equal(
+            np.diagonal(coh.magnitude, axis1=1, axis2=2), np.ones((33, 3)))
+        assert np.all(coh.magnitude <= 1 + 1e-12)
+        assert_array_almost_equal(
+            coh[:, 0, 1].magnitude,
+            np.abs(C[:, 0, 1])**2 / (C[:, 0, 0].real * C[:, 1, 1].real))
+        phases = phase_spectra(cross)
+        assert_array_almost_equal(phases, -np.swapaxes(phases, 1, 2))
+        assert_array_almost_equal(phases[:, 0, 1], np.angle(C[:, 0, 1]))
+
+    def test_pack_and_unpack_hermitian(self):
+        A = self.rng.rand(4, 3, 3) + 1j * self.rng.rand(4, 3, 3)
+        H = A + np.conjugate(np.swapaxes(A, 1, 2))
+        packed = pack_hermitian(H)
+        assert packed.shape == (4, 6)
+        assert_array_equal(unpack_hermitian(packed), H)
+        assert_units_equal(unpack_hermitian(packed * ureg.Hz), ureg.Hz)
+
+
+class Test_single_precision_spectra:
+
+    omegas = np.array([1., 10., 100.]) * ureg.Hz
+    params = dict(tau_m=10. * ureg.ms,
+                  tau_s=0.5 * ureg.ms,
+                  dimension=2,
+                  J=np.array([[0.1, -0.4], [0.1, -0.4]]) * ureg.mV,
+                  K=np.array([[100., 25.], [100., 25.]]))
+    transfer_function = (np.array([[1. + 1j, 2. - 1j]] * 3)
+                         * ureg.Hz / ureg.mV)
+    delay_dist = (np.exp(-1j * np.array([1., 10., 100.]) * 1e-3)[:, None, None]
+                  * np.ones((3, 2, 2)) * ureg.dimensionless)
+
+    def single(self, quantity):
+        return quantity.magnitude.astype(np.complex64) * quantity.units
+
+    def test_power_spectra_agree_with_double_precision(self):
+        args = dict(N=np.array([1000., 250.]),
+                    firing_rates=np.array([5., 10.]) * ureg.Hz,
+                    omegas=self.omegas, **self.params)
+        double = power_spectra(transfer_function=self.transfer_function,
+                               delay_dist_matrix=self.delay_dist, **args)
+        single = power_spectra(
+            transfer_function=self.single(self.transfer_function),
+            delay_dist_matrix=self.single(self.delay_dist), **args)
+        # only the inputs are rounded, the inversion is done in double
+        assert single.magnitude.dtype == np.float64
+        assert_allclose(single, double, rtol=1e-5)
+
+    def test_eigenvalues_agree_with_double_precision(self):
+        args = dict(omegas=self.omegas, quantity='eigvals', matrix='MH',
+                    **self.params)
+        double = eigen_spectra(transfer_function=self.transfer_function,
+                               delay_dist_matrix=self.delay_dist, **args)
+        single = eigen_spectra(
+            transfer_function=self.single(self.transfer_function),
+            delay_dist_matrix=self.single(self.delay_dist), **args)
+        assert single.dtype == np.complex128
+        assert_allclose(np.sort_complex(single.flatten()),
+                        np.sort_complex(double.flatten()), rtol=1e-5,
+                        atol=1e-6)
+
+
 class Test_eigen_spectra_eval:
 
     func = staticmethod(eigen_spectra)
@@ -320,6 +677,80 @@ class Test_eigen_spectra_leigvecs:
         check_correct_output(self.func, params, output)
 
 
+class Test_leading_modes:
+
+    func = staticmethod(leading_modes)
+
+    dimension = 6
+    rng = np.random.RandomState(1)
+    params = dict(tau_m=10. * ureg.ms,
+                  tau_s=0.5 * ureg.ms,
+                  transfer_function=(rng.rand(4, 6) + 1j * rng.rand(4, 6))
+                  * ureg.Hz / ureg.mV,
+                  dimension=6,
+                  delay_dist_matrix=np.exp(-1j * rng.rand(4, 6, 6))
+                  * ureg.dimensionless,
+                  J=rng.randn(6, 6) * ureg.mV,
+                  K=rng.rand(6, 6) * 10,
+                  omegas=np.array([0., 10., 100., 200.]) * ureg.Hz)
+
+    @pytest.mark.parametrize('matrix', ['MH', 'prop', 'prop_inv'])
+    def test_agrees_with_eigen_spectra(self, matrix):
+        modes = self.func(k=2, criterion='closest_to_one', matrix=matrix,
+                          **self.params)
+        eigvals = eigen_spectra(quantity='eigvals', matrix=matrix,
+                                **self.params).T
+        reigvecs = eigen_spectra(quantity='reigvecs', matrix=matrix,
+                                 **self.params).T
+        leigvecs = eigen_spectra(quantity='leigvecs', matrix=matrix,
+                                 **self.params).T
+        assert modes['eigenvalues'].shape == (4, 2)
+        assert modes['right_eigenvectors'].shape == (4, 2, 6)
+        assert modes['left_eigenvectors'].shape == (4, 2, 6)
+        for i in range(4):
+            index = np.argsort(np.abs(eigvals[i] - 1))[:2]
+            assert_array_almost_equal(modes['eigenvalues'][i],
+                                      eigvals[i][index])
+            assert_array_almost_equal(modes['right_eigenvectors'][i],
+                                      reigvecs[i][index])
+            assert_array_almost_equal(modes['left_eigenvectors'][i],
+                                      leigvecs[i][index])
+
+    @pytest.mark.parametrize('criterion', ['closest_to_one',
+                                           'largest_magnitude',
+                                           'largest_real'])
+    def test_arnoldi_iteration_agrees_with_eigendecomposition(
+            self, criterion, mocker):
+        dense = self.func(k=2, criterion=criterion, matrix='MH',
+                          **self.params)
+        mocker.patch('lif_meanfield_tools.meanfield_calcs.'
+                     'LEADING_MODES_DENSE_DIMENSION', 0)
+        arnoldi = self.func(k=2, criterion=criterion, matrix='MH',
+                            **self.params)
+        assert_array_almost_equal(arnoldi['eigenvalues'],
+                                  dense['eigenvalues'])
+        # eigenvectors agree up to a phase, which cancels in the projector
+        projectors = [np.einsum('wki,wkj->wkij', modes['right_eigenvectors'],
+                                modes['left_eigenvectors'])
+                      for modes in [dense, arnoldi]]
+        assert_array_almost_equal(*projectors)
+
+    def test_delay_dist_matrix_units_not_stripped(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UnitStrippedWarning)
+            self.func(k=1, criterion='closest_to_one', matrix='MH',
+                      **self.params)
+
+    def test_unknown_criterion_raises_error(self):
+        with pytest.raises(ValueError):
+            self.func(k=1, criterion='smallest', matrix='MH', **self.params)
+
+    def test_too_many_modes_raise_error(self):
+        with pytest.raises(ValueError):
+            self.func(k=7, criterion='closest_to_one', matrix='MH',
+                      **self.params)
+
+
 class Test_additional_rates_for_fixed_input:
 
     func = staticmethod(additional_rates_for_fixed_input)
@@ -371,19 +802,92 @@ class Test_scan_fit_transfer_function_mean_std_input:
 
 # spatial functions
 class Test_linear_interpolation_alpha:
-    pass
-
-
-class Test_eigenvals_branches_rate:
-    pass
 
+    func = staticmethod(linear_interpolation_alpha)
+
+    J = np.array([[0.1, -0.5], [0.1, -0.5]])
+    K = np.array([[300., 300.], [300., 300.]])
+    # rate model with the low frequency limit of the lif transfer function
+    W_rate = np.array([[1.22050517, -6.10252585], [1.22050517, -6.10252585]])
+
+    def params(self, **kwargs):
+        params = dict(k_wavenumbers=np.array([10.]) / ureg.m,
+                      branches=np.array([0]),
+                      tau_rate=np.array([5., 5.]) * ureg.ms,
+                      W_rate=self.W_rate,
+                      width=np.array([0.2, 0.4]) * ureg.m,
+                      d_e=2. * ureg.ms,
+                      d_i=2. * ureg.ms,
+                      mean_inputs=np.array([10., 10.]) * ureg.mV,
+                      std_inputs=np.array([5., 5.]) * ureg.mV,
+                      tau_m=10. * ureg.ms,
+                      tau_s=0.5 * ureg.ms,
+                      tau_r=2. * ureg.ms,
+                      V_0_rel=0. * ureg.mV,
+                      V_th_rel=15. * ureg.mV,
+                      J=self.J * ureg.mV,
+                      K=self.K,
+                      dimension=2)
+        params.update(kwargs)
+        return params
+
+    def test_continuation_solves_characteristic_equation(self):
+        alphas, lambdas, n_steps, k_eig_max, eigenval_max, eigenvals = \
+            self.func(**self.params())
+        assert lambdas.shape == (1, 5)
+        assert lambdas[0, 0] == eigenvals[0, 0]
+        assert n_steps[0] >= len(alphas) - 1
+        for alpha, l in zip(alphas, lambdas[0].to(1 / ureg.s).magnitude):
+            F, _, _ = _chareq_alpha(l, alpha, 10., 0.002, 10., 5., 0.01,
+                                    0.0005, 0.002, 0., 15., self.J, self.K,
+                                    2, 0.005, self.W_rate,
+                                    np.array([0.2, 0.4]))
+            assert abs(F) < 1e-8
+
+    def test_arbitrary_alpha_grid(self):
+        alphas_coarse, lambdas_coarse, _, _, _, _ = self.func(**self.params())
+        alphas = np.array([0.1, 0.5, 0.6])
+        alphas, lambdas, n_steps, _, _, _ = self.func(
+            **self.params(alphas=alphas))
+        assert lambdas.shape == (1, 3)
+        assert_array_almost_equal(lambdas[0, 1].magnitude,
+                                  lambdas_coarse[0, 2].magnitude)
+
+    def test_step_size_follows_predictor_corrector_distance(self):
+        _, _, _, k_eig_max, _, eigenvals = self.func(**self.params())
+        args = (np.array([1.]), eigenvals[0, 0].to(1 / ureg.s).magnitude,
+                k_eig_max.to(1 / ureg.m).magnitude, 0.002, 10., 5., 0.01,
+                0.0005, 0.002, 0., 15., self.J, self.K, 2, 0.005,
+                self.W_rate, np.array([0.2, 0.4]))
+        lambdas_coarse, n_steps_coarse = _lambda_of_alpha_continuation(
+            *args, max_distance=1e-1)
+        lambdas_fine, n_steps_fine = _lambda_of_alpha_continuation(
+            *args, max_distance=1e-4)
+        assert n_steps_fine > n_steps_coarse
+        assert_allclose(lambdas_fine, lambdas_coarse, rtol=1e-8)
 
-class Test_lambda_of_alpha_integral:
-    pass
 
+class Test_eigenvals_branches_rate:
 
-class Test_d_lambda_d_alpha:
-    pass
+    func = staticmethod(eigenvals_branches_rate)
+
+    def test_vectorized_eigenvals_agree_with_single_solutions(self):
+        params = dict(k_wavenumbers=np.arange(0, 20, 0.5),
+                      branches=[-1, 0, 1],
+                      tau=0.01,
+                      W_rate=np.array([[2., -4.], [2., -4.]]),
+                      width=np.array([0.2, 0.4]),
+                      delay=0.002)
+        k_eig_max, idx_k_eig_max, eigenval_max, eigenvals = self.func(
+            **params)
+        assert eigenvals.shape == (3, 40)
+        for i, branch in enumerate(params['branches']):
+            for j, k in enumerate(params['k_wavenumbers']):
+                expected = aux_calcs.solve_chareq_rate_boxcar(
+                    branch, k, params['tau'], params['W_rate'],
+                    params['width'], params['delay'])
+                assert_array_almost_equal(eigenvals[i, j], expected)
+        assert k_eig_max == params['k_wavenumbers'][idx_k_eig_max]
 
 
 class Test_xi_eff_s:
@@ -395,19 +899,67 @@ class Test_xi_eff_r:
 
 
 class Test_d_xi_eff_s_d_lambda:
-    pass
 
+    func = staticmethod(_d_xi_eff_s_d_lambda)
 
-class Test_d_xi_eff_r_d_lambda:
-    pass
+    def test_agrees_with_finite_differences(self):
+        # equal rows of J * K yield a single non-trivial eigenvalue
+        args = (10., 5., 0.01, 0.0005, 0.002, 15., 0.,
+                np.array([[0.1, -0.5], [0.1, -0.5]]),
+                np.array([[100., 50.], [100., 50.]]),
+                2, np.array([0.2, 0.4]))
+        l = -5. + 40j
+        k = 3.
+        h = 1e-3
+        expected = (_xi_eff_s(l + h, k, *args)
+                    - _xi_eff_s(l - h, k, *args)) / (2 * h)
+        result = self.func(l, k, *args)
+        assert_array_almost_equal(result / abs(expected),
+                                  expected / abs(expected), decimal=6)
 
 
-class Test_solve_chareq_numerically_alpha:
+class Test_d_xi_eff_r_d_lambda:
     pass
 
 
 class Test_xi_of_k:
-    pass
+
+    func = staticmethod(xi_of_k)
+
+    W_rate = np.array([[2., -4.], [2., -4.]])
+    width = np.array([0.2, 0.4]) * ureg.mm
+
+    def xis_single(self, ks):
+        return np.array([np.real(aux_calcs.determinant(
+            self.W_rate * aux_calcs.p_hat_boxcar(k, self.width.magnitude)))
+            for k in ks])
+
+    def test_extrema_agree_with_single_evaluations(self):
+        ks = np.arange(0.5, 40, 0.5)
+        xi_min, xi_max, k_min, k_max = self.func(ks / ureg.mm, self.W_rate,
+                                                 self.width)
+        xis = self.xis_single(ks)
+        assert_array_almost_equal(xi_min, np.min(xis))
+        assert_array_almost_equal(xi_max, np.max(xis))
+        assert k_min.magnitude == ks[np.argmin(xis)]
+        assert k_max.magnitude == ks[np.argmax(xis)]
+        assert_units_equal(k_min, 1 / ureg.mm)
+
+    def test_refined_extrema_lie_between_grid_neighbours(self):
+        ks = np.arange(0.5, 40, 2.)
+        xi_min, xi_max, k_min, k_max = self.func(ks / ureg.mm, self.W_rate,
+                                                 self.width)
+        xi_min_r, xi_max_r, k_min_r, k_max_r = self.func(
+            ks / ureg.mm, self.W_rate, self.width, refine=True)
+        assert xi_min_r <= xi_min
+        assert xi_max_r >= xi_max
+        assert abs(k_min_r - k_min).magnitude <= 2.
+        assert abs(k_max_r - k_max).magnitude <= 2.
+        # refined maximum agrees with the one found on a dense grid
+        ks_dense = np.linspace((k_max - 2 / ureg.mm).magnitude,
+                               (k_max + 2 / ureg.mm).magnitude, 40001)
+        assert_array_almost_equal(xi_max_r, np.max(self.xis_single(ks_dense)),
+                                  decimal=8)
 
 
 class Test_solve_chareq_rate_boxcar:
@@ -1,4 +1,9 @@
+import asyncio
+import copy
+import pickle
 import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pytest
 import numpy as np
 from numpy.testing import assert_array_equal, assert_allclose
@@ -56,6 +61,19 @@ class Test_initialization:
                               new_analysis_params=dict(df=df))
         assert network.analysis_params['df'] == df
     
+    def test_network_created_from_converted_params(self, mocker, network,
+                                                   network_params_yaml,
+                                                   analysis_params_yaml):
+        network_params, analysis_params = lmt.input_output.load_params_bulk(
+            [network_params_yaml, analysis_params_yaml])
+        mocked = mocker.patch('lif_meanfield_tools.input_output.load_params')
+        new_network = lmt.Network(network_params, analysis_params)
+        mocked.assert_not_called()
+        assert new_network.hash == network.hash
+        assert_array_equal(new_network.analysis_params['omegas'],
+                           network.analysis_params['omegas'])
+        assert 'dimension' not in network_params
+    
     @pytest.mark.xfail
     def test_warning_is_given_if_necessary_parameters_are_missing(self):
         """What are necessary parameters? For what?"""
@@ -75,8 +93,38 @@ class Test_initialization:
         network._calculate_dependent_network_parameters.assert_not_called()
         network._calculate_dependent_analysis_parameters.assert_not_called()
 
+    def test_invalid_precision_raises_error(self, network_params_yaml):
+        with pytest.raises(ValueError):
+            lmt.Network(network_params_yaml, precision='half')
+
+    def test_single_precision_spectra_stored(self, mocker,
+                                             network_params_yaml,
+                                             analysis_params_yaml):
+        network = lmt.Network(network_params_yaml, analysis_params_yaml,
+                              precision='single')
+        mocker.patch('lif_meanfield_tools.meanfield_calcs.delay_dist_matrix',
+                     return_value=np.ones((2, 8, 8), dtype=complex))
+        mocker.patch('lif_meanfield_tools.meanfield_calcs.firing_rates',
+                     return_value=np.ones(8) * ureg.Hz)
+        assert network.delay_dist_matrix().dtype == np.complex64
+        assert network.firing_rates().magnitude.dtype == np.float64
+        assert network.change_parameters().precision == 'single'
+
     def test_hash_is_created(self, network):
         assert hasattr(network, 'hash')
+
+    def test_hash_reflects_parameter_changes(self, network):
+        hash = network.hash
+        new_network = network.change_parameters(
+            changed_network_params={'tau_m': 11 * ureg.ms})
+        assert new_network.hash != hash
+        network.network_params['tau_m'] = 11 * ureg.ms
+        assert network.hash == new_network.hash
+
+    def test_hash_reflects_in_place_changes(self, network):
+        hash = network.hash
+        network.network_params['K'][0, 0] += 100
+        assert network.hash != hash
     
     @pytest.mark.xfail
     def test_loading_of_existing_results(self):
@@ -196,6 +244,48 @@ class Test_saving_and_loading:
         # pass test if test file created
         assert any(matches)
     
+    def test_saved_results_and_params_loaded_correctly(self, tmpdir,
+                                                       network):
+        with tmpdir.as_cwd():
+            network.results['firing_rates'] = np.arange(8) * ureg.Hz
+            network.save(file_name='file.h5')
+            analysis_params, results = lmt.input_output.load_from_h5(
+                input_name='file.h5')
+        assert_array_equal(results['firing_rates'], np.arange(8) * ureg.Hz)
+        assert_units_equal(results['firing_rates'], 1 * ureg.Hz)
+        assert_array_equal(analysis_params['omegas'],
+                           network.analysis_params['omegas'])
+
+    def test_save_single_result_keeps_others(self, tmpdir, network):
+        with tmpdir.as_cwd():
+            network.results['firing_rates'] = np.arange(8) * ureg.Hz
+            network.results['mean_input'] = np.arange(8) * ureg.mV
+            network.save(file_name='file.h5')
+            network.results['mean_input'] = np.ones(8) * ureg.mV
+            network.save(file_name='file.h5', result_keys=['mean_input'])
+            data = lmt.input_output.load_h5('file.h5')
+        assert_array_equal(data['results']['firing_rates'],
+                           np.arange(8) * ureg.Hz)
+        assert_array_equal(data['results']['mean_input'],
+                           np.ones(8) * ureg.mV)
+        assert 'network_params' in data
+
+    def test_save_records_run_in_catalogue(self, tmpdir, network):
+        with tmpdir.as_cwd():
+            network.results['firing_rates'] = np.arange(8) * ureg.Hz
+            network.save(file_name='file.h5', catalogue=True)
+            runs = lmt.find_runs(tau_m=network.network_params['tau_m'])
+        assert len(runs) == 1
+        assert runs[0]['file_name'] == str(tmpdir.join('file.h5'))
+        assert runs[0]['hash'] == network.hash
+        assert runs[0]['results'] == ['firing_rates']
+
+    def test_save_without_catalogue_by_default(self, tmpdir, network):
+        with tmpdir.as_cwd():
+            network.save(file_name='file.h5')
+            assert lmt.find_runs() == []
+        assert not tmpdir.join(lmt.catalogue.CATALOGUE_NAME).exists()
+
     @pytest.mark.improve
     def test_save_passed_output(self, tmpdir, network):
         """
@@ -278,14 +368,52 @@ class Test_meta_functions:
     def test_change_network_parameters(self, network):
         new_tau_m = 1000 * ureg.ms
         update = dict(tau_m=new_tau_m)
-        network.change_parameters(changed_network_params=update)
-        assert network.network_params['tau_m'] == new_tau_m
+        new_network = network.change_parameters(changed_network_params=update)
+        assert new_network.network_params['tau_m'] == new_tau_m
+        assert network.network_params['tau_m'] == 10 * ureg.ms
 
     def test_change_analysis_parameters(self, network):
         new_df = 1000 * ureg.Hz
         update = dict(df=new_df)
-        network.change_parameters(changed_analysis_params=update)
-        assert network.analysis_params['df'] == new_df
+        new_network = network.change_parameters(changed_analysis_params=update)
+        assert new_network.analysis_params['df'] == new_df
+        assert network.analysis_params['df'] != new_df
+
+    def test_change_parameters_derives_parameters(self, network):
+        new_network = network.change_parameters(
+            changed_network_params=dict(g=2.))
+        assert_array_equal(new_network.network_params['W'][:, 1],
+                           -2 * new_network.network_params['W'][:, 0])
+        assert new_network.hash != network.hash
+
+    def test_change_analysis_parameters_keeps_working_point(self, network):
+        network.results = dict(firing_rates=1, mean_input=2, std_input=3,
+                               delay_dist=4, transfer_function=5)
+        new_network = network.change_parameters(
+            changed_analysis_params=dict(df=1000 * ureg.Hz))
+        assert new_network.show() == ['firing_rates', 'mean_input',
+                                      'std_input']
+        assert len(network.results) == 5
+
+    def test_change_N_keeps_all_but_power_spectra(self, network):
+        network.results = dict(firing_rates=1, delay_dist=4,
+                               transfer_function=5, power_spectra=6)
+        new_network = network.change_parameters(
+            changed_network_params=dict(N=2 * network.network_params['N']))
+        assert new_network.show() == ['delay_dist', 'firing_rates',
+                                      'transfer_function']
+
+    def test_change_delay_drops_dependent_results(self, network):
+        network.results = dict(firing_rates=1, delay_dist=4,
+                               delay_dist_single=[5], eigenvalue_spectra=[6])
+        network.analysis_params['delay_dist_freqs'] = np.array([1]) * ureg.Hz
+        network.analysis_params['eigenvalue_matrix'] = np.array(['MH'])
+        new_network = network.change_parameters(
+            changed_network_params=dict(d_e=5 * ureg.ms))
+        assert new_network.show() == ['firing_rates']
+        assert 'delay_dist_freqs' not in new_network.analysis_params
+        assert 'eigenvalue_matrix' not in new_network.analysis_params
+        assert 'delay_dist_freqs' in network.analysis_params
     
     @pytest.mark.xfail
     def test_extend_analysis_frequencies(self):
@@ -460,6 +588,184 @@ class Test_check_and_store_decorator:
         assert len(network.analysis_params['test_key']) == 2
         assert len(network.results['test']) == 2
 
+    def test_result_recalculated_after_parameter_change(self, mocker,
+                                                        network):
+        mocked = mocker.patch('lif_meanfield_tools.meanfield_calcs.'
+                              'delay_dist_matrix')
+        network.delay_dist_matrix()
+        network.network_params['Delay'] = 2 * network.network_params['Delay']
+        assert network.stale_results() == ['delay_dist']
+        network.delay_dist_matrix()
+        assert mocked.call_count == 2
+        assert network.stale_results() == []
+
+    def test_stale_results_propagate_to_dependent_results(self, mocker,
+                                                          network):
+        mocker.patch('lif_meanfield_tools.meanfield_calcs.firing_rates')
+        mocker.patch('lif_meanfield_tools.meanfield_calcs.mean')
+        mocker.patch('lif_meanfield_tools.meanfield_calcs.standard_deviation')
+        mocker.patch('lif_meanfield_tools.meanfield_calcs.transfer_function')
+        mocker.patch('lif_meanfield_tools.meanfield_calcs.delay_dist_matrix')
+        mocked = mocker.patch('lif_meanfield_tools.meanfield_calcs.'
+                              'power_spectra')
+        network.power_spectra()
+        network.analysis_params['omegas'] = \
+            network.analysis_params['omegas'][:5]
+        assert network.show() == ['delay_dist (stale)', 'firing_rates',
+                                  'mean_input', 'power_spectra (stale)',
+                                  'std_input', 'transfer_function (stale)']
+        network.power_spectra()
+        assert mocked.call_count == 2
+        assert network.stale_results() == []
+
+    def test_unaffected_results_are_not_recalculated(self, mocker, network):
+        mocked = mocker.patch('lif_meanfield_tools.meanfield_calcs.'
+                              'firing_rates')
+        network.firing_rates()
+        network.analysis_params['omegas'] = \
+            network.analysis_params['omegas'][:5]
+        network.network_params['N'] = 2 * network.network_params['N']
+        network.firing_rates()
+        mocked.assert_called_once()
+
+    def test_results_with_key_recalculated_after_parameter_change(
+            self, mocker, network):
+        mocked = mocker.patch('lif_meanfield_tools.meanfield_calcs.'
+                              'delay_dist_matrix')
+        network.delay_dist_matrix(10 * ureg.Hz)
+        network.delay_dist_matrix(11 * ureg.Hz)
+        network.network_params['Delay'] = 2 * network.network_params['Delay']
+        network.delay_dist_matrix(11 * ureg.Hz)
+        assert mocked.call_count == 3
+        assert len(network.results['delay_dist_single']) == 1
+
+    def test_profile_records_hits_and_misses(self, mocker, network):
+        mocker.patch('lif_meanfield_tools.meanfield_calcs.firing_rates')
+        network.profile = lmt.Profile()
+        network.firing_rates()
+        network.firing_rates()
+        stats = network.profile_stats()['firing_rates']
+        assert stats['calls'] == 1
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+
+    def test_profile_records_results_with_analysis_key(self, mocker,
+                                                       network):
+        mocker.patch('lif_meanfield_tools.meanfield_calcs.'
+                     'delay_dist_matrix')
+        network.profile = lmt.Profile()
+        network.delay_dist_matrix(10 * ureg.Hz)
+        network.delay_dist_matrix(11 * ureg.Hz)
+        network.delay_dist_matrix(10 * ureg.Hz)
+        stats = network.profile_stats()['delay_dist_single']
+        assert stats['misses'] == 2
+        assert stats['hits'] == 1
+
+
+def run_async(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class Test_async_methods:
+
+    def test_awaitable_counterparts_exist(self, network):
+        for name in lmt.Network._async_methods:
+            assert hasattr(network, 'a' + name)
+
+    def test_awaitable_returns_result_of_method(self, network, mocker):
+        mock = mocker.patch('lif_meanfield_tools.Network.firing_rates')
+        mock.return_value = 1
+        assert run_async(network.afiring_rates()) == 1
+        mock.assert_called_once()
+
+    def test_arguments_are_passed(self, network, mocker):
+        mock = mocker.patch('lif_meanfield_tools.Network.transfer_function')
+        run_async(network.atransfer_function(1 * ureg.Hz, method='taylor'))
+        mock.assert_called_once_with(1 * ureg.Hz, method='taylor')
+
+    def test_method_runs_outside_event_loop_thread(self, network, mocker):
+        threads = []
+        mock = mocker.patch('lif_meanfield_tools.Network.firing_rates')
+        mock.side_effect = lambda: threads.append(threading.get_ident())
+        run_async(network.afiring_rates())
+        assert threads[0] != threading.get_ident()
+
+    def test_concurrent_awaits_share_computation(self, network, mocker):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_power_spectra():
+            started.set()
+            release.wait(5)
+            return 1
+
+        mock = mocker.patch('lif_meanfield_tools.Network.power_spectra')
+        mock.side_effect = slow_power_spectra
+
+        async def await_twice():
+            first = asyncio.ensure_future(network.apower_spectra())
+            second = asyncio.ensure_future(network.apower_spectra())
+            await asyncio.sleep(0)
+            release.set()
+            return await asyncio.gather(first, second)
+
+        assert run_async(await_twice()) == [1, 1]
+        mock.assert_called_once()
+
+    def test_calls_with_different_arguments_are_not_shared(self, network,
+                                                           mocker):
+        mock = mocker.patch('lif_meanfield_tools.Network.transfer_function')
+
+        async def await_both():
+            return await asyncio.gather(
+                network.atransfer_function(1 * ureg.Hz),
+                network.atransfer_function(2 * ureg.Hz))
+
+        run_async(await_both())
+        assert mock.call_count == 2
+
+    def test_results_are_cached(self, network):
+        rates = run_async(network.afiring_rates())
+        assert network.firing_rates() is rates
+
+    def test_given_executor_is_used(self, network, mocker):
+        mocker.patch('lif_meanfield_tools.Network.firing_rates')
+        with ThreadPoolExecutor(1) as executor:
+            network.executor = executor
+            spy = mocker.spy(executor, 'submit')
+            run_async(network.afiring_rates())
+        spy.assert_called_once()
+
+    def test_pickle_round_trip(self, network):
+        network.results['firing_rates'] = np.arange(8) * ureg.Hz
+        with ThreadPoolExecutor(1) as executor:
+            network.executor = executor
+            for restored in [pickle.loads(pickle.dumps(network)),
+                             copy.deepcopy(network)]:
+                assert restored.hash == network.hash
+                assert_array_equal(restored.results['firing_rates'],
+                                   network.results['firing_rates'])
+                assert restored.executor is None
+                with restored._async_lock:
+                    pass
+
+    def test_process_pool_executor(self, network):
+        expected = network.firing_rates()
+        network.results = {}
+        with ProcessPoolExecutor(1) as executor:
+            network.executor = executor
+            rates = run_async(network.afiring_rates())
+        assert_allclose(rates.magnitude, expected.magnitude)
+
+    def test_executor_is_passed_to_changed_network(self, network):
+        network.executor = object()
+        new_network = network.change_parameters({'g': 5})
+        assert new_network.executor is network.executor
+
 
 class Test_functionality:
     
@@ -467,6 +773,237 @@ class Test_functionality:
         mock = mocker.patch('lif_meanfield_tools.meanfield_calcs.firing_rates')
         network.firing_rates()
         mock.assert_called_once()
+
+    def test_firing_rates_warm_start_from_shared_cache(self):
+        cache = lmt.WorkingPointCache()
+        networks = [lmt.Network(
+            network_params='tests/fixtures/config/network_params_microcircuit.yaml',
+            analysis_params='tests/fixtures/config/analysis_params_test.yaml',
+            new_network_params={'nu_ext': nu_ext},
+            working_point_cache=cache)
+            for nu_ext in [8 * ureg.Hz, 8.2 * ureg.Hz]]
+        networks[0].firing_rates()
+        rates_warm = networks[1].firing_rates()
+        assert cache.stats()['hits'] == 1
+        assert cache.iterations[1] < cache.iterations[0]
+        rates_cold = lmt.Network(
+            network_params='tests/fixtures/config/network_params_microcircuit.yaml',
+            analysis_params='tests/fixtures/config/analysis_params_test.yaml',
+            new_network_params={'nu_ext': 8.2 * ureg.Hz}).firing_rates()
+        assert_allclose(rates_warm.magnitude, rates_cold.magnitude, atol=1e-3)
+
+    def test_profile_counts_kernels_per_result(self):
+        network = lmt.Network(
+            network_params='tests/fixtures/config/network_params_microcircuit.yaml',
+            analysis_params='tests/fixtures/config/analysis_params_test.yaml',
+            profile=True)
+        network.power_spectra()
+        stats = network.profile_stats()
+        n_omegas = len(network.analysis_params['omegas'])
+        assert stats['firing_rates']['kernels']['siegert_quad'] > 0
+        assert stats['power_spectra']['kernels']['inv'] == n_omegas
+        assert stats['meanfield_calcs.power_spectra']['calls'] == 1
+        psi = sum(n for kernel, n
+                  in stats['transfer_function']['kernels'].items()
+                  if kernel.startswith('Psi'))
+        assert psi == 2 * n_omegas * network.network_params['dimension']
+        assert 'power_spectra' in network.profile_report()
+
+    def test_profile_is_shared_with_changed_network(self, network):
+        network.profile = lmt.Profile()
+        new_network = network.change_parameters({'g': 5})
+        assert new_network.profile is network.profile
+
+    def test_cancelled_transfer_function_resumes_from_completed_chunks(
+            self, network, mocker):
+        network._frequency_chunk_size = 4
+        token = lmt.CancellationToken()
+
+        def cancel_after_first_chunk(done, total):
+            if done == 4:
+                token.cancel()
+
+        with pytest.raises(lmt.ComputationCancelled):
+            network.transfer_function(progress=cancel_after_first_chunk,
+                                      cancel=token)
+        assert 'transfer_function' not in network.results
+        spy = mocker.spy(lmt.meanfield_calcs, 'transfer_function')
+        progress = []
+        tf = network.transfer_function(
+            progress=lambda done, total: progress.append(done))
+        n_omegas = len(network.analysis_params['omegas'])
+        assert spy.call_count == len(range(4, n_omegas, 4))
+        assert progress[0] == 4
+        assert progress[-1] == n_omegas
+        uncancelled = lmt.Network(
+            network_params='tests/fixtures/config/network_params_microcircuit.yaml',
+            analysis_params='tests/fixtures/config/analysis_params_test.yaml')
+        assert_allclose(tf.magnitude,
+                        uncancelled.transfer_function().magnitude)
+
+    def test_cancelled_transfer_function_restarts_if_parameters_changed(
+            self, network, mocker):
+        network._frequency_chunk_size = 4
+        token = lmt.CancellationToken()
+        token.cancel()
+        with pytest.raises(lmt.ComputationCancelled):
+            network.transfer_function(cancel=token)
+        network.network_params['tau_m'] = 2 * network.network_params['tau_m']
+        spy = mocker.spy(lmt.meanfield_calcs, 'transfer_function')
+        network.transfer_function()
+        n_omegas = len(network.analysis_params['omegas'])
+        assert spy.call_count == len(range(0, n_omegas, 4))
+
+    def test_empirical_tf_mode_without_working_point(self, mocker):
+        network = lmt.Network(
+            network_params='tests/fixtures/config/network_params_microcircuit.yaml',
+            analysis_params='tests/fixtures/config/analysis_params_test.yaml',
+            new_analysis_params=dict(
+                tf_mode='empirical',
+                tau_impulse=np.linspace(1, 8, 8) * ureg.ms,
+                delta_f=np.linspace(1, 2, 8) * ureg.Hz / ureg.mV))
+        mock = mocker.patch('lif_meanfield_tools.meanfield_calcs.firing_rates')
+        tf = network.transfer_function()
+        mock.assert_not_called()
+        expected = lmt.meanfield_calcs.transfer_function_empirical(
+            network.analysis_params['tau_impulse'],
+            network.analysis_params['delta_f'],
+            network.network_params['dimension'],
+            network.analysis_params['omegas'])
+        assert_allclose(tf.magnitude, expected.magnitude)
+        single = network.transfer_function(
+            network.analysis_params['omegas'][1] / 2 / np.pi)
+        assert_allclose(single.magnitude, expected[1:2].magnitude)
+
+    def test_transfer_function_beyond_float_range_of_Psi(self):
+        # Psi overflows in the continuation tier and is left to mpmath
+        network = lmt.Network(
+            network_params='tests/fixtures/config/small_network.yaml',
+            analysis_params='tests/fixtures/config/analysis_params_test.yaml')
+        tf = network.transfer_function(freq=1 * ureg.Hz)
+        assert tf.shape == (1, 2)
+
+    def test_empirical_tf_mode_with_scalar_parameters(self, network):
+        empirical = network.change_parameters(changed_analysis_params=dict(
+            tf_mode='empirical', tau_impulse=2 * ureg.ms,
+            delta_f=1.5 * ureg.Hz / ureg.mV))
+        n_omegas = len(network.analysis_params['omegas'])
+        assert empirical.transfer_function().shape == (n_omegas, 8)
+        assert empirical.transfer_function(10 * ureg.Hz).shape == (1, 8)
+
+    def test_empirical_tf_mode_enters_spectra(self, network):
+        network.firing_rates()
+        empirical = network.change_parameters(changed_analysis_params=dict(
+            tf_mode='empirical',
+            tau_impulse=np.linspace(1, 8, 8) * ureg.ms,
+            delta_f=np.linspace(1, 2, 8) * ureg.Hz / ureg.mV))
+        assert 'firing_rates' in empirical.results
+        power = empirical.power_spectra()
+        expected = lmt.meanfield_calcs.power_spectra(
+            network.network_params['tau_m'],
+            network.network_params['tau_s'],
+            network.network_params['dimension'],
+            network.network_params['J'],
+            network.network_params['K'],
+            network.delay_dist_matrix(),
+            network.network_params['N'],
+            network.firing_rates(),
+            empirical.transfer_function(),
+            network.analysis_params['omegas'])
+        assert_allclose(power.magnitude, expected.magnitude)
+
+    def test_changing_tf_mode_invalidates_transfer_function(self, network,
+                                                            mocker):
+        mocker.patch('lif_meanfield_tools.meanfield_calcs.transfer_function')
+        network.transfer_function()
+        empirical = network.change_parameters(changed_analysis_params=dict(
+            tf_mode='empirical',
+            tau_impulse=np.ones(8) * ureg.ms,
+            delta_f=np.ones(8) * ureg.Hz / ureg.mV))
+        assert 'transfer_function' not in empirical.results
+
+    def test_unknown_tf_mode_raises_error(self):
+        with pytest.raises(ValueError):
+            lmt.Network(
+                network_params='tests/fixtures/config/network_params_microcircuit.yaml',
+                analysis_params='tests/fixtures/config/analysis_params_test.yaml',
+                new_analysis_params={'tf_mode': 'exponential'})
+
+    def test_empirical_tf_mode_needs_filter_parameters(self):
+        with pytest.raises(ValueError):
+            lmt.Network(
+                network_params='tests/fixtures/config/network_params_microcircuit.yaml',
+                analysis_params='tests/fixtures/config/analysis_params_test.yaml',
+                new_analysis_params={'tf_mode': 'empirical'})
+
+    def test_leading_modes_stored_per_arguments(self, network, mocker):
+        modes = network.leading_modes(2)
+        n_omegas = len(network.analysis_params['omegas'])
+        assert modes['eigenvalues'].shape == (n_omegas, 2)
+        assert modes['right_eigenvectors'].shape == (n_omegas, 2, 8)
+        spy = mocker.spy(lmt.meanfield_calcs, 'leading_modes')
+        assert network.leading_modes(2) is modes
+        spy.assert_not_called()
+        network.leading_modes(2, criterion='largest_magnitude')
+        spy.assert_called_once()
+        assert list(network.analysis_params['leading_modes_specs']) == [
+            'MH:closest_to_one:2', 'MH:largest_magnitude:2']
+
+    def test_leading_modes_saved_and_loaded(self, network, tmpdir):
+        modes = network.leading_modes(1, matrix='prop')
+        with tmpdir.as_cwd():
+            network.save(file_name='test.h5')
+            loaded = lmt.input_output.load_h5('test.h5')
+        assert_array_equal(loaded['results']['leading_modes'][0]['eigenvalues'],
+                           modes['eigenvalues'])
+        assert list(loaded['analysis_params']['leading_modes_specs']) == [
+            'prop:closest_to_one:1']
+
+    def test_cross_spectra_stored_packed(self, network):
+        cross = network.cross_spectra()
+        n_omegas = len(network.analysis_params['omegas'])
+        assert cross.shape == (n_omegas, 36)
+        assert network.results['cross_spectra'] is cross
+        diagonal = np.diagonal(
+            lmt.meanfield_calcs.unpack_hermitian(cross).magnitude,
+            axis1=1, axis2=2)
+        assert_allclose(diagonal.real.T, network.power_spectra().magnitude)
+
+    def test_covariance_functions_from_stored_cross_spectra(self, mocker):
+        network = lmt.Network(
+            network_params='tests/fixtures/config/network_params_microcircuit.yaml',
+            analysis_params='tests/fixtures/config/analysis_params_test.yaml',
+            new_analysis_params={'f_min': 0 * ureg.Hz})
+        network.cross_spectra()
+        spy = mocker.spy(lmt.meanfield_calcs, 'cross_spectra')
+        times, covariances = network.covariance_functions()
+        coherence = network.coherence()
+        phases = network.phase_spectra()
+        spy.assert_not_called()
+        n_omegas = len(network.analysis_params['omegas'])
+        assert len(times) == 2 * (n_omegas - 1)
+        assert covariances.shape == (len(times), 8, 8)
+        assert coherence.shape == (n_omegas, 8, 8)
+        assert phases.shape == (n_omegas, 8, 8)
+
+    def test_covariance_functions_need_frequencies_from_zero(self, network):
+        with pytest.raises(ValueError):
+            network.covariance_functions()
+
+    def test_profiling_is_disabled_by_default(self, network, mocker):
+        mocker.patch('lif_meanfield_tools.meanfield_calcs.firing_rates')
+        network.firing_rates()
+        assert network.profile is None
+        assert network.profile_stats() == {}
+
+    def test_firing_rates_initial_guess(self, network):
+        rates = network.firing_rates()
+        cache = lmt.WorkingPointCache()
+        network.results = {}
+        network.working_point_cache = cache
+        network.firing_rates(nu_0=rates)
+        assert cache.misses == 0
+        assert cache.iterations == [1]
     
     def test_mean_input_calls_correctly(self, network, mocker):
         mock_mean = mocker.patch('lif_meanfield_tools.meanfield_calcs.mean')
@@ -599,6 +1136,37 @@ class Test_functionality:
         mock_dd.assert_called_once()
         mock_tf.assert_called_once()
         
+    def test_transfer_function_laplace_calls_correctly(self, network, mocker):
+        mock = mocker.patch('lif_meanfield_tools.meanfield_calcs.'
+                            'transfer_function_laplace')
+        mock_mean = mocker.patch('lif_meanfield_tools.Network.mean_input')
+        mock_std = mocker.patch('lif_meanfield_tools.Network.std_input')
+        network.transfer_function_laplace(np.array([1j]) / ureg.s)
+        mock.assert_called_once()
+        mock_mean.assert_called_once()
+        mock_std.assert_called_once()
+
+    def test_effective_connectivity_laplace_calls_correctly(self, network,
+                                                            mocker):
+        mock = mocker.patch('lif_meanfield_tools.meanfield_calcs.'
+                            'effective_connectivity_laplace')
+        mock_mean = mocker.patch('lif_meanfield_tools.Network.mean_input')
+        mock_std = mocker.patch('lif_meanfield_tools.Network.std_input')
+        network.effective_connectivity_laplace(np.array([1j]) / ureg.s)
+        mock.assert_called_once()
+        mock_mean.assert_called_once()
+        mock_std.assert_called_once()
+
+    def test_count_unstable_modes_calls_correctly(self, network, mocker):
+        mock = mocker.patch('lif_meanfield_tools.meanfield_calcs.'
+                            'count_unstable_modes')
+        mock_mean = mocker.patch('lif_meanfield_tools.Network.mean_input')
+        mock_std = mocker.patch('lif_meanfield_tools.Network.std_input')
+        network.count_unstable_modes()
+        mock.assert_called_once()
+        mock_mean.assert_called_once()
+        mock_std.assert_called_once()
+
     def test_eigenvalue_spectra_calls_correctly(self, network, mocker):
         mock_es = mocker.patch('lif_meanfield_tools.meanfield_calcs.'
                                'eigen_spectra')
@@ -0,0 +1,88 @@
+import pytest
+
+from lif_meanfield_tools import Profile
+from lif_meanfield_tools.profiling import count, profiled
+
+
+@profiled
+def kernel_user(n):
+    count('kernel', n)
+    return n
+
+
+class Test_Profile:
+
+    def test_record_counts_calls_and_misses(self):
+        profile = Profile()
+        with profile.record('a', miss=True):
+            pass
+        with profile.record('a'):
+            pass
+        profile.hit('a')
+        stats = profile.as_dict()['a']
+        assert stats['calls'] == 2
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+
+    def test_kernels_are_counted_in_all_enclosing_computations(self):
+        profile = Profile()
+        with profile.record('outer'):
+            count('inv')
+            with profile.record('inner'):
+                count('inv', 3)
+        stats = profile.as_dict()
+        assert stats['outer']['kernels'] == {'inv': 4}
+        assert stats['inner']['kernels'] == {'inv': 3}
+
+    def test_self_time_excludes_nested_computations(self):
+        profile = Profile()
+        with profile.record('outer'):
+            with profile.record('inner'):
+                sum(range(10000))
+        stats = profile.as_dict()
+        assert stats['outer']['time'] >= stats['inner']['time']
+        assert stats['outer']['self_time'] == pytest.approx(
+            stats['outer']['time'] - stats['inner']['time'])
+
+    def test_count_without_recording_profile_does_nothing(self):
+        profile = Profile()
+        count('inv')
+        with profile.record('a'):
+            pass
+        assert profile.as_dict()['a']['kernels'] == {}
+
+    def test_profiled_records_under_module_and_function_name(self):
+        profile = Profile()
+        with profile.record('a'):
+            kernel_user(2)
+        stats = profile.as_dict()
+        assert stats['test_profiling.kernel_user']['calls'] == 1
+        assert stats['test_profiling.kernel_user']['kernels'] == {'kernel': 2}
+        assert stats['a']['kernels'] == {'kernel': 2}
+
+    def test_profiled_function_is_not_recorded_without_profile(self):
+        profile = Profile()
+        assert kernel_user(1) == 1
+        assert profile.as_dict() == {}
+
+    def test_as_dict_returns_copy(self):
+        profile = Profile()
+        with profile.record('a'):
+            count('inv')
+        profile.as_dict()['a']['kernels']['inv'] = 10
+        assert profile.as_dict()['a']['kernels'] == {'inv': 1}
+
+    def test_report_lists_keys_and_kernels(self):
+        profile = Profile()
+        with profile.record('power_spectra', miss=True):
+            count('inv', 5)
+        report = profile.report()
+        assert 'power_spectra' in report
+        assert 'inv: 5' in report
+
+    def test_reset_removes_statistics(self):
+        profile = Profile()
+        with profile.record('a'):
+            pass
+        profile.reset()
+        assert profile.as_dict() == {}
@@ -0,0 +1,50 @@
+import pytest
+
+from lif_meanfield_tools import CancellationToken, ComputationCancelled
+from lif_meanfield_tools.progress import step
+
+
+class Test_CancellationToken:
+
+    def test_token_is_not_cancelled_initially(self):
+        token = CancellationToken()
+        assert not token.cancelled
+        token.raise_if_cancelled()
+
+    def test_cancelled_token_raises(self):
+        token = CancellationToken()
+        token.cancel()
+        assert token.cancelled
+        with pytest.raises(ComputationCancelled):
+            token.raise_if_cancelled()
+
+
+class Test_step:
+
+    func = staticmethod(step)
+
+    def test_progress_is_called_with_done_and_total(self):
+        calls = []
+        self.func(2, 5, progress=lambda done, total: calls.append((done,
+                                                                    total)))
+        assert calls == [(2, 5)]
+
+    def test_raises_if_cancelled_before_last_step(self):
+        token = CancellationToken()
+        token.cancel()
+        with pytest.raises(ComputationCancelled):
+            self.func(2, 5, cancel=token)
+
+    def test_does_not_raise_after_last_step(self):
+        token = CancellationToken()
+        token.cancel()
+        self.func(5, 5, cancel=token)
+
+    def test_progress_is_reported_before_cancellation(self):
+        token = CancellationToken()
+        token.cancel()
+        calls = []
+        with pytest.raises(ComputationCancelled):
+            self.func(1, 5, progress=lambda *args: calls.append(args),
+                      cancel=token)
+        assert calls == [(1, 5)]
@@ -0,0 +1,114 @@
+import os
+import threading
+import pytest
+from numpy.testing import assert_allclose
+from multiprocessing.connection import AuthenticationError
+
+import lif_meanfield_tools as lmt
+from lif_meanfield_tools.serve import Server, Client, SERVED_METHODS
+
+ureg = lmt.ureg
+
+network_params = 'tests/fixtures/config/network_params_microcircuit.yaml'
+analysis_params = 'tests/fixtures/config/analysis_params_test.yaml'
+
+
+def spec(**new_network_params):
+    return dict(network_params=os.path.abspath(network_params),
+                analysis_params=os.path.abspath(analysis_params),
+                new_network_params=new_network_params,
+                new_analysis_params={})
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = Server(str(tmp_path / 'lmt.sock'), authkey=b'test')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.close()
+    thread.join(5)
+
+
+@pytest.fixture
+def client(server):
+    with Client(server.address, authkey=b'test') as client:
+        yield client
+
+
+class Test_Server:
+
+    def test_same_spec_returns_same_network(self, tmp_path):
+        with Server(str(tmp_path / 'lmt.sock')) as server:
+            assert server.network(spec()) is server.network(spec())
+
+    def test_networks_with_equal_params_are_shared(self, tmp_path):
+        with Server(str(tmp_path / 'lmt.sock')) as server:
+            g = server.network(spec()).network_params['g']
+            assert server.network(spec(g=g)) is server.network(spec())
+            assert len(server.networks) == 1
+
+    def test_least_recently_used_network_is_dropped(self, tmp_path):
+        with Server(str(tmp_path / 'lmt.sock'), max_networks=2) as server:
+            first = server.network(spec())
+            server.network(spec(g=-5))
+            server.network(spec())
+            server.network(spec(g=-6))
+            assert len(server.networks) == 2
+            assert first in server.networks.values()
+            assert server.network(spec(g=-5)) is not None
+            assert first not in server.networks.values()
+
+    def test_port_requires_authkey(self):
+        with pytest.raises(ValueError):
+            Server(('localhost', 0))
+
+    def test_unserved_method_raises(self, tmp_path):
+        with Server(str(tmp_path / 'lmt.sock')) as server:
+            with pytest.raises(ValueError):
+                server.handle({'op': 'call', 'spec': spec(), 'method': 'save',
+                               'args': (), 'kwargs': {}})
+
+
+class Test_Client:
+
+    def test_remote_network_has_served_methods(self, client):
+        network = client.network(network_params, analysis_params)
+        for name in SERVED_METHODS:
+            assert callable(getattr(network, name))
+
+    def test_remote_result_equals_local_result(self, client):
+        remote = client.network(network_params, analysis_params).mean_input()
+        local = lmt.Network(network_params, analysis_params).mean_input()
+        assert remote.units == local.units
+        assert_allclose(remote.magnitude, local.magnitude)
+        # quantities are returned in the package's registry
+        remote + local
+
+    def test_repeated_queries_are_served_from_cache(self, server, client):
+        network = client.network(network_params, analysis_params)
+        network.firing_rates()
+        served = list(server.networks.values())[0]
+        assert 'firing_rates' in served.results
+        network.mean_input()
+        assert len(server.networks) == 1
+
+    def test_arguments_are_passed(self, client):
+        network = client.network(network_params, analysis_params)
+        tf = network.transfer_function(10 * ureg.Hz)
+        local = lmt.Network(network_params, analysis_params)
+        assert_allclose(tf.magnitude,
+                        local.transfer_function(10 * ureg.Hz).magnitude)
+
+    def test_errors_are_raised_in_client(self, client):
+        network = client.network(network_params, analysis_params)
+        with pytest.raises(ValueError):
+            network.call('save')
+
+    def test_wrong_authkey_is_rejected(self, server):
+        with pytest.raises(AuthenticationError):
+            Client(server.address, authkey=b'wrong')
+
+    def test_stats_lists_networks(self, client):
+        client.network(network_params, analysis_params).mean_input()
+        assert len(client.stats()['networks']) == 1
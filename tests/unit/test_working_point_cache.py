@@ -0,0 +1,70 @@
+import pytest
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from lif_meanfield_tools import WorkingPointCache
+
+
+class Test_WorkingPointCache:
+
+    params = (1., np.array([1., 2.]), np.array([[10., -5.], [10., -5.]]))
+    rates = np.array([3., 4.])
+
+    def test_empty_cache_misses(self):
+        cache = WorkingPointCache()
+        assert cache.lookup(self.params) is None
+        assert cache.misses == 1
+        assert cache.hits == 0
+
+    def test_lookup_returns_stored_rates_for_nearby_params(self):
+        cache = WorkingPointCache(max_distance=0.1)
+        cache.store(self.params, self.rates, n_iterations=100)
+        nearby = (1.05, np.array([1., 2.]), np.array([[10., -5.], [10., -5.]]))
+        assert_array_equal(cache.lookup(nearby), self.rates)
+        assert cache.hits == 1
+
+    def test_lookup_misses_for_distant_params(self):
+        cache = WorkingPointCache(max_distance=0.1)
+        cache.store(self.params, self.rates)
+        distant = (1.5, np.array([1., 2.]), np.array([[10., -5.], [10., -5.]]))
+        assert cache.lookup(distant) is None
+
+    def test_default_admits_only_small_parameter_steps(self):
+        cache = WorkingPointCache()
+        cache.store(self.params, self.rates)
+        nearby = (1.02, np.array([1., 2.]), np.array([[10., -5.], [10., -5.]]))
+        distant = (1.1, np.array([1., 2.]), np.array([[10., -5.], [10., -5.]]))
+        assert cache.lookup(distant) is None
+        assert_array_equal(cache.lookup(nearby), self.rates)
+
+    def test_lookup_misses_for_params_of_different_shape(self):
+        cache = WorkingPointCache(max_distance=np.inf)
+        cache.store(self.params, self.rates)
+        other_shape = (1., np.array([1., 2., 3.]), np.ones((3, 3)))
+        assert cache.lookup(other_shape) is None
+
+    def test_nearest_working_point_is_returned(self):
+        cache = WorkingPointCache(max_distance=1.)
+        cache.store((1.,), np.array([1.]))
+        cache.store((2.,), np.array([2.]))
+        assert_array_equal(cache.lookup((1.8,)), np.array([2.]))
+
+    def test_oldest_entries_are_dropped(self):
+        cache = WorkingPointCache(max_size=2)
+        for i in range(3):
+            cache.store((float(i),), np.array([float(i)]))
+        assert len(cache) == 2
+        assert cache.lookup((0.,)) is None
+
+    def test_stats(self):
+        cache = WorkingPointCache()
+        cache.lookup(self.params)
+        cache.store(self.params, self.rates, n_iterations=100)
+        cache.lookup(self.params)
+        cache.store(self.params, self.rates, n_iterations=10)
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == 0.5
+        assert stats['total_iterations'] == 110
+        assert stats['mean_iterations'] == 55.